@@ -0,0 +1,573 @@
+"""
+Serviço HTTP assíncrono (aiohttp) de recomendação de vinhos.
+
+O modelo é carregado uma única vez no processo principal e usado apenas para
+leitura. Com mais de um worker, o processo principal abre o socket e faz fork
+dos workers depois de carregar o modelo, de forma que todos compartilham as
+mesmas páginas de memória (copy-on-write) e aceitam conexões no mesmo socket.
+Cada worker calcula as recomendações num pool de threads para não bloquear o
+event loop; com --scoring-threads, cada consulta também é pontuada em paralelo
+por blocos do catálogo (WineRecommender.set_scoring_threads).
+
+Com --shards, o catálogo dividido por build_shards (wine_recommender_sharding)
+é servido por um processo por shard; o processo HTTP coordena as consultas.
+
+Com --shared-memory, as matrizes do modelo vão para memória compartilhada
+(backend.app.core.wine_recommender_shared) e os workers são processos novos
+(spawn) que só recebem o esqueleto do modelo e anexam as matrizes sem cópia;
+o processo principal libera sua cópia antes de iniciá-los.
+
+Rotas:
+    POST /recommend          {"features": {...}, "top_n": 5, "diversity_factor": 0.5,
+                              "filters": {"technical_sheet_country": "Chile"},
+                              "n_probe": 8}
+    POST /recommend/batch    {"queries": [{...}, ...], "top_n": 5, "diversity_factor": 0.5,
+                              "filters": {...}, "n_probe": 8}
+    GET  /similar/{id}       ?top_n=5&diversity_factor=0.5
+    GET  /autocomplete       ?column=technical_sheet_country&prefix=fra&limit=10
+    GET  /health
+    GET  /metrics            formato texto do Prometheus (do worker que atendeu)
+
+Uso:
+    python backend/app/api/server.py --port 8080 --workers 4 [--shared-memory]
+        [--scoring-threads 4]
+    python backend/app/api/server.py --port 8080 --shards model/shards
+"""
+
+import argparse
+import asyncio
+import datetime
+import functools
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from backend.app.config.settings import (
+    API_HOST,
+    API_PORT,
+    API_SCORING_THREADS,
+    API_THREADS,
+    API_WORKERS,
+    MODEL_PATH,
+)
+from backend.app.utils import metrics
+
+
+logger = logging.getLogger("evino_scraper")
+
+MAX_TOP_N = 50
+MAX_BATCH_SIZE = 256
+MAX_COMPLETIONS = 50
+
+MODEL_KEY = web.AppKey("model", object)
+EXECUTOR_KEY = web.AppKey("executor", ThreadPoolExecutor)
+INFO_KEY = web.AppKey("info", dict)
+
+
+def load_model(model_path):
+    """
+    Carrega o modelo salvo para servir recomendações.
+
+    Args:
+        model_path (str): Caminho do pickle do WineRecommender
+
+    Returns:
+        WineRecommender: Modelo carregado
+    """
+    from backend.app.core.wine_recommender import WineRecommender
+
+    return WineRecommender.carregar_modelo(model_path)
+
+
+def _bad_request(message):
+    return web.json_response({"error": message}, status=400)
+
+
+def _number(source, field, cast, default=None):
+    """
+    Converte um campo numérico do corpo ou da query string.
+
+    Args:
+        source (dict): Corpo JSON ou query string
+        field (str): Nome do campo
+        cast (type): int ou float
+        default: Valor sem o campo (None = campo opcional, aceita null)
+
+    Raises:
+        ValueError: Se o valor não for numérico (ex.: null, lista ou texto)
+    """
+    value = source.get(field, default)
+    if value is None and default is None:
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        kind = "um inteiro" if cast is int else "um número"
+        raise ValueError(f"{field} deve ser {kind}")
+
+
+def _query_options(source):
+    """
+    Valida top_n, diversity_factor e random_state do corpo ou da query string.
+
+    Returns:
+        dict: Opções para recommend_wines
+
+    Raises:
+        ValueError: Se algum valor for inválido
+    """
+    top_n = _number(source, "top_n", int, 5)
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise ValueError(f"top_n deve estar entre 1 e {MAX_TOP_N}")
+    diversity_factor = _number(source, "diversity_factor", float, 0.5)
+    if not 0 <= diversity_factor <= 1:
+        raise ValueError("diversity_factor deve estar entre 0 e 1")
+    return {
+        "top_n": top_n,
+        "diversity_factor": diversity_factor,
+        "random_state": _number(source, "random_state", int),
+    }
+
+
+def _filters(body, model):
+    """
+    Valida o filtro por atributo opcional do corpo da requisição.
+
+    Returns:
+        dict: {"filters": ...} para recommend_wines, ou vazio sem filtro
+
+    Raises:
+        ValueError: Se o filtro for inválido
+    """
+    filters = body.get("filters")
+    if not filters:
+        return {}
+    model.filter_positions(filters)
+    return {"filters": filters}
+
+
+def _n_probe(body):
+    """
+    Valida o n_probe opcional (clusters pontuados com o índice de clusters).
+
+    Returns:
+        dict: {"n_probe": ...} para recommend_wines, ou vazio sem n_probe
+
+    Raises:
+        ValueError: Se o valor for inválido
+    """
+    n_probe = _number(body, "n_probe", int)
+    if n_probe is None:
+        return {}
+    if n_probe < 0:
+        raise ValueError("n_probe deve ser maior ou igual a 0")
+    return {"n_probe": n_probe}
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ValueError("Corpo da requisição não é um JSON válido")
+    if not isinstance(body, dict):
+        raise ValueError("O corpo da requisição deve ser um objeto JSON")
+    return body
+
+
+async def _run(request, func, *args, **kwargs):
+    """Executa o cálculo no pool de threads do worker."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        request.app[EXECUTOR_KEY], functools.partial(func, *args, **kwargs)
+    )
+
+
+def _ids(recommendations):
+    return [int(i) for i in recommendations]
+
+
+async def recommend(request):
+    try:
+        body = await _read_json(request)
+        features = body.get("features")
+        if not isinstance(features, dict) or not features:
+            raise ValueError("Informe as características do vinho em 'features'")
+        model = request.app[MODEL_KEY]
+        options = dict(_query_options(body), **_filters(body, model), **_n_probe(body))
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    recommendations = await _run(request, model.recommend_wines, features, **options)
+    return web.json_response({"ids": _ids(recommendations)})
+
+
+async def recommend_batch(request):
+    try:
+        body = await _read_json(request)
+        queries = body.get("queries")
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("Informe a lista de consultas em 'queries'")
+        if len(queries) > MAX_BATCH_SIZE:
+            raise ValueError(f"Máximo de {MAX_BATCH_SIZE} consultas por requisição")
+        if not all(isinstance(query, dict) for query in queries):
+            raise ValueError("Cada consulta deve ser um objeto JSON")
+        model = request.app[MODEL_KEY]
+        options = dict(_query_options(body), **_filters(body, model), **_n_probe(body))
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    results = await _run(request, model.recommend_wines_batch, queries, **options)
+    return web.json_response({"results": [_ids(ids) for ids in results]})
+
+
+async def similar(request):
+    try:
+        wine_id = int(request.match_info["wine_id"])
+        options = _query_options(request.query)
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    model = request.app[MODEL_KEY]
+    recommendations = await _run(request, model.similar_wines, wine_id, **options)
+    if recommendations is None:
+        return web.json_response({"error": f"Vinho {wine_id} não encontrado"}, status=404)
+    return web.json_response({"id": wine_id, "ids": _ids(recommendations)})
+
+
+async def autocomplete(request):
+    try:
+        column = request.query.get("column")
+        if not column:
+            raise ValueError("Informe a coluna em 'column'")
+        prefix = request.query.get("prefix", "")
+        limit = int(request.query.get("limit", 10))
+        if not 1 <= limit <= MAX_COMPLETIONS:
+            raise ValueError(f"limit deve estar entre 1 e {MAX_COMPLETIONS}")
+        values = request.app[MODEL_KEY].complete(column, prefix, limit)
+    except ValueError as e:
+        return _bad_request(str(e))
+    return web.json_response({"column": column, "prefix": prefix, "values": values})
+
+
+async def health(request):
+    info = request.app[INFO_KEY]
+    return web.json_response(
+        {
+            "status": "ok",
+            "pid": os.getpid(),
+            "wines": info["wines"],
+            "model_path": info["model_path"],
+            "loaded_at": info["loaded_at"],
+            "text_cache": request.app[MODEL_KEY].text_cache_stats(),
+        }
+    )
+
+
+async def metrics_endpoint(request):
+    return web.Response(
+        text=metrics.render_prometheus(),
+        content_type="text/plain",
+        headers={"X-Worker-Pid": str(os.getpid())},
+    )
+
+
+@web.middleware
+async def timing_middleware(request, handler):
+    """Registra o tempo e o status de cada requisição por rota."""
+    start = time.perf_counter()
+    route = request.match_info.route.resource
+    route = route.canonical if route is not None else "not_found"
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        metrics.REGISTRY.observe(
+            metrics.API_REQUEST_SECONDS, time.perf_counter() - start, route=route
+        )
+        metrics.increment(metrics.API_REQUESTS_TOTAL, route=route, status=status)
+
+
+def create_app(model, model_path=None, threads=API_THREADS):
+    """
+    Monta a aplicação aiohttp para um modelo já carregado.
+
+    Args:
+        model (WineRecommender): Modelo (usado apenas para leitura)
+        model_path (str): Caminho do modelo, exibido no /health
+        threads (int): Threads de cálculo por processo
+
+    Returns:
+        web.Application: Aplicação pronta para web.run_app
+    """
+    app = web.Application(middlewares=[timing_middleware])
+    app[MODEL_KEY] = model
+    app[INFO_KEY] = {
+        "wines": len(model.df),
+        "model_path": model_path,
+        "loaded_at": datetime.datetime.now().isoformat(),
+    }
+
+    async def start_executor(app):
+        app[EXECUTOR_KEY] = ThreadPoolExecutor(max_workers=threads)
+
+    async def stop_executor(app):
+        app[EXECUTOR_KEY].shutdown(wait=True)
+
+    app.on_startup.append(start_executor)
+    app.on_cleanup.append(stop_executor)
+
+    app.router.add_post("/recommend", recommend)
+    app.router.add_post("/recommend/batch", recommend_batch)
+    app.router.add_get("/similar/{wine_id}", similar)
+    app.router.add_get("/autocomplete", autocomplete)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics_endpoint)
+    return app
+
+
+def _bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _forward_signals(stop_workers):
+    """Repassa SIGTERM/SIGINT do processo principal aos workers."""
+
+    def handler(signum, frame):
+        stop_workers()
+
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
+
+
+def _worker_exit_ok(exit_code):
+    return exit_code in (0, -signal.SIGTERM)
+
+
+def _run_shared_worker(skeleton, manifest, sock, model_path, threads):
+    """Ponto de entrada dos workers do modo --shared-memory."""
+    from backend.app.core.wine_recommender_shared import attach_model
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    model = attach_model(skeleton, manifest)
+    web.run_app(create_app(model, model_path, threads), sock=sock, print=None)
+
+
+def _serve_shared(model, model_path, host, port, workers, threads):
+    """
+    Publica as matrizes do modelo em memória compartilhada e inicia os workers.
+
+    Returns:
+        int: Código de saída
+    """
+    from backend.app.core.wine_recommender_shared import SharedModel
+
+    shared = SharedModel(model)
+    del model
+    gc.collect()
+    logger.info(
+        f"Matrizes do modelo publicadas em memória compartilhada "
+        f"({shared.nbytes / 1024**2:.1f} MB)"
+    )
+
+    sock = _bind_socket(host, port)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_run_shared_worker,
+            args=(shared.skeleton, shared.manifest, sock, model_path, threads),
+        )
+        for _ in range(max(workers, 1))
+    ]
+    try:
+        for process in processes:
+            process.start()
+        logger.info(
+            f"Servindo recomendações em http://{host}:{port} com {len(processes)} "
+            f"workers ({', '.join(str(p.pid) for p in processes)})"
+        )
+
+        def stop_workers():
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        _forward_signals(stop_workers)
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        sock.close()
+        shared.close()
+
+    return 0 if all(_worker_exit_ok(p.exitcode) for p in processes) else 1
+
+
+def _serve_sharded(shards_path, host, port, threads):
+    """Serve a API num único processo HTTP, com um processo por shard (--shards)."""
+    from backend.app.core.wine_recommender_sharding import ShardedRecommender
+
+    recommender = ShardedRecommender(shards_path)
+    logger.info(
+        f"Servindo recomendações em http://{host}:{port} com "
+        f"{len(recommender.workers)} shards de {shards_path}"
+    )
+    try:
+        web.run_app(
+            create_app(recommender, shards_path, threads), host=host, port=port, print=None
+        )
+    finally:
+        recommender.close()
+    return 0
+
+
+def serve(model_path=MODEL_PATH, host=API_HOST, port=API_PORT, workers=API_WORKERS,
+          threads=API_THREADS, shared_memory=False, scoring_threads=API_SCORING_THREADS,
+          shards_path=None):
+    """
+    Carrega o modelo e serve a API, com um ou mais processos.
+
+    Args:
+        model_path (str): Caminho do modelo salvo
+        host (str): Endereço de escuta
+        port (int): Porta HTTP
+        workers (int): Quantidade de processos (fork após carregar o modelo)
+        threads (int): Threads de cálculo por processo
+        shared_memory (bool): Publica as matrizes em memória compartilhada e
+            inicia os workers por spawn em vez de fork
+        scoring_threads (int): Threads que pontuam cada consulta por blocos do
+            catálogo (ver WineRecommender.set_scoring_threads)
+        shards_path (str): Diretório gerado por build_shards; serve os shards
+            (um processo por shard) em vez de model_path
+
+    Returns:
+        int: Código de saída
+    """
+    if shards_path:
+        if workers > 1:
+            logger.warning("Com --shards o serviço usa um único processo HTTP")
+        return _serve_sharded(shards_path, host, port, threads)
+
+    model = load_model(model_path)
+    model.set_scoring_threads(scoring_threads)
+    logger.info(f"Modelo com {len(model.df)} vinhos carregado de {model_path}")
+
+    if shared_memory:
+        return _serve_shared(model, model_path, host, port, workers, threads)
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        logger.info(f"Servindo recomendações em http://{host}:{port}")
+        web.run_app(
+            create_app(model, model_path, threads), host=host, port=port, print=None
+        )
+        return 0
+
+    sock = _bind_socket(host, port)
+    # Objetos do modelo vão para a geração permanente do GC, evitando que as
+    # coletas nos workers toquem (e copiem) as páginas compartilhadas
+    gc.freeze()
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                web.run_app(
+                    create_app(model, model_path, threads), sock=sock, print=None
+                )
+            except Exception as e:
+                logger.error(f"Erro no worker {os.getpid()}: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children.append(pid)
+
+    logger.info(
+        f"Servindo recomendações em http://{host}:{port} com {workers} workers "
+        f"({', '.join(str(pid) for pid in children)})"
+    )
+
+    def stop_children():
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    _forward_signals(stop_children)
+
+    exit_code = 0
+    for pid in children:
+        _, status = os.waitpid(pid, 0)
+        if not _worker_exit_ok(os.waitstatus_to_exitcode(status)):
+            exit_code = 1
+    sock.close()
+    return exit_code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP de recomendação de vinhos")
+    parser.add_argument("--model", default=MODEL_PATH, help="Caminho do modelo salvo")
+    parser.add_argument("--host", default=API_HOST, help="Endereço de escuta")
+    parser.add_argument("--port", type=int, default=API_PORT, help="Porta HTTP")
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Processos")
+    parser.add_argument(
+        "--threads", type=int, default=API_THREADS, help="Threads de cálculo por processo"
+    )
+    parser.add_argument(
+        "--shared-memory",
+        action="store_true",
+        help="Matrizes do modelo em memória compartilhada entre os workers",
+    )
+    parser.add_argument(
+        "--scoring-threads",
+        type=int,
+        default=API_SCORING_THREADS,
+        help="Threads que pontuam cada consulta por blocos do catálogo",
+    )
+    parser.add_argument(
+        "--shards", default=None, help="Diretório de shards (ver backend/main.py shard)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    return serve(
+        args.model,
+        args.host,
+        args.port,
+        args.workers,
+        args.threads,
+        args.shared_memory,
+        args.scoring_threads,
+        args.shards,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,7 @@ SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
 # Configurações do scraper
-EVINO_BASE_URL = "https://www.evino.com.br"
+EVINO_BASE_URL = os.environ.get("EVINO_BASE_URL", "https://www.evino.com.br")
 EVINO_PRODUCTS_URL = f"{EVINO_BASE_URL}/vinhos"
 MAX_SCROLLS = 15
 SCROLL_DELAY = 2
@@ -17,11 +17,28 @@ BUTTON_CLICK_DELAY = 3
 PRODUCTS_BATCH_SIZE = 10
 DOWNLOAD_INTERVAL = 30  # em minutos
 DOWNLOAD_DELAY = 2  # segundos entre downloads
+SCRAPER_CONCURRENCY = 1  # navegadores em paralelo no scraping
+CRAWL_CHECKPOINT_PATH = os.environ.get(
+    "CRAWL_CHECKPOINT_PATH", "logs/crawl_checkpoint.json"
+)
 
 # Configurações do navegador
 BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 BROWSER_TIMEOUT = 30
 
+# Configurações do modelo de recomendação
+WINE_DATA_PATH = os.environ.get("WINE_DATA_PATH", "db.csv")
+MODEL_PATH = os.environ.get("MODEL_PATH", "model/wine_recommender_model.pkl")
+SHARDS_PATH = os.environ.get("SHARDS_PATH", "model/shards")  # diretório do modelo em shards
+
+# Configurações do serviço HTTP de recomendação
+API_HOST = os.environ.get("API_HOST", "0.0.0.0")
+API_PORT = int(os.environ.get("API_PORT", "8080"))
+API_WORKERS = int(os.environ.get("API_WORKERS", "1"))  # processos
+API_THREADS = int(os.environ.get("API_THREADS", "4"))  # threads de cálculo por processo
+API_SCORING_THREADS = int(os.environ.get("API_SCORING_THREADS", "1"))  # threads por consulta
+RECOMMENDER_API_URL = os.environ.get("RECOMMENDER_API_URL")  # usado pelo frontend
+
 # Configurações de arquivos locais para salvar
 JSON_OBJS_PATH = os.environ.get("JSON_OBJS_PATH")
 IMAGE_PATH = os.environ.get("IMAGE_PATH")
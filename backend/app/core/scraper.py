@@ -22,13 +22,21 @@ from backend.app.config.settings import (
     SCROLL_DELAY,
 )
 from backend.app.core.scraper_aux import *
-from backend.app.scheduler.tasks import *
+from backend.app.utils.metrics import (
+    SCRAPER_PAGE_SECONDS,
+    SCRAPER_PAGES_TOTAL,
+    SCRAPER_STAGE_SECONDS,
+    increment,
+    span,
+    timed,
+)
 
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 logger = logging.getLogger("evino_scraper")
 
 
+@timed(SCRAPER_PAGE_SECONDS)
 def scrape_wine_info_with_selenium(driver, url=EVINO_BASE_URL) -> Dict | None:
     """
     Loads a wine product page with Selenium and extracts detailed information
@@ -45,16 +53,18 @@ def scrape_wine_info_with_selenium(driver, url=EVINO_BASE_URL) -> Dict | None:
 
     try:
 
-        driver.get(url)
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "BoxProductInfo__Title"))
-        )
+        with span(SCRAPER_STAGE_SECONDS, stage="page_load"):
+            driver.get(url)
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.CLASS_NAME, "BoxProductInfo__Title"))
+            )
 
         html_content = driver.page_source
         scroll_page(driver)
         click_button_show_tech_details(driver)
 
-        soup = BeautifulSoup(html_content, "html.parser")
+        with span(SCRAPER_STAGE_SECONDS, stage="parse"):
+            soup = BeautifulSoup(html_content, "html.parser")
 
         wine_data = {
             "product_type": None,
@@ -259,8 +269,10 @@ def scrape_wine_info_with_selenium(driver, url=EVINO_BASE_URL) -> Dict | None:
         if not src:
             logger.info(f"Erro ao processar o salvamento da foto.")
 
+        increment(SCRAPER_PAGES_TOTAL, status="ok")
         return wine_data
 
     except Exception as e:
         logger.error(f"Erro ao processar página {url}: {e}")  # {str(e)}
+        increment(SCRAPER_PAGES_TOTAL, status="error")
         return None
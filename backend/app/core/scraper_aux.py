@@ -6,18 +6,68 @@ from selenium.webdriver.common.by import By
 import logging
 import time
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from app.config.settings import (
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from backend.app.config.settings import (
     MAX_SCROLLS,
     SCROLL_DELAY,
     BUTTON_CLICK_DELAY,
     IMAGE_PATH,
 )
+from backend.app.utils.metrics import SCRAPER_STAGE_SECONDS, timed
 
 
 logger = logging.getLogger("evino_scraper")
 
 
+def click_show_more_buttons(driver):
+    """
+    Clica nos botões de "Mostrar mais"/"Carregar mais" visíveis na página.
+
+    Args:
+        driver (webdriver.Chrome): O navegador inicializado.
+    """
+    try:
+        # Tenta clicar em botões de "Mostrar mais"
+        buttons = driver.find_elements(
+            By.XPATH,
+            "//button[contains(text(), 'Mostrar mais') or contains(text(), 'Carregar mais')]",
+        )
+        if buttons:
+            for button in buttons:
+                if button.is_displayed():
+                    print("Botão 'Mostrar mais produtos' encontrado. Clicando...")
+                    driver.execute_script("arguments[0].scrollIntoView(true);", button)
+                    time.sleep(1)
+                    driver.execute_script("arguments[0].click();", button)
+                    print("Clique realizado")
+                    time.sleep(BUTTON_CLICK_DELAY)
+    except Exception as e:
+        print(f"Erro ao tentar clicar no botão: {e}")
+
+
+@timed(SCRAPER_STAGE_SECONDS, stage="scroll")
+def scroll_once(driver, last_height=None):
+    """
+    Executa um único passo de rolagem: rola até o fim e clica em "Mostrar mais".
+
+    Args:
+        driver (webdriver.Chrome): O navegador inicializado.
+        last_height (int, optional): Altura da página antes do passo.
+
+    Returns:
+        tuple: (nova altura da página, True se a página cresceu)
+    """
+    if last_height is None:
+        last_height = driver.execute_script("return document.body.scrollHeight")
+
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    time.sleep(SCROLL_DELAY)
+    click_show_more_buttons(driver)
+
+    new_height = driver.execute_script("return document.body.scrollHeight")
+    return new_height, new_height != last_height
+
+
 def scroll_page(driver):
     """
     Rola a página para carregar mais produtos e clica em botões de "Mostrar mais".
@@ -29,38 +79,15 @@ def scroll_page(driver):
     last_height = driver.execute_script("return document.body.scrollHeight")
 
     for scroll in range(MAX_SCROLLS):
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(SCROLL_DELAY)
-
-        try:
-            # Tenta clicar em botões de "Mostrar mais"
-            buttons = driver.find_elements(
-                By.XPATH,
-                "//button[contains(text(), 'Mostrar mais') or contains(text(), 'Carregar mais')]",
-            )
-            if buttons:
-                for button in buttons:
-                    if button.is_displayed():
-                        print("Botão 'Mostrar mais produtos' encontrado. Clicando...")
-                        driver.execute_script(
-                            "arguments[0].scrollIntoView(true);", button
-                        )
-                        time.sleep(1)
-                        driver.execute_script("arguments[0].click();", button)
-                        print("Clique realizado")
-                        time.sleep(BUTTON_CLICK_DELAY)
-        except Exception as e:
-            print(f"Erro ao tentar clicar no botão: {e}")
-
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
+        last_height, grew = scroll_once(driver, last_height)
+        if not grew:
             print(f"Fim da página alcançado após {scroll+1} scrolls")
             break
-        last_height = new_height
 
         print(f"Scroll {scroll+1}/{MAX_SCROLLS} concluído")
 
 
+@timed(SCRAPER_STAGE_SECONDS, stage="click")
 def click_button_show_tech_details(driver):
     """
     Clica no botão para mostrar detalhes técnicos completos
@@ -108,6 +135,7 @@ def escape_caractere_product_name(product_name):
     return None
 
 
+@timed(SCRAPER_STAGE_SECONDS, stage="image")
 def baixar_imagem(driver, url, product_name):
     dest_path = IMAGE_PATH
     # Criar pasta de destino se não existir
@@ -174,6 +202,32 @@ def extract_product_links(soup):
     return links
 
 
+@timed(SCRAPER_STAGE_SECONDS, stage="collect_links")
+def collect_product_links(driver):
+    """
+    Coleta os links de produtos já renderizados na página atual do navegador.
+
+    Faz uma única chamada ao navegador, sem serializar e parsear o page_source
+    inteiro, o que permite extrair links a cada passo de rolagem.
+
+    Args:
+        driver (webdriver.Chrome): O navegador inicializado.
+
+    Returns:
+        list: Lista de links de produtos, na ordem em que aparecem na página.
+    """
+    hrefs = driver.execute_script(
+        """
+        return Array.from(
+            document.querySelectorAll('a[href*="/product/"]'),
+            a => a.getAttribute('href')
+        );
+        """
+    )
+    return [href for href in hrefs or [] if href and "/product/" in href]
+
+
+@timed(SCRAPER_STAGE_SECONDS, stage="strength")
 def get_strength_level(driver, category_label):
     # Encontra o wrapper da categoria específica (Fruta, Acidez, etc.)
     wrapper_elements = driver.find_elements(
@@ -9,40 +9,200 @@ from sklearn.preprocessing import MinMaxScaler, LabelEncoder, OrdinalEncoder
 from sklearn.model_selection import KFold
 import warnings
 
+from backend.app.core.wine_recommender_clusters import DEFAULT_N_PROBE, ClusterIndex
+from backend.app.core.wine_recommender_embedding import (
+    DEFAULT_EMBEDDING_DIM,
+    TEXT_SIMILARITY_MODES,
+    TextEmbedding,
+)
+from backend.app.core.wine_recommender_filters import FilterIndex
+from backend.app.core.wine_recommender_ordinal import (
+    DEFAULT_MAX_TABLE_MB,
+    OrdinalSimilarityTable,
+    ordinal_similarity,
+    table_nbytes,
+)
+from backend.app.core.wine_recommender_parallel import ShardedScorer
+from backend.app.core.wine_recommender_precomputed import RecommendationTable
+from backend.app.core.wine_recommender_scoring import SCORING_MODES, FusedScorer
+from backend.app.core.wine_recommender_text import (
+    DEFAULT_TEXT_CACHE_SIZE,
+    HashingTfidfVectorizer,
+    QueryVectorCache,
+    TextAssembler,
+)
+from backend.app.core.wine_recommender_vocabulary import (
+    DEFAULT_COMPLETIONS,
+    WineVocabulary,
+)
+from backend.app.utils.metrics import (
+    RECOMMENDER_QUERY_SECONDS,
+    RECOMMENDER_STAGE_SECONDS,
+    RECOMMENDER_TABLE_LOOKUPS_TOTAL,
+    RECOMMENDER_TEXT_CACHE_TOTAL,
+    increment,
+    span,
+    timed,
+)
+
 
 warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
 
+TEXT_MODES = ("vocabulary", "hashing")
+
+DEFAULT_FEATURE_WEIGHTS = {
+    "text": 0.4,  # Peso para features textuais
+    "ordinal": 0.4,  # Peso para features ordinais
+    "categoric": 0.2,  # Peso para features categóricas
+}
+
+
+def load_stop_words():
+    """Palavras conectivas em PT-BR do spaCy, usadas pelos vetorizadores."""
+    nlp = spacy.load("pt_core_news_sm")
+    return list(nlp.Defaults.stop_words)
+
+
+def compact_frame(dataframe, columns):
+    """
+    Mantém apenas as colunas informadas, com os tipos do modelo compacto.
+
+    id vira int32, colunas inteiras (códigos dos encoders) usam o menor tipo
+    sem sinal possível e textos viram dtype category.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame codificado
+        columns (list): Colunas a manter (id é sempre mantido)
+
+    Returns:
+        pd.DataFrame: Novo DataFrame compacto
+    """
+    columns = ["id"] + [col for col in columns if col in dataframe.columns and col != "id"]
+    df = dataframe[list(dict.fromkeys(columns))].copy()
+
+    ids = df["id"].to_numpy()
+    if len(ids) and np.iinfo(np.int32).min <= ids.min() and ids.max() <= np.iinfo(np.int32).max:
+        df["id"] = ids.astype(np.int32)
+    for col in df.columns[1:]:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            # Códigos do OrdinalEncoder/LabelEncoder: inteiros não negativos
+            df[col] = pd.to_numeric(df[col], downcast="unsigned")
+        elif df[col].dtype == object:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _record_text_cache(hits, misses):
+    """Acertos e faltas do cache de vetorização das consultas, nas métricas."""
+    if hits:
+        increment(RECOMMENDER_TEXT_CACHE_TOTAL, hits, result="hit")
+    if misses:
+        increment(RECOMMENDER_TEXT_CACHE_TOTAL, misses, result="miss")
+
 
 class WineRecommender:
-    def __init__(self, dataframe):
+    # Colunas usadas para definir a similaridade
+    TEXT_COLUMNS = [
+        "product_name",
+        "color_description",
+        "scent_description",
+        "taste_description",
+        "harmonizes_with",
+        "technical_sheet_grapes",
+        "technical_sheet_region",
+        "technical_sheet_wine_type",
+        "technical_sheet_country",
+    ]
+    CATEGORIC_COLUMNS = [
+        "technical_sheet_wine_type",
+        "technical_sheet_country",
+    ]
+    ORDINAL_COLUMNS = [
+        "fruit_tasting",
+        "sugar_tasting",
+        "acidity_tasting",
+        "tannin_tasting",
+    ]
+
+    # Atributos de cache recriados sob demanda e que não vão para o pickle
+    _transient_attributes = (
+        "_evaluator",
+        "_component_cache",
+        "_shared_segments",
+        "_ordinal_table_checked",
+        "_recommendation_table_checked",
+        "_query_vector_cache",
+        "_cluster_index_checked",
+        "_text_embedding_checked",
+        "_sharded_scorer",
+    )
+
+    def __init__(
+        self,
+        dataframe,
+        lean=False,
+        text_mode="vocabulary",
+        text_weights=None,
+        scoring="legacy",
+        ordinal_table=False,
+    ):
+        """
+        Args:
+            dataframe (pd.DataFrame): Catálogo de vinhos (é codificado no lugar)
+            lean (bool): Compacta o modelo após o treino (ver compact)
+            text_mode (str): "vocabulary" (TfidfVectorizer) ou "hashing"
+                (HashingTfidfVectorizer, memória fixa e ajuste por lotes)
+            text_weights (dict): Repetições de cada coluna no texto combinado
+                (ex.: {"harmonizes_with": 2}); padrão 1
+            scoring (str): "legacy" (similaridades normalizadas por consulta)
+                ou "fused" (uma multiplicação esparsa, ver set_scoring)
+            ordinal_table (bool): Pré-calcula a similaridade ordinal das
+                combinações dos sliders (ver build_ordinal_table)
+        """
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"text_mode deve ser um de {TEXT_MODES}")
+        self.text_mode = text_mode
+        self.text_weights = dict(text_weights or {})
         self.df = dataframe
         self.prepare_features()
+        if lean:
+            self.compact()
+        if ordinal_table:
+            self.build_ordinal_table()
+        self.set_scoring(scoring)
 
-    def prepare_features(self):
-        """Definir aqui quais colunas serão usadas para definir a similaridade"""
-        self.text_columns = [
-            "product_name",
-            "color_description",
-            "scent_description",
-            "taste_description",
-            "harmonizes_with",
-            "technical_sheet_grapes",
-            "technical_sheet_region",
-            "technical_sheet_wine_type",
-            "technical_sheet_country",
-        ]
+    @classmethod
+    def from_chunks(cls, source, stop_words=None, text_weights=None):
+        """
+        Treina o modelo lendo o catálogo em lotes, sem carregá-lo inteiro.
 
-        self.categoric_columns = [
-            "technical_sheet_wine_type",
-            "technical_sheet_country",
-        ]
+        Usa sempre o modo de texto hashing e gera o modelo compacto (ver
+        compact); as fontes prontas estão em wine_recommender_chunks
+        (csv_chunks, parquet_chunks, cursor_chunks, supabase_chunks).
 
-        self.ordinal_columns = [
-            "fruit_tasting",
-            "sugar_tasting",
-            "acidity_tasting",
-            "tannin_tasting",
-        ]
+        Args:
+            source (callable): Função que retorna um iterador de DataFrames
+            stop_words (list): Palavras ignoradas (None = stop words do spaCy)
+            text_weights (dict): Repetições de cada coluna no texto combinado
+
+        Returns:
+            WineRecommender: Modelo treinado
+        """
+        from backend.app.core.wine_recommender_chunks import fit_from_chunks
+
+        return fit_from_chunks(cls.__new__(cls), source, stop_words, text_weights)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attribute in self._transient_attributes:
+            state.pop(attribute, None)
+        return state
+
+    def prepare_features(self):
+        """Definir aqui quais colunas serão usadas para definir a similaridade"""
+        self.text_columns = list(self.TEXT_COLUMNS)
+        self.categoric_columns = list(self.CATEGORIC_COLUMNS)
+        self.ordinal_columns = list(self.ORDINAL_COLUMNS)
 
         # Verificar se todas as colunas existem no DataFrame
         for column in self.text_columns + self.categoric_columns + self.ordinal_columns:
@@ -58,6 +218,10 @@ class WineRecommender:
             col for col in self.ordinal_columns if col in self.df.columns
         ]
 
+        # Índices dos filtros, com os valores originais (antes da codificação)
+        self.filter_index = FilterIndex.from_frame(self.df)
+        self.vocabulary = WineVocabulary.from_frame(self.df)
+
         # Calcular o valor médio para cada variável ordinal
         self.ordinal_means = {}
         for column in self.ordinal_columns:
@@ -82,36 +246,37 @@ class WineRecommender:
             self.label_encoders[column] = le
 
         # Lidamos com nulos e realizamos um join em todas as características de texto em uma coluna.
-        self.df["combined_text_features"] = (
-            self.df[self.text_columns]
-            .fillna("")
-            .apply(lambda x: " ".join(x.astype(str)), axis=1)
-        )
+        self.text_assembler = TextAssembler(self.text_columns, self.text_weights)
+        self.df["combined_text_features"] = self.text_assembler.assemble(self.df)
 
         # Carregar o modelo de palavras conectivas em PT-BR
-        nlp = spacy.load("pt_core_news_sm")
-        stopwords_spacy = nlp.Defaults.stop_words
+        stopwords_spacy = load_stop_words()
 
         # Realizamos uma Vetorização TF-IDF
-        self.vectorizer = TfidfVectorizer(
-            min_df=2,  # Ignora termos muito raros
-            max_df=0.8,  # Ignora termos muito frequentes
-            ngram_range=(1, 2),  # Unigramas e bigramas
-            stop_words=list(
-                stopwords_spacy
-            ),  # Podemos adicionar uma lista personalizada depois
-        )
+        if self.text_mode == "hashing":
+            # Espaço fixo de colunas, sem vocabulário em memória
+            self.vectorizer = HashingTfidfVectorizer(
+                min_df=2,
+                max_df=0.8,
+                ngram_range=(1, 2),
+                stop_words=stopwords_spacy,
+            )
+        else:
+            self.vectorizer = TfidfVectorizer(
+                min_df=2,  # Ignora termos muito raros
+                max_df=0.8,  # Ignora termos muito frequentes
+                ngram_range=(1, 2),  # Unigramas e bigramas
+                stop_words=list(
+                    stopwords_spacy
+                ),  # Podemos adicionar uma lista personalizada depois
+            )
 
         self.text_matrix = self.vectorizer.fit_transform(
             self.df["combined_text_features"]
         )
 
         # Adicionando pesos para cada tipo de feature
-        self.feature_weights = {
-            "text": 0.4,  # Peso para features textuais
-            "ordinal": 0.4,  # Peso para features ordinais
-            "categoric": 0.2,  # Peso para features categóricas
-        }
+        self.feature_weights = dict(DEFAULT_FEATURE_WEIGHTS)
 
         # Normalização de características numéricas - corrigindo para usar o scaler corretamente
         self.numeric_scaler = MinMaxScaler()
@@ -126,22 +291,98 @@ class WineRecommender:
         else:
             self.numeric_features_normalized = np.array([])
 
+    def compact(self, keep_columns=None):
+        """
+        Reduz a memória do modelo treinado para servir recomendações.
+
+        - Matriz TF-IDF e features ordinais normalizadas em float32
+          (o vetorizador passa a gerar as consultas em float32).
+        - self.df fica só com id (int32), as colunas ordinais (códigos uint8)
+          e categóricas (códigos inteiros mínimos), além de keep_columns
+          (textos viram dtype category). Os textos longos e
+          combined_text_features são descartados.
+        - Remove vectorizer.stop_words_, que guarda todos os termos cortados
+          por min_df/max_df e só serve para inspeção (no modo hashing,
+          descarta as frequências de documento usadas só no ajuste).
+
+        As recomendações continuam disponíveis; avaliações que dependem dos
+        textos (analyze_recommendation_behavior ou o avaliador sem dataframe)
+        precisam do catálogo original.
+
+        Args:
+            keep_columns (list): Colunas extras a manter em self.df
+
+        Returns:
+            dict: Tamanho das estruturas (MB) antes e depois
+        """
+        before = self._feature_nbytes()
+
+        self.text_matrix = self.text_matrix.astype(np.float32).tocsr()
+        self.vectorizer.dtype = np.float32
+        self._query_vector_cache = None
+        if hasattr(self.vectorizer, "stop_words_"):
+            del self.vectorizer.stop_words_
+        if hasattr(self.vectorizer, "compact"):
+            self.vectorizer.compact()
+        if len(self.numeric_features_normalized):
+            self.numeric_features_normalized = self.numeric_features_normalized.astype(
+                np.float32
+            )
+
+        self.df = compact_frame(
+            self.df,
+            self.ordinal_columns + self.categoric_columns + list(keep_columns or []),
+        )
+        self.lean = True
+        if getattr(self, "ordinal_table", None) is not None:
+            # As matrizes em float32 invalidam as tabelas pré-calculadas
+            self.build_ordinal_table()
+        table = getattr(self, "recommendation_table", None)
+        if table is not None:
+            self.build_recommendation_table(
+                table.top_n, table.diversity_factor, table.context_columns
+            )
+        index = getattr(self, "cluster_index", None)
+        if index is not None:
+            self.build_cluster_index(index.n_clusters, index.n_probe, index.random_state)
+        embedding = getattr(self, "text_embedding", None)
+        if embedding is not None:
+            mode = self._text_similarity_mode()
+            self.build_text_embedding(embedding.n_components)
+            self.set_text_similarity(mode)
+
+        after = self._feature_nbytes()
+        print(
+            f"Modelo compactado: {before / 1024**2:.1f} MB -> {after / 1024**2:.1f} MB"
+        )
+        return {"before_mb": before / 1024**2, "after_mb": after / 1024**2}
+
+    def _feature_nbytes(self):
+        """Bytes ocupados por self.df, pela matriz TF-IDF e pelas features ordinais."""
+        text_matrix = self.text_matrix
+        return (
+            int(self.df.memory_usage(deep=True).sum())
+            + text_matrix.data.nbytes
+            + text_matrix.indices.nbytes
+            + text_matrix.indptr.nbytes
+            + self.numeric_features_normalized.nbytes
+        )
+
     def encode_input(self, input_features):
         """
         Codifica as variáveis de entrada usando os codificadores definidos no modelo.
         """
         encoded_features = {}
+        input_features = self.resolve_input(input_features)
 
         # Codificar variáveis categóricas
-        for col, encoder in self.label_encoders.items():
+        for col in self.label_encoders:
             if col in input_features:
-                try:
-                    encoded_features[col] = encoder.transform(
-                        [str(input_features[col])]
-                    )[0]
-                except:
+                code = self._category_code(col, input_features[col])
+                if code is None:
                     print(f"Erro ao codificar {col}. Usando valor padrão.")
-                    encoded_features[col] = 0
+                    code = 0
+                encoded_features[col] = code
 
         # Codificar variáveis ordinais
         for col, encoder in self.ordinal_encoders.items():
@@ -155,8 +396,71 @@ class WineRecommender:
 
         return encoded_features
 
+    def resolve_input(self, input_features):
+        """
+        Troca país, região, tipo, uvas e harmonização da consulta pelos valores do catálogo.
+
+        Cada valor (ou termo separado por vírgula) é resolvido pelo vocabulário
+        do modelo (wine_recommender_vocabulary), sem diferença de maiúsculas e
+        acentos e tolerando erros de digitação; valores não reconhecidos são
+        mantidos. Modelos salvos antes do vocabulário devolvem a consulta como
+        veio.
+
+        Args:
+            input_features (dict): Features da consulta
+
+        Returns:
+            dict: Features com os valores resolvidos
+        """
+        vocabulary = getattr(self, "vocabulary", None)
+        if vocabulary is None:
+            return input_features
+        with span(RECOMMENDER_STAGE_SECONDS, stage="resolve"):
+            return {
+                k: vocabulary.canonicalize(k, v) if k in vocabulary else v
+                for k, v in input_features.items()
+            }
+
+    def complete(self, column, prefix, limit=DEFAULT_COMPLETIONS):
+        """
+        Sugestões de autocompletar de um campo livre.
+
+        Args:
+            column (str): Coluna do vocabulário (ex.: technical_sheet_country)
+            prefix (str): Texto já digitado
+            limit (int): Quantidade máxima de sugestões
+
+        Returns:
+            list: Valores do catálogo, dos mais frequentes
+
+        Raises:
+            ValueError: Se a coluna não tiver vocabulário ou o modelo não tiver um
+        """
+        vocabulary = getattr(self, "vocabulary", None)
+        if vocabulary is None:
+            raise ValueError("Modelo sem vocabulário: treine o modelo novamente")
+        return vocabulary.complete(column, prefix, limit)
+
+    def _category_code(self, column, value):
+        """Código do LabelEncoder de um valor categórico, ou None se for desconhecido."""
+        classes = self.label_encoders[column].classes_
+        value = str(value)
+        position = int(np.searchsorted(classes, value))
+        if position < len(classes) and classes[position] == value:
+            return position
+        return None
+
+    @timed(RECOMMENDER_QUERY_SECONDS)
     def recommend_wines(
-        self, input_features, top_n=5, diversity_factor=0.5, random_state=None
+        self,
+        input_features,
+        top_n=5,
+        diversity_factor=0.5,
+        random_state=None,
+        feature_weights=None,
+        scoring=None,
+        filters=None,
+        n_probe=None,
     ):
         """
         Versão final corrigida e otimizada
@@ -166,141 +470,1273 @@ class WineRecommender:
             top_n (int): Quantidade de recomendações
             diversity_factor (float): 0-1 (0=sem diversificação, 1=máxima diversificação)
             random_state (int): Seed para reprodutibilidade
+            feature_weights (dict): Pesos a usar nesta consulta no lugar de self.feature_weights
+            scoring (str): "legacy" ou "fused" (None = self.scoring)
+            filters (dict): Restringe as recomendações por atributo (ver
+                filter_positions); as similaridades só são calculadas nos
+                vinhos selecionados
+            n_probe (int): Clusters pontuados com o índice de clusters (ver
+                build_cluster_index); None = padrão do índice, 0 = busca completa
         """
+        if feature_weights is None:
+            feature_weights = self.feature_weights
+
         # 1. Pré-processamento das features de entrada
         input_features = {
             k: v
             for k, v in input_features.items()
             if k in self.text_columns + self.ordinal_columns + self.categoric_columns
         }
+        input_features = self.resolve_input(input_features)
+
+        subset = self.filter_positions(filters)
+        if subset is not None and not len(subset):
+            return []
+
+        scoring = scoring or self._scoring()
+        # A tabela foi gerada com o roteamento padrão: um n_probe explícito a ignora
+        if subset is None and n_probe is None:
+            precomputed = self._precomputed_recommendations(
+                [input_features], top_n, diversity_factor, feature_weights, scoring
+            )[0]
+            if precomputed is not None:
+                return precomputed
+        if scoring == "legacy":
+            indexed = self._indexed_similarities(
+                [input_features], n_probe, feature_weights, subset
+            )
+            if indexed is not None:
+                if indexed[0] is None:
+                    return []
+                return self._rank_candidates(
+                    indexed[0], top_n, diversity_factor, random_state, subset
+                )
+        subset = self._route([input_features], n_probe, top_n, feature_weights, subset)[0]
+
+        if subset is None:
+            ranked = self._sharded_top_k(input_features, top_n, feature_weights, scoring)
+            if ranked is not None:
+                if not len(ranked[0]):
+                    return []
+                return self._select_candidates(
+                    *ranked, top_n, diversity_factor, random_state
+                )
+
+        if scoring == "fused":
+            final_similarity = next(
+                self._fused_similarities([input_features], feature_weights)
+            )
+            if final_similarity is None:
+                return []
+            if subset is not None:
+                final_similarity = final_similarity[subset]
+            return self._rank_candidates(
+                final_similarity, top_n, diversity_factor, random_state, subset
+            )
 
         # 2. Cálculo das similaridades individuais
-        similarities = []
+        components = self._component_similarities(
+            input_features,
+            [name for name in ("text", "ordinal") if feature_weights[name] > 0],
+            subset,
+        )
+        similarities = [
+            similarity * feature_weights[name]
+            for name, similarity in components.items()
+        ]
 
-        # Similaridade textual
-        if self.text_columns and self.feature_weights["text"] > 0:
-            text_input = {
-                k: v
-                for k, v in input_features.items()
-                if k in self.text_columns and v is not None
-            }
-            if text_input:
-                input_text = " ".join(str(v) for v in text_input.values())
-                input_vector = self.vectorizer.transform([input_text])
-                text_sim = cosine_similarity(input_vector, self.text_matrix)[0]
-                text_sim = (text_sim - text_sim.min()) / (
-                    text_sim.max() - text_sim.min() + 1e-10
+        # 3. Combinação das similaridades
+        if not similarities:
+            return []
+
+        final_similarity = np.sum(similarities, axis=0)
+
+        return self._rank_candidates(
+            final_similarity, top_n, diversity_factor, random_state, subset
+        )
+
+    def recommend_wines_batch(
+        self,
+        inputs,
+        top_n=5,
+        diversity_factor=0.5,
+        random_state=None,
+        feature_weights=None,
+        scoring=None,
+        filters=None,
+        n_probe=None,
+    ):
+        """
+        Recomenda vinhos para várias consultas de uma vez.
+
+        A vetorização e a similaridade textual de todas as consultas são feitas
+        numa única chamada esparsa; o restante segue o mesmo caminho de
+        recommend_wines, com o mesmo resultado por consulta.
+
+        Args:
+            inputs (list): Lista de dicionários de features
+            top_n (int): Quantidade de recomendações por consulta
+            diversity_factor (float): 0-1 (0=sem diversificação, 1=máxima diversificação)
+            random_state (int): Seed para reprodutibilidade
+            feature_weights (dict): Pesos a usar no lugar de self.feature_weights
+            scoring (str): "legacy" ou "fused" (None = self.scoring)
+            filters (dict): Filtro por atributo aplicado a todas as consultas
+            n_probe (int): Clusters pontuados por consulta (ver recommend_wines)
+
+        Returns:
+            list: Lista de ids recomendados para cada consulta
+        """
+        if feature_weights is None:
+            feature_weights = self.feature_weights
+
+        valid_columns = self.text_columns + self.ordinal_columns + self.categoric_columns
+        inputs = [
+            self.resolve_input(
+                {k: v for k, v in input_features.items() if k in valid_columns}
+            )
+            for input_features in inputs
+        ]
+
+        subset = self.filter_positions(filters)
+        if subset is not None and not len(subset):
+            return [[] for _ in inputs]
+
+        scoring = scoring or self._scoring()
+        if subset is None and n_probe is None:
+            results = self._precomputed_recommendations(
+                inputs, top_n, diversity_factor, feature_weights, scoring
+            )
+        else:
+            results = [None] * len(inputs)
+        pending = [i for i, ids in enumerate(results) if ids is None]
+        if scoring == "legacy" and pending:
+            indexed = self._indexed_similarities(
+                [inputs[i] for i in pending], n_probe, feature_weights, subset
+            )
+            if indexed is not None:
+                for i, final_similarity in zip(pending, indexed):
+                    results[i] = (
+                        []
+                        if final_similarity is None
+                        else self._rank_candidates(
+                            final_similarity,
+                            top_n,
+                            diversity_factor,
+                            random_state,
+                            subset,
+                        )
+                    )
+                return results
+        routes = self._route(
+            [inputs[i] for i in pending], n_probe, top_n, feature_weights, subset
+        )
+
+        # Consultas que caem nos mesmos clusters são calculadas juntas
+        groups = {}
+        for i, route in zip(pending, routes):
+            key = None if route is subset else route.tobytes()
+            groups.setdefault(key, (route, []))[1].append(i)
+        for route, group in groups.values():
+            computed = self._compute_batch(
+                [inputs[i] for i in group],
+                top_n,
+                diversity_factor,
+                random_state,
+                feature_weights,
+                scoring,
+                route,
+            )
+            for i, ids in zip(group, computed):
+                results[i] = ids
+        return results
+
+    def _compute_batch(
+        self,
+        inputs,
+        top_n,
+        diversity_factor,
+        random_state,
+        feature_weights,
+        scoring,
+        subset=None,
+    ):
+        """Recomendações de várias consultas (já filtradas) pelo scoring."""
+        if scoring == "fused":
+            return [
+                []
+                if final_similarity is None
+                else self._rank_candidates(
+                    final_similarity if subset is None else final_similarity[subset],
+                    top_n,
+                    diversity_factor,
+                    random_state,
+                    subset,
                 )
-                similarities.append(text_sim * self.feature_weights["text"])
+                for final_similarity in self._fused_similarities(inputs, feature_weights)
+            ]
 
-        # Similaridade ordinal
-        if self.ordinal_columns and self.feature_weights["ordinal"] > 0:
-            ordinal_input = {
-                k: v
-                for k, v in input_features.items()
-                if k in self.ordinal_columns and v is not None
-            }
-            if ordinal_input:
-                input_ordinal = []
-                for col in self.ordinal_columns:
-                    if col in ordinal_input:
-                        try:
-                            value = float(ordinal_input[col])
-                            encoded = self.ordinal_encoders[col].transform([[value]])[
-                                0
-                            ][0]
-                            input_ordinal.append(encoded)
-                        except:
-                            input_ordinal.append(self.ordinal_means[col])
-                    else:
-                        input_ordinal.append(self.ordinal_means[col])
+        text_sims = [None] * len(inputs)
+        if feature_weights["text"] > 0:
+            text_sims = self._text_similarities_batch(inputs, subset)
+
+        results = []
+        for input_features, text_sim in zip(inputs, text_sims):
+            similarities = []
+            if text_sim is not None:
+                similarities.append(text_sim * feature_weights["text"])
+            if feature_weights["ordinal"] > 0:
+                ordinal_sim = self._ordinal_similarity(input_features, subset)
+                if ordinal_sim is not None:
+                    similarities.append(ordinal_sim * feature_weights["ordinal"])
+
+            if not similarities:
+                results.append([])
+                continue
+
+            results.append(
+                self._rank_candidates(
+                    np.sum(similarities, axis=0),
+                    top_n,
+                    diversity_factor,
+                    random_state,
+                    subset,
+                )
+            )
+        return results
 
-                input_ordinal = np.array(input_ordinal).reshape(1, -1)
-                input_normalized = self.numeric_scaler.transform(input_ordinal)
+    def similar_wines(
+        self,
+        wine_id,
+        top_n=5,
+        diversity_factor=0.5,
+        random_state=None,
+        feature_weights=None,
+    ):
+        """
+        Recomenda vinhos parecidos com um vinho do catálogo.
+
+        Usa diretamente o vetor TF-IDF e as features ordinais já normalizadas
+        do vinho, sem reconstruir a consulta, e exclui o próprio vinho.
+
+        Args:
+            wine_id (int): Id do vinho de referência
+            top_n (int): Quantidade de recomendações
+            diversity_factor (float): 0-1 (0=sem diversificação, 1=máxima diversificação)
+            random_state (int): Seed para reprodutibilidade
+            feature_weights (dict): Pesos a usar no lugar de self.feature_weights
+
+        Returns:
+            list ou None: Ids recomendados, ou None se o id não existir
+        """
+        if feature_weights is None:
+            feature_weights = self.feature_weights
+
+        positions = np.flatnonzero(self.df["id"].to_numpy() == wine_id)
+        if len(positions) == 0:
+            return None
+        position = positions[0]
+
+        similarities = []
+        if feature_weights["text"] > 0 and self.text_columns:
+            with span(RECOMMENDER_STAGE_SECONDS, stage="text_similarity"):
+                embedding = self._active_embedding()
+                if embedding is None:
+                    text_sim = cosine_similarity(
+                        self.text_matrix[position], self.text_matrix
+                    )[0]
+                else:
+                    text_sim = embedding.item_vectors @ embedding.item_vectors[position]
+                text_sim = (text_sim - text_sim.min()) / (
+                    text_sim.max() - text_sim.min() + 1e-10
+                )
+            similarities.append(text_sim * feature_weights["text"])
+        if feature_weights["ordinal"] > 0 and self.ordinal_columns:
+            with span(RECOMMENDER_STAGE_SECONDS, stage="ordinal_similarity"):
                 distances = np.linalg.norm(
-                    self.numeric_features_normalized - input_normalized, axis=1
+                    self.numeric_features_normalized
+                    - self.numeric_features_normalized[position],
+                    axis=1,
                 )
                 ordinal_sim = 1 / (1 + distances)
                 ordinal_sim = (ordinal_sim - ordinal_sim.min()) / (
                     ordinal_sim.max() - ordinal_sim.min() + 1e-10
                 )
-                similarities.append(ordinal_sim * self.feature_weights["ordinal"])
+            similarities.append(ordinal_sim * feature_weights["ordinal"])
 
-        # 3. Combinação das similaridades
         if not similarities:
             return []
 
         final_similarity = np.sum(similarities, axis=0)
+        # O próprio vinho vai para o fim do ranking
+        final_similarity[position] = final_similarity.min() - 1
+
+        recommendations = self._rank_candidates(
+            final_similarity, top_n, diversity_factor, random_state
+        )
+        return [i for i in recommendations if i != wine_id]
+
+    def _rank_candidates(
+        self, final_similarity, top_n, diversity_factor, random_state, subset=None
+    ):
+        """
+        Seleciona os candidatos pela similaridade final e aplica a diversificação.
+
+        Args:
+            final_similarity (np.ndarray): Similaridade ponderada com todos os
+                vinhos (ou com os vinhos de subset)
+            top_n (int): Quantidade de recomendações
+            diversity_factor (float): 0-1 (0=sem diversificação)
+            random_state (int): Seed para reprodutibilidade
+            subset (np.ndarray): Posições dos vinhos de final_similarity
+                (None = todos)
 
+        Returns:
+            list: Ids dos vinhos recomendados
+        """
         # 4. Seleção dos candidatos iniciais (top 3*top_n mais similares)
 
         # candidate_size = min(3*top_n, len(self.df))
-        candidate_size = min(5 * top_n, len(self.df))  # Antes era 3*top_n
+        candidate_size = min(5 * top_n, len(final_similarity))  # Antes era 3*top_n
         ############################################
-        top_candidates_idx = final_similarity.argsort()[-candidate_size:][::-1]
+        with span(RECOMMENDER_STAGE_SECONDS, stage="topk"):
+            top_candidates_idx = final_similarity.argsort()[-candidate_size:][::-1]
+            top_scores = final_similarity[top_candidates_idx]
+            if subset is not None:
+                top_candidates_idx = subset[top_candidates_idx]
+        return self._select_candidates(
+            top_candidates_idx, top_scores, top_n, diversity_factor, random_state
+        )
+
+    def _select_candidates(
+        self, top_candidates_idx, top_scores, top_n, diversity_factor, random_state
+    ):
+        """
+        Ids recomendados a partir dos candidatos já ordenados por similaridade.
+
+        Args:
+            top_candidates_idx (np.ndarray): Posições dos candidatos em self.df
+            top_scores (np.ndarray): Similaridade final de cada candidato
+            top_n (int): Quantidade de recomendações
+            diversity_factor (float): 0-1 (0=sem diversificação)
+            random_state (int): Seed para reprodutibilidade
+
+        Returns:
+            list: Ids dos vinhos recomendados
+        """
         candidates = self.df.iloc[top_candidates_idx].copy()
-        candidates["similarity"] = final_similarity[top_candidates_idx]
+        candidates["similarity"] = top_scores
 
         # 5. Diversificação (ou não)
         if diversity_factor <= 0:
             return candidates.head(top_n)["id"].tolist()
 
-        return self._safe_diversify(
-            candidates=candidates,
-            text_matrix=self.text_matrix[top_candidates_idx],
-            similarity_scores=candidates["similarity"].values,
+        with span(RECOMMENDER_STAGE_SECONDS, stage="mmr"):
+            return self._safe_diversify(
+                candidates=candidates,
+                text_matrix=self._diversity_vectors(top_candidates_idx),
+                similarity_scores=candidates["similarity"].values,
+                top_n=top_n,
+                lambda_param=diversity_factor,
+                random_state=random_state,
+            )
+
+    def enable_component_cache(self, max_entries=None):
+        """
+        Ativa o cache das similaridades por componente (sem pesos) por consulta.
+
+        Útil quando só feature_weights ou diversity_factor mudam entre avaliações
+        das mesmas consultas: a recomendação vira uma combinação linear dos
+        vetores em cache.
+
+        Args:
+            max_entries (int): Máximo de consultas em cache (None = sem limite)
+        """
+        if getattr(self, "_component_cache", None) is None:
+            self._component_cache = {}
+        self._component_cache_max_entries = max_entries
+
+    def disable_component_cache(self):
+        """Desativa e limpa o cache de similaridades por componente."""
+        self._component_cache = None
+
+    def _component_similarities(
+        self, input_features, components=("text", "ordinal"), subset=None
+    ):
+        """
+        Calcula as similaridades normalizadas (0-1) e sem peso de cada componente.
+
+        Args:
+            input_features (dict): Features da consulta já filtradas
+            components (list): Componentes desejados ("text", "ordinal")
+            subset (np.ndarray): Posições dos vinhos considerados (None = todos;
+                com subset o cache não é usado)
+
+        Returns:
+            dict: Vetor de similaridade com todos os vinhos por componente;
+                componentes sem entrada na consulta ficam de fora
+        """
+        cache = getattr(self, "_component_cache", None) if subset is None else None
+        if cache is None:
+            cached = {}
+        else:
+            key = tuple(sorted((k, str(v)) for k, v in input_features.items()))
+            cached = cache.get(key)
+            if cached is None:
+                max_entries = self._component_cache_max_entries
+                if max_entries is not None and len(cache) >= max_entries:
+                    cache.pop(next(iter(cache)))
+                cached = cache[key] = {}
+
+        similarities = {}
+        for name in components:
+            if name not in cached:
+                if name == "text":
+                    cached[name] = self._text_similarity(input_features, subset)
+                else:
+                    cached[name] = self._ordinal_similarity(input_features, subset)
+            if cached[name] is not None:
+                similarities[name] = cached[name]
+        return similarities
+
+    def _text_assembler(self):
+        """Montador do texto das consultas (modelos antigos não guardam um)."""
+        assembler = getattr(self, "text_assembler", None)
+        if assembler is None:
+            assembler = self.text_assembler = TextAssembler(self.text_columns)
+        return assembler
+
+    def enable_text_cache(self, max_entries=DEFAULT_TEXT_CACHE_SIZE):
+        """
+        Ativa (padrão) o cache da vetorização dos campos de texto das consultas.
+
+        Os campos (harmonização, país, uva...) se repetem muito entre
+        consultas; o QueryVectorCache guarda as contagens de termos de cada
+        campo e monta o vetor da consulta por soma, com o mesmo resultado de
+        vectorizer.transform. Acertos e faltas vão para
+        evino_recommender_text_cache_total.
+
+        Args:
+            max_entries (int): Máximo de campos em cache (LRU)
+        """
+        self.text_cache_size = max_entries
+        self._query_vector_cache = None
+
+    def disable_text_cache(self):
+        """Desativa o cache da vetorização das consultas."""
+        self.text_cache_size = 0
+        self._query_vector_cache = None
+
+    def text_cache_stats(self):
+        """Acertos, faltas, taxa de acerto e tamanho do cache (None se desativado)."""
+        cache = self._text_cache()
+        return None if cache is None else cache.stats()
+
+    def _text_cache(self):
+        """Cache da vetorização das consultas (None se desativado ou sem suporte)."""
+        cache = getattr(self, "_query_vector_cache", None)
+        if cache is None:
+            size = getattr(self, "text_cache_size", DEFAULT_TEXT_CACHE_SIZE)
+            # False marca o cache já avaliado e desativado neste processo
+            cache = False
+            if size:
+                cache = QueryVectorCache(self.vectorizer, size, _record_text_cache)
+                if not cache.supported:
+                    cache = False
+            self._query_vector_cache = cache
+        # Um cache vazio tem len() 0: a comparação é com o marcador, não por verdade
+        return None if cache is False else cache
+
+    def _vectorize_queries(self, queries):
+        """
+        Matriz TF-IDF das consultas.
+
+        Args:
+            queries (list): Campos de texto de cada consulta (query_parts)
+
+        Returns:
+            sp.csr_matrix: Uma linha por consulta
+        """
+        cache = self._text_cache()
+        with span(RECOMMENDER_STAGE_SECONDS, stage="vectorize"):
+            if cache is None:
+                return self.vectorizer.transform([" ".join(parts) for parts in queries])
+            return cache.transform(queries)
+
+    def _text_matrix(self, subset=None):
+        """Matriz TF-IDF de todos os vinhos ou só das linhas de subset."""
+        return self.text_matrix if subset is None else self.text_matrix[subset]
+
+    def _text_cosines(self, input_vectors, subset=None):
+        """Cosseno das consultas com os vinhos (ou subset), no TF-IDF ou no embedding."""
+        embedding = self._active_embedding()
+        if embedding is None:
+            return cosine_similarity(input_vectors, self._text_matrix(subset))
+        return embedding.similarities(embedding.transform(input_vectors), subset)
+
+    def _diversity_vectors(self, positions):
+        """Vetores de texto dos candidatos usados na diversificação (MMR)."""
+        embedding = self._active_embedding()
+        if embedding is None:
+            return self.text_matrix[positions]
+        return embedding.item_vectors[positions]
+
+    def build_text_embedding(self, n_components=DEFAULT_EMBEDDING_DIM, random_state=42):
+        """
+        Gera o embedding denso do texto (TruncatedSVD) e passa a usá-lo.
+
+        Com o embedding, a similaridade textual (e a diversificação) usa
+        produtos densos em float32 entre os vetores SVD dos vinhos e a consulta
+        projetada, em vez do cosseno no TF-IDF esparso
+        (wine_recommender_embedding). A similaridade é aproximada; ver
+        set_text_similarity para voltar ao TF-IDF. O scoring "fused" continua
+        usando o TF-IDF. Deve ser gerado de novo quando o modelo for
+        retreinado.
+
+        Args:
+            n_components (int): Dimensões do embedding
+            random_state (int): Seed do TruncatedSVD
+
+        Returns:
+            TextEmbedding: O embedding
+        """
+        with span(RECOMMENDER_STAGE_SECONDS, stage="embedding_build"):
+            self.text_embedding = TextEmbedding(self, n_components, random_state)
+        self._text_embedding_checked = True
+        print(
+            f"Embedding de texto gerado: {self.text_embedding.n_components} dimensões, "
+            f"{self.text_embedding.explained_variance:.1%} da variância, "
+            f"{self.text_embedding.nbytes / 1024**2:.1f} MB"
+        )
+        self.set_text_similarity("embedding")
+        return self.text_embedding
+
+    def set_text_similarity(self, mode):
+        """
+        Define como a similaridade textual é calculada.
+
+        Args:
+            mode (str): "sparse" (cosseno no TF-IDF) ou "embedding" (produto
+                denso no embedding SVD, ver build_text_embedding)
+        """
+        if mode not in TEXT_SIMILARITY_MODES:
+            raise ValueError(f"mode deve ser um de {TEXT_SIMILARITY_MODES}")
+        if mode == "embedding" and self._text_embedding() is None:
+            raise ValueError("Modelo sem embedding de texto: use build_text_embedding")
+        self.text_similarity_mode = mode
+        # Similaridades em cache foram calculadas no outro modo
+        if getattr(self, "_component_cache", None):
+            self._component_cache = {}
+
+    def _text_similarity_mode(self):
+        """Modo da similaridade textual em uso ("sparse" sem embedding válido)."""
+        mode = getattr(self, "text_similarity_mode", "sparse")
+        if mode == "embedding" and self._text_embedding() is None:
+            return "sparse"
+        return mode
+
+    def _text_embedding(self):
+        """Embedding de texto, validado uma vez por processo."""
+        embedding = getattr(self, "text_embedding", None)
+        if embedding is None or getattr(self, "_text_embedding_checked", False):
+            return embedding
+        if not embedding.matches(self):
+            print("Aviso: Embedding de texto não corresponde ao modelo e será ignorado")
+            embedding = self.text_embedding = None
+        self._text_embedding_checked = True
+        return embedding
+
+    def _active_embedding(self):
+        """Embedding em uso pela similaridade textual (None no modo sparse)."""
+        if self._text_similarity_mode() == "embedding":
+            return self._text_embedding()
+        return None
+
+    def _text_similarity(self, input_features, subset=None):
+        """Similaridade textual normalizada da consulta com todos os vinhos (ou subset)."""
+        if not self.text_columns:
+            return None
+
+        parts = self._text_assembler().query_parts(input_features)
+        if not parts:
+            return None
+
+        input_vector = self._vectorize_queries([parts])
+        with span(RECOMMENDER_STAGE_SECONDS, stage="text_similarity"):
+            text_sim = self._text_cosines(input_vector, subset)[0]
+            return (text_sim - text_sim.min()) / (
+                text_sim.max() - text_sim.min() + 1e-10
+            )
+
+    def _text_similarities_batch(self, inputs, subset=None):
+        """Similaridades textuais normalizadas de várias consultas numa só chamada."""
+        results = [None] * len(inputs)
+        if not self.text_columns:
+            return results
+
+        assembler = self._text_assembler()
+        texts, positions = [], []
+        for position, input_features in enumerate(inputs):
+            parts = assembler.query_parts(input_features)
+            if parts:
+                texts.append(parts)
+                positions.append(position)
+
+        if texts:
+            input_vectors = self._vectorize_queries(texts)
+            with span(RECOMMENDER_STAGE_SECONDS, stage="text_similarity"):
+                text_sims = self._text_cosines(input_vectors, subset)
+                for position, text_sim in zip(positions, text_sims):
+                    results[position] = (text_sim - text_sim.min()) / (
+                        text_sim.max() - text_sim.min() + 1e-10
+                    )
+        return results
+
+    def filter_positions(self, filters):
+        """
+        Posições dos vinhos que atendem a um filtro por atributo.
+
+        O filtro é um dicionário coluna -> valor ou lista de valores, nas
+        colunas de FILTER_COLUMNS presentes no treino (país, tipo de vinho,
+        uvas, região e tipo de fechamento), ex.:
+        {"technical_sheet_country": ["Chile", "Argentina"],
+         "technical_sheet_grapes": "Malbec"}. Valores de uma coluna se somam e
+        as colunas se combinam; a comparação ignora maiúsculas e acentos.
+
+        Args:
+            filters (dict): Filtro (None ou vazio = sem filtro)
+
+        Returns:
+            np.ndarray ou None: Posições em self.df, ou None sem filtro
+
+        Raises:
+            ValueError: Se o filtro for inválido ou o modelo não tiver índice
+        """
+        if not filters:
+            return None
+        index = getattr(self, "filter_index", None)
+        if index is None:
+            raise ValueError("Modelo sem índice de filtros: treine o modelo novamente")
+        with span(RECOMMENDER_STAGE_SECONDS, stage="filter"):
+            return index.positions(filters)
+
+    def build_recommendation_table(
+        self, top_n=5, diversity_factor=0.5, context_columns=None
+    ):
+        """
+        Materializa as recomendações das consultas só com os sliders.
+
+        Gera o top-N diversificado das 625 combinações dos sliders com os
+        parâmetros e o scoring atuais do modelo (e, com context_columns, de
+        cada combinação junto com um valor conhecido de uma dessas colunas).
+        recommend_wines e recommend_wines_batch respondem essas consultas pela
+        tabela quando top_n, diversity_factor, feature_weights e scoring são os
+        mesmos da geração e a consulta não informa n_probe (a tabela usa o
+        roteamento padrão do índice de clusters). Deve ser gerada de novo
+        quando o modelo for retreinado ou os pesos mudarem.
+
+        Args:
+            top_n (int): Recomendações por consulta
+            diversity_factor (float): Fator de diversificação
+            context_columns (list): Colunas categóricas de contexto
+                (None = self.categoric_columns; [] = só os sliders)
+
+        Returns:
+            RecommendationTable ou None: A tabela (None sem colunas ordinais)
+        """
+        self.recommendation_table = None
+        if not self.ordinal_columns:
+            print("Sem colunas ordinais: tabela de recomendações não gerada")
+            return None
+
+        if context_columns is None:
+            context_columns = self.categoric_columns
+        self.recommendation_table = RecommendationTable(
+            self, top_n, diversity_factor, context_columns
+        )
+        self._recommendation_table_checked = True
+        print(
+            f"Tabela de recomendações gerada: {len(self.recommendation_table)} "
+            f"consultas, {self.recommendation_table.nbytes / 1024**2:.1f} MB"
+        )
+        return self.recommendation_table
+
+    def _recommendation_table(self):
+        """Tabela de recomendações, validada uma vez por processo."""
+        table = getattr(self, "recommendation_table", None)
+        if table is None or getattr(self, "_recommendation_table_checked", False):
+            return table
+        if not table.matches(self):
+            print("Aviso: Tabela de recomendações não corresponde ao modelo e será ignorada")
+            table = self.recommendation_table = None
+        self._recommendation_table_checked = True
+        return table
+
+    def _precomputed_recommendations(
+        self, inputs, top_n, diversity_factor, feature_weights, scoring
+    ):
+        """Recomendações da tabela materializada (None nas consultas fora dela)."""
+        table = self._recommendation_table()
+        if table is None or not table.serves(
+            top_n, diversity_factor, feature_weights, scoring, self._text_similarity_mode()
+        ):
+            return [None] * len(inputs)
+
+        results = [table.lookup(input_features) for input_features in inputs]
+        hits = sum(ids is not None for ids in results)
+        if hits:
+            increment(RECOMMENDER_TABLE_LOOKUPS_TOTAL, hits, result="hit")
+        if hits < len(results):
+            increment(RECOMMENDER_TABLE_LOOKUPS_TOTAL, len(results) - hits, result="miss")
+        return results
+
+    def build_cluster_index(self, n_clusters=None, n_probe=None, random_state=42):
+        """
+        Agrupa o catálogo com KMeans para pontuar só os clusters próximos da consulta.
+
+        Com o índice, recommend_wines e recommend_wines_batch no scoring
+        "fused" calculam as similaridades só nos vinhos dos n_probe clusters
+        cujos centróides estão mais próximos da consulta
+        (wine_recommender_clusters), como um filtro. O resultado é
+        aproximado: quanto maior n_probe, mais próximo da busca completa e
+        mais lenta a consulta. No scoring "legacy", o índice pontua o catálogo
+        inteiro de forma exata pelo TF-IDF transposto e pelas linhas ordinais
+        distintas, com o ranking da busca completa (n_probe=0 volta ao cálculo
+        sem o índice). Deve ser gerado de novo quando o modelo for retreinado
+        ou os pesos mudarem.
+
+        Args:
+            n_clusters (int): Quantidade de clusters (None = raiz quadrada do
+                número de vinhos)
+            n_probe (int): Clusters pontuados por consulta por padrão
+                (None = DEFAULT_N_PROBE)
+            random_state (int): Seed do KMeans
+
+        Returns:
+            ClusterIndex: O índice
+        """
+        if n_probe is None:
+            n_probe = DEFAULT_N_PROBE
+        with span(RECOMMENDER_STAGE_SECONDS, stage="cluster_build"):
+            self.cluster_index = ClusterIndex(
+                self, n_clusters, n_probe, random_state=random_state
+            )
+        self._cluster_index_checked = True
+        sizes = self.cluster_index.sizes
+        print(
+            f"Índice de clusters gerado: {self.cluster_index.n_clusters} clusters "
+            f"(de {sizes.min()} a {sizes.max()} vinhos), n_probe={n_probe}, "
+            f"{self.cluster_index.nbytes / 1024**2:.1f} MB"
+        )
+        return self.cluster_index
+
+    def _cluster_index(self):
+        """Índice de clusters, validado uma vez por processo."""
+        index = getattr(self, "cluster_index", None)
+        if index is None or getattr(self, "_cluster_index_checked", False):
+            return index
+        if not index.matches(self):
+            print("Aviso: Índice de clusters não corresponde ao modelo e será ignorado")
+            index = self.cluster_index = None
+        self._cluster_index_checked = True
+        return index
+
+    def _query_text_vectors(self, inputs):
+        """TF-IDF de cada consulta numa só vetorização (None nas consultas sem texto)."""
+        assembler = self._text_assembler()
+        texts, positions = [], []
+        for position, input_features in enumerate(inputs):
+            parts = assembler.query_parts(input_features)
+            if parts:
+                texts.append(parts)
+                positions.append(position)
+        text_vectors = [None] * len(inputs)
+        if texts:
+            vectors = self._vectorize_queries(texts).tocsr()
+            for row, position in enumerate(positions):
+                text_vectors[position] = vectors[row]
+        return text_vectors
+
+    def _indexed_similarities(self, inputs, n_probe, feature_weights, subset=None):
+        """
+        Similaridades finais "legacy" exatas das consultas pelo índice de clusters.
+
+        O min-max do scoring "legacy" usa os extremos de todos os vinhos
+        considerados, então o índice não roteia: pontua o catálogo inteiro com
+        o TF-IDF transposto (só os termos da consulta) e as linhas ordinais
+        distintas (ver ClusterIndex.legacy_similarity). O ranking é o da busca
+        completa.
+
+        Args:
+            inputs (list): Features das consultas (já filtradas)
+            n_probe (int): Clusters por consulta (0 = busca completa, sem o índice)
+            feature_weights (dict): Pesos da consulta
+            subset (np.ndarray): Posições do filtro por atributo (None = todos)
+
+        Returns:
+            list ou None: Similaridade final de cada consulta (None nas
+                consultas sem feature pontuável), ou None sem índice
+        """
+        index = self._cluster_index()
+        if index is None or n_probe == 0 or not inputs:
+            return None
+
+        text_vectors = [None] * len(inputs)
+        if feature_weights["text"] > 0 and self.text_columns:
+            text_vectors = self._query_text_vectors(inputs)
+        embedding = self._active_embedding()
+        results = []
+        with span(RECOMMENDER_STAGE_SECONDS, stage="indexed_score"):
+            for input_features, text_vector in zip(inputs, text_vectors):
+                text_cosines = None
+                if text_vector is not None:
+                    if embedding is None:
+                        text_cosines = index.text_cosines(text_vector)
+                    else:
+                        text_cosines = self._text_cosines(text_vector)[0]
+                ordinal_vector = None
+                if feature_weights["ordinal"] > 0:
+                    ordinal_vector = self._ordinal_query_vector(input_features)
+                results.append(
+                    index.legacy_similarity(
+                        text_cosines, ordinal_vector, feature_weights, subset
+                    )
+                )
+        return results
+
+    def _route(self, inputs, n_probe, top_n, feature_weights, subset=None):
+        """
+        Vinhos a pontuar em cada consulta "fused", pelo índice de clusters.
+
+        Args:
+            inputs (list): Features das consultas (já filtradas)
+            n_probe (int): Clusters por consulta (None = padrão do índice,
+                0 = busca completa)
+            top_n (int): Recomendações por consulta
+            feature_weights (dict): Pesos da consulta
+            subset (np.ndarray): Posições do filtro por atributo (None = todos)
+
+        Returns:
+            list: Posições de cada consulta; subset (o próprio objeto) nas
+                consultas que não passam pelo índice
+        """
+        index = self._cluster_index()
+        if n_probe is None and index is not None:
+            n_probe = index.n_probe
+        if index is None or not n_probe or n_probe >= index.n_clusters or not inputs:
+            return [subset] * len(inputs)
+
+        text_vectors = self._query_text_vectors(inputs)
+
+        # Candidatos da seleção de top_n (ver _rank_candidates)
+        min_candidates = 5 * top_n
+        routes = []
+        with span(RECOMMENDER_STAGE_SECONDS, stage="route"):
+            for input_features, text_vector in zip(inputs, text_vectors):
+                categoric = {}
+                for col in self.categoric_columns:
+                    if input_features.get(col) is not None:
+                        code = self._category_code(col, input_features[col])
+                        if code is not None:
+                            categoric[col] = code
+                scores = index.cluster_scores(
+                    text_vector,
+                    categoric,
+                    self._ordinal_query_vector(input_features),
+                    feature_weights,
+                )
+                if scores is None:
+                    routes.append(subset)
+                    continue
+                clusters = index.probe(scores, n_probe, min_candidates)
+                if len(clusters) >= index.n_clusters:
+                    routes.append(subset)
+                    continue
+                route = index.candidates(clusters)
+                if subset is not None:
+                    route = np.intersect1d(subset, route, assume_unique=True)
+                    if len(route) < min_candidates:
+                        # Filtro e clusters com poucos vinhos em comum
+                        route = subset
+                routes.append(route)
+        return routes
+
+    def set_scoring_threads(self, n_threads):
+        """
+        Define quantas threads calculam cada consulta de recommend_wines.
+
+        Com mais de uma thread, consultas sem filtro e sem roteamento por
+        clusters em catálogos com pelo menos 2 x MIN_SHARD_ROWS vinhos são
+        pontuadas por blocos de linhas num pool de threads, com top-k parcial
+        por bloco (wine_recommender_parallel); o resultado é o mesmo, a menos
+        da ordem de empates. O pool é criado na primeira consulta de cada
+        processo. O cache de componentes (enable_component_cache) desativa o
+        caminho paralelo.
+
+        Args:
+            n_threads (int): Threads por consulta (1 = sem paralelismo)
+        """
+        if n_threads < 1:
+            raise ValueError("n_threads deve ser pelo menos 1")
+        self.scoring_threads = int(n_threads)
+        scorer = getattr(self, "_sharded_scorer", None)
+        if scorer is not None:
+            scorer.close()
+            self._sharded_scorer = None
+
+    def _scoring_pool(self):
+        """ShardedScorer deste processo (None com uma thread)."""
+        n_threads = getattr(self, "scoring_threads", 1)
+        if n_threads <= 1:
+            return None
+        scorer = getattr(self, "_sharded_scorer", None)
+        # Pools herdados por fork não têm threads no processo filho
+        if scorer is None or scorer.pid != os.getpid() or scorer.n_threads != n_threads:
+            scorer = self._sharded_scorer = ShardedScorer(n_threads)
+        return scorer
+
+    def _sharded_top_k(self, input_features, top_n, feature_weights, scoring):
+        """
+        Candidatos de uma consulta pontuados por blocos em paralelo.
+
+        Returns:
+            tuple ou None: (posições, similaridades) dos candidatos em ordem
+                decrescente (vazios se a consulta não tiver feature
+                pontuável), ou None se o caminho paralelo não se aplicar
+        """
+        scorer = self._scoring_pool()
+        if scorer is None or getattr(self, "_component_cache", None) is not None:
+            return None
+        n_items = len(self.df)
+        if len(scorer.shards(n_items)) < 2:
+            return None
+        candidate_size = min(5 * top_n, n_items)
+        empty = (np.array([], dtype=np.int64), np.array([]))
+
+        if scoring == "fused":
+            fused = self._fused_scorer()
+            query_matrix = fused.query_matrix(
+                self._fused_queries([input_features]), feature_weights
+            )
+            if not query_matrix.nnz:
+                return empty
+            with span(RECOMMENDER_STAGE_SECONDS, stage="sharded_score"):
+                return scorer.fused_top_k(
+                    fused.item_matrix_t, query_matrix, candidate_size
+                )
+
+        text = None
+        if feature_weights["text"] > 0 and self.text_columns:
+            parts = self._text_assembler().query_parts(input_features)
+            if parts:
+                input_vector = self._vectorize_queries([parts])
+                embedding = self._active_embedding()
+                if embedding is None:
+                    text = ("sparse", self.text_matrix, input_vector)
+                else:
+                    text = (
+                        "embedding",
+                        embedding.item_vectors,
+                        embedding.transform(input_vector)[0],
+                    )
+
+        ordinal = None
+        if feature_weights["ordinal"] > 0:
+            table = self._ordinal_table()
+            ordinal_sim = None
+            if table is not None:
+                with span(RECOMMENDER_STAGE_SECONDS, stage="ordinal_lookup"):
+                    ordinal_sim = table.lookup(input_features)
+            if ordinal_sim is not None:
+                ordinal = ("table", ordinal_sim, None)
+            else:
+                input_normalized = self._ordinal_query_vector(input_features)
+                if input_normalized is not None:
+                    ordinal = (
+                        "features",
+                        self.numeric_features_normalized,
+                        input_normalized,
+                    )
+
+        if text is None and ordinal is None:
+            return empty
+        with span(RECOMMENDER_STAGE_SECONDS, stage="sharded_score"):
+            return scorer.legacy_top_k(
+                text, ordinal, feature_weights, n_items, candidate_size
+            )
+
+    def set_scoring(self, scoring):
+        """
+        Define o scoring padrão das recomendações.
+
+        "legacy" soma as similaridades textual e ordinal normalizadas por
+        min-max a cada consulta. "fused" calcula texto, categóricas e ordinais
+        numa única multiplicação esparsa contra a matriz de itens fundida
+        (wine_recommender_scoring), usando também o peso categórico; a
+        matriz é montada aqui e salva com o modelo.
+
+        Args:
+            scoring (str): "legacy" ou "fused"
+        """
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"scoring deve ser um de {SCORING_MODES}")
+        if scoring == "fused":
+            self._fused_scorer()
+        self.scoring = scoring
+
+    def _scoring(self):
+        return getattr(self, "scoring", "legacy")
+
+    def _fused_scorer(self):
+        """Matriz de itens do scoring fundido, montada na primeira vez que é usada."""
+        scorer = getattr(self, "fused_scorer", None)
+        if scorer is None:
+            categoric = {
+                col: (self.df[col].to_numpy(), len(self.label_encoders[col].classes_))
+                for col in self.categoric_columns
+            }
+            scorer = self.fused_scorer = FusedScorer(
+                self.text_matrix, categoric, self.numeric_features_normalized
+            )
+        return scorer
+
+    def _fused_queries(self, inputs):
+        """Partes (texto, categóricas e ordinais) de cada consulta para o FusedScorer."""
+        assembler = self._text_assembler()
+        queries, texts, positions = [], [], []
+        for position, input_features in enumerate(inputs):
+            parts = assembler.query_parts(input_features)
+            if parts:
+                texts.append(parts)
+                positions.append(position)
+
+            categoric = {}
+            for col in self.categoric_columns:
+                if input_features.get(col) is not None:
+                    code = self._category_code(col, input_features[col])
+                    if code is not None:  # Categoria desconhecida não pontua
+                        categoric[col] = code
+            queries.append(
+                {
+                    "text": None,
+                    "categoric": categoric,
+                    "ordinal": self._ordinal_query_vector(input_features),
+                }
+            )
+
+        if texts:
+            input_vectors = self._vectorize_queries(texts).tocsr()
+            for row, position in enumerate(positions):
+                queries[position]["text"] = input_vectors[row]
+        return queries
+
+    def _fused_similarities(self, inputs, feature_weights, block_size=32):
+        """
+        Gera a similaridade fundida de cada consulta com todos os vinhos.
+
+        As consultas são pontuadas em blocos de block_size, cada bloco numa
+        única multiplicação esparsa.
+
+        Yields:
+            np.ndarray ou None: Similaridades, ou None se a consulta não tiver
+                nenhuma feature utilizável
+        """
+        scorer = self._fused_scorer()
+        for start in range(0, len(inputs), block_size):
+            queries = self._fused_queries(inputs[start : start + block_size])
+            query_matrix = scorer.query_matrix(queries, feature_weights)
+            with span(RECOMMENDER_STAGE_SECONDS, stage="fused_score"):
+                scores = scorer.scores(query_matrix)
+            for scores_row, nnz in zip(scores, np.diff(query_matrix.indptr)):
+                yield scores_row if nnz else None
+
+    def _ordinal_query_vector(self, input_features):
+        """Features ordinais da consulta codificadas e normalizadas (None sem ordinais)."""
+        if not self.ordinal_columns:
+            return None
+
+        ordinal_input = {
+            k: v
+            for k, v in input_features.items()
+            if k in self.ordinal_columns and v is not None
+        }
+        if not ordinal_input:
+            return None
+
+        input_ordinal = []
+        for col in self.ordinal_columns:
+            if col in ordinal_input:
+                try:
+                    value = float(ordinal_input[col])
+                    encoded = self.ordinal_encoders[col].transform([[value]])[0][0]
+                    input_ordinal.append(encoded)
+                except:
+                    input_ordinal.append(self.ordinal_means[col])
+            else:
+                input_ordinal.append(self.ordinal_means[col])
+
+        return self.numeric_scaler.transform(np.array(input_ordinal).reshape(1, -1))
+
+    def build_ordinal_table(self, max_mb=DEFAULT_MAX_TABLE_MB):
+        """
+        Pré-calcula a similaridade ordinal das combinações dos sliders (1-5).
+
+        Com a tabela (OrdinalSimilarityTable, uint16), consultas com todas as
+        colunas ordinais em 1-5 leem a componente ordinal em vez de calculá-la.
+        Ela ocupa 625 x n_vinhos x 2 bytes (25 MB para 20 mil vinhos) e não é
+        gerada se passar de max_mb.
+
+        Args:
+            max_mb (float): Tamanho máximo da tabela, em MB
+
+        Returns:
+            OrdinalSimilarityTable ou None: A tabela, ou None se não foi gerada
+        """
+        self.ordinal_table = None
+        if not self.ordinal_columns:
+            print("Sem colunas ordinais: tabela ordinal não gerada")
+            return None
+
+        size_mb = (
+            table_nbytes(len(self.numeric_features_normalized), len(self.ordinal_columns))
+            / 1024**2
+        )
+        if size_mb > max_mb:
+            print(
+                f"Tabela ordinal de {size_mb:.1f} MB excede o limite de {max_mb} MB "
+                "e não foi gerada"
+            )
+            return None
+
+        self.ordinal_table = OrdinalSimilarityTable(self)
+        self._ordinal_table_checked = True
+        print(f"Tabela ordinal gerada: {size_mb:.1f} MB")
+        return self.ordinal_table
+
+    def _ordinal_table(self):
+        """Tabela ordinal, validada (versão e impressão digital) uma vez por processo."""
+        table = getattr(self, "ordinal_table", None)
+        if table is None or getattr(self, "_ordinal_table_checked", False):
+            return table
+        if not table.matches(self):
+            print("Aviso: Tabela ordinal não corresponde ao modelo e será ignorada")
+            table = self.ordinal_table = None
+        self._ordinal_table_checked = True
+        return table
+
+    def _ordinal_similarity(self, input_features, subset=None):
+        """Similaridade ordinal normalizada da consulta com todos os vinhos (ou subset)."""
+        table = self._ordinal_table() if subset is None else None
+        if table is not None:
+            with span(RECOMMENDER_STAGE_SECONDS, stage="ordinal_lookup"):
+                ordinal_sim = table.lookup(input_features)
+            if ordinal_sim is not None:
+                return ordinal_sim
+
+        input_normalized = self._ordinal_query_vector(input_features)
+        if input_normalized is None:
+            return None
+
+        with span(RECOMMENDER_STAGE_SECONDS, stage="ordinal_similarity"):
+            numeric_features = self.numeric_features_normalized
+            if subset is not None:
+                numeric_features = numeric_features[subset]
+            return ordinal_similarity(numeric_features, input_normalized)
+
+    def evaluate_diversity_metrics(
+        self,
+        feature_weights=None,
+        diversity_factor=0.5,
+        dataframe=None,
+        num_tests=50,
+        top_n=5,
+        random_state=42,
+    ):
+        """
+        Avalia Jaccard, cobertura e diversidade para um conjunto de parâmetros
+        sem alterar o modelo.
+
+        Args:
+            feature_weights (dict): Pesos a avaliar (None = pesos atuais)
+            diversity_factor (float): Fator de diversificação a avaliar
+            dataframe (pd.DataFrame): Catálogo original, não codificado (None =
+                o da avaliação anterior)
+            num_tests (int): Número de consultas de teste
+            top_n (int): Quantidade de recomendações por consulta
+            random_state (int): Seed das consultas de teste, fixa entre avaliações
+
+        Returns:
+            dict: Resultados de JaccardWineEvaluator.evaluate_recommendations
+
+        Raises:
+            ValueError: Sem o catálogo original para montar as consultas de teste
+        """
+        from backend.app.core.wine_recommender_metrics import JaccardWineEvaluator
+
+        # O avaliador pré-codifica o catálogo; reaproveitamos entre avaliações
+        evaluator = getattr(self, "_evaluator", None)
+        if dataframe is None and evaluator is not None:
+            dataframe = evaluator.df
+        # self.df tem as colunas codificadas (e, no modelo compacto, só parte
+        # delas): as consultas de teste precisam dos valores originais
+        if dataframe is None or dataframe is self.df:
+            raise ValueError(
+                "evaluate_diversity_metrics precisa do catálogo original (não "
+                "codificado) em dataframe"
+            )
+        if evaluator is None or evaluator.df is not dataframe:
+            evaluator = JaccardWineEvaluator(self, dataframe)
+            self._evaluator = evaluator
+
+        return evaluator.evaluate_recommendations(
+            num_tests=num_tests,
             top_n=top_n,
-            lambda_param=diversity_factor,
             random_state=random_state,
+            diversity_factor=diversity_factor,
+            feature_weights=feature_weights,
         )
 
-    def optimize_diversity(self, target_jaccard=0.4, target_coverage=0.5):
+    def optimize_diversity(
+        self,
+        dataframe,
+        target_jaccard=0.4,
+        target_coverage=0.5,
+        n_jobs=None,
+        **tuner_kwargs,
+    ):
         """
         Auto-ajusta os parâmetros para atingir metas de diversidade
 
         Args:
+            dataframe (pd.DataFrame): Catálogo original, não codificado
             target_jaccard (float): Jaccard médio desejado
             target_coverage (float): Porcentagem do catálogo a ser recomendado
+            n_jobs (int): Processos usados na busca (None = todos os núcleos)
+            **tuner_kwargs: Demais opções de DiversityTuner (patience, tol, ...)
         """
-        best_params = {
-            "text_weight": self.feature_weights["text"],
-            "ordinal_weight": self.feature_weights["ordinal"],
-            "diversity_factor": 0.5,
-        }
-        best_score = float("inf")
-
-        # Espaço de busca de parâmetros
-        text_weights = np.linspace(0.3, 0.6, 4)
-        diversity_factors = np.linspace(0.3, 0.8, 6)
-
-        for text_w in text_weights:
-            for div_factor in diversity_factors:
-                self.feature_weights = {
-                    "text": text_w,
-                    "ordinal": 0.6 - text_w,  # Mantém soma 0.6
-                    "categoric": 0.4,
-                }
+        from backend.app.core.wine_recommender_tuning import DiversityTuner
 
-                metrics = self.evaluate_diversity_metrics()
-
-                # Função de perda combinada
-                score = (abs(metrics["jaccard_médio"] - target_jaccard)) + (
-                    abs(metrics["cobertura"] - target_coverage)
-                )
+        tuner = DiversityTuner(
+            self,
+            dataframe,
+            target_jaccard=target_jaccard,
+            target_coverage=target_coverage,
+            n_jobs=n_jobs,
+            **tuner_kwargs,
+        )
 
-                if score < best_score:
-                    best_score = score
-                    best_params = {
-                        "text_weight": text_w,
-                        "ordinal_weight": 0.6 - text_w,
-                        "diversity_factor": div_factor,
-                    }
+        # Espaço de busca de parâmetros
+        best_params, _ = tuner.search(
+            tuner.grid(
+                text_weights=np.linspace(0.3, 0.6, 4),
+                diversity_factors=np.linspace(0.3, 0.8, 6),
+            )
+        )
 
         # Aplica os melhores parâmetros
         self.feature_weights = {
             "text": best_params["text_weight"],
             "ordinal": best_params["ordinal_weight"],
-            "categoric": 0.4,
+            "categoric": best_params["categoric_weight"],
         }
         self.optimal_diversity_factor = best_params["diversity_factor"]
 
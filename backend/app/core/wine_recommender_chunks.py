@@ -0,0 +1,329 @@
+"""
+Treino do WineRecommender a partir de lotes de dados (CSV, Parquet ou banco).
+
+O catálogo nunca é materializado por inteiro: a fonte é percorrida duas vezes,
+lote a lote.
+
+1. Estatísticas das colunas: médias e valores das ordinais e categorias das
+   nominais, que definem os encoders.
+2. Índices dos filtros, vocabulário, codificação de cada lote, texto combinado
+   (TextAssembler), contagens no espaço de hashing e frequências de
+   documento do IDF.
+
+No fim, o IDF é aplicado às contagens guardadas. Em memória ficam apenas o
+lote atual, as contagens esparsas e as colunas codificadas (no formato do
+modelo compacto), de modo que o pico de memória não depende do volume de
+texto do catálogo.
+
+Uma fonte é uma função sem argumentos que retorna um iterador de DataFrames
+(ex.: csv_chunks("db.csv")), já que é preciso percorrê-la duas vezes.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import LabelEncoder, MinMaxScaler, OrdinalEncoder
+
+from backend.app.core.wine_recommender_filters import FILTER_COLUMNS, FilterIndex
+from backend.app.core.wine_recommender_text import HashingTfidfVectorizer, TextAssembler
+from backend.app.core.wine_recommender_vocabulary import (
+    VOCABULARY_COLUMNS,
+    WineVocabulary,
+)
+
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def training_columns(model_class):
+    """Colunas lidas da fonte: id, as colunas de similaridade e as filtráveis."""
+    return list(
+        dict.fromkeys(
+            ["id"]
+            + model_class.TEXT_COLUMNS
+            + model_class.CATEGORIC_COLUMNS
+            + model_class.ORDINAL_COLUMNS
+            + list(FILTER_COLUMNS)
+        )
+    )
+
+
+def csv_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    """
+    Fonte de lotes de um CSV.
+
+    Args:
+        path (str): Caminho do CSV
+        chunk_size (int): Linhas por lote
+        columns (list): Colunas a ler (None = todas)
+
+    Returns:
+        callable: Função que retorna um novo iterador de DataFrames
+    """
+
+    def chunks():
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [col for col in header if columns is None or col in columns]
+        yield from pd.read_csv(path, usecols=usecols, chunksize=chunk_size)
+
+    return chunks
+
+
+def parquet_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    """
+    Fonte de lotes de um arquivo Parquet (lido por pyarrow, lote a lote).
+
+    Args:
+        path (str): Caminho do arquivo Parquet
+        chunk_size (int): Linhas por lote
+        columns (list): Colunas a ler (None = todas)
+
+    Returns:
+        callable: Função que retorna um novo iterador de DataFrames
+    """
+    import pyarrow.parquet as pq
+
+    def chunks():
+        parquet_file = pq.ParquetFile(path)
+        names = parquet_file.schema_arrow.names
+        selected = [col for col in names if columns is None or col in columns]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=selected):
+            yield batch.to_pandas()
+
+    return chunks
+
+
+def cursor_chunks(connection, query, params=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fonte de lotes de uma consulta SQL (qualquer conexão DB-API, ex.: sqlite3
+    ou psycopg2), lida com fetchmany.
+
+    Args:
+        connection: Conexão DB-API
+        query (str): Consulta SQL
+        params (tuple): Parâmetros da consulta
+        chunk_size (int): Linhas por lote
+
+    Returns:
+        callable: Função que retorna um novo iterador de DataFrames
+    """
+
+    def chunks():
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns)
+        finally:
+            cursor.close()
+
+    return chunks
+
+
+def supabase_chunks(supabase, table="wine_data", chunk_size=1000, columns=None):
+    """
+    Fonte de lotes de uma tabela do Supabase, paginada por range e ordenada por id.
+
+    Args:
+        supabase (Client): Cliente do Supabase
+        table (str): Tabela com os vinhos
+        chunk_size (int): Linhas por página
+        columns (list): Colunas a ler (None = todas)
+
+    Returns:
+        callable: Função que retorna um novo iterador de DataFrames
+    """
+    selected = ",".join(columns) if columns else "*"
+
+    def chunks():
+        start = 0
+        while True:
+            result = (
+                supabase.table(table)
+                .select(selected)
+                .order("id")
+                .range(start, start + chunk_size - 1)
+                .execute()
+            )
+            if not result.data:
+                break
+            yield pd.DataFrame(result.data)
+            if len(result.data) < chunk_size:
+                break
+            start += chunk_size
+
+    return chunks
+
+
+def limit_chunks(source, n_rows):
+    """
+    Limita uma fonte de lotes às primeiras n_rows linhas.
+
+    Args:
+        source (callable): Função que retorna um iterador de DataFrames
+        n_rows (int): Máximo de linhas
+
+    Returns:
+        callable: Função que retorna um novo iterador de DataFrames
+    """
+
+    def chunks():
+        remaining = n_rows
+        for chunk in source():
+            if remaining <= 0:
+                break
+            yield chunk.head(remaining)
+            remaining -= len(chunk)
+
+    return chunks
+
+
+def _column_statistics(source, model):
+    """Primeiro passo: colunas presentes, estatísticas ordinais e categorias."""
+    sums, counts, has_null, ordinal_values, categories = {}, {}, {}, {}, {}
+    n_rows = 0
+
+    for chunk in source():
+        if n_rows == 0:
+            columns = model.TEXT_COLUMNS + model.CATEGORIC_COLUMNS + model.ORDINAL_COLUMNS
+            for column in columns:
+                if column not in chunk.columns:
+                    print(f"Aviso: Coluna {column} não existe nos dados e será ignorada")
+            model.text_columns = [c for c in model.TEXT_COLUMNS if c in chunk.columns]
+            model.categoric_columns = [
+                c for c in model.CATEGORIC_COLUMNS if c in chunk.columns
+            ]
+            model.ordinal_columns = [c for c in model.ORDINAL_COLUMNS if c in chunk.columns]
+            for column in model.ordinal_columns:
+                sums[column], counts[column], has_null[column] = 0.0, 0, False
+                ordinal_values[column] = set()
+            for column in model.categoric_columns:
+                categories[column] = set()
+
+        for column in model.ordinal_columns:
+            values = pd.to_numeric(chunk[column], errors="coerce")
+            sums[column] += values.sum()
+            counts[column] += int(values.count())
+            has_null[column] |= bool(values.isna().any())
+            ordinal_values[column].update(values.dropna().unique())
+        for column in model.categoric_columns:
+            categories[column].update(chunk[column].fillna("Unknown").unique())
+        n_rows += len(chunk)
+
+    if n_rows == 0:
+        raise ValueError("A fonte de dados não retornou nenhuma linha")
+
+    means = {
+        column: sums[column] / counts[column] if counts[column] else np.nan
+        for column in model.ordinal_columns
+    }
+    for column in model.ordinal_columns:
+        if has_null[column]:
+            # Os nulos são preenchidos com a média antes do encode
+            ordinal_values[column].add(means[column])
+    return n_rows, means, ordinal_values, categories
+
+
+def fit_from_chunks(model, source, stop_words=None, text_weights=None):
+    """
+    Ajusta um WineRecommender (modo hashing, compacto) a partir de uma fonte de lotes.
+
+    Args:
+        model (WineRecommender): Instância vazia (cls.__new__)
+        source (callable): Função que retorna um iterador de DataFrames
+        stop_words (list): Palavras ignoradas (None = stop words do spaCy)
+        text_weights (dict): Repetições de cada coluna no texto combinado
+
+    Returns:
+        WineRecommender: O próprio modelo, pronto para recomendações
+    """
+    from backend.app.core.wine_recommender import (
+        DEFAULT_FEATURE_WEIGHTS,
+        compact_frame,
+        load_stop_words,
+    )
+
+    n_rows, means, ordinal_values, categories = _column_statistics(source, model)
+    print(f"Treinando com {n_rows} vinhos em lotes")
+
+    model.ordinal_means = means
+    model.ordinal_encoders = {}
+    for column in model.ordinal_columns:
+        encoder = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
+        values = np.array(sorted(ordinal_values[column]), dtype=np.float64)
+        model.ordinal_encoders[column] = encoder.fit(values.reshape(-1, 1))
+
+    model.label_encoders = {
+        column: LabelEncoder().fit(pd.Series(sorted(categories[column])))
+        for column in model.categoric_columns
+    }
+
+    model.text_weights = dict(text_weights or {})
+    model.text_assembler = TextAssembler(model.text_columns, model.text_weights)
+    model.vectorizer = HashingTfidfVectorizer(
+        min_df=2,
+        max_df=0.8,
+        ngram_range=(1, 2),
+        stop_words=stop_words if stop_words is not None else load_stop_words(),
+        dtype=np.float32,
+    )
+
+    # Segundo passo: filtros, vocabulário, codificação, texto e contagens de cada lote
+    frames, count_blocks = [], []
+    model.filter_index = None
+    for chunk in source():
+        chunk = chunk.reset_index(drop=True)
+        if model.filter_index is None:
+            model.filter_index = FilterIndex(
+                [column for column in FILTER_COLUMNS if column in chunk.columns]
+            )
+            model.vocabulary = WineVocabulary(
+                [column for column in VOCABULARY_COLUMNS if column in chunk.columns]
+            )
+        model.filter_index.update(chunk)
+        model.vocabulary.update(chunk)
+        for column in model.ordinal_columns:
+            values = pd.to_numeric(chunk[column], errors="coerce").fillna(means[column])
+            chunk[column] = model.ordinal_encoders[column].transform(
+                values.to_numpy().reshape(-1, 1)
+            )[:, 0]
+        for column in model.categoric_columns:
+            chunk[column] = model.label_encoders[column].transform(
+                chunk[column].fillna("Unknown")
+            )
+
+        counts = model.vectorizer.counts(model.text_assembler.assemble(chunk))
+        model.vectorizer.partial_fit_counts(counts)
+        # Contagens são inteiras: float32 guarda os valores exatos na metade da memória
+        count_blocks.append(counts.astype(np.float32))
+        frames.append(
+            compact_frame(chunk, model.ordinal_columns + model.categoric_columns)
+        )
+
+    model.filter_index.finalize()
+    model.vocabulary.finalize()
+    model.df = pd.concat(frames, ignore_index=True)
+    del frames
+    # IDF final aplicado bloco a bloco, liberando as contagens de cada um
+    for i, counts in enumerate(count_blocks):
+        count_blocks[i] = model.vectorizer.transform_counts(counts.astype(np.float64))
+    model.text_matrix = sp.vstack(count_blocks, format="csr")
+    del count_blocks
+    model.vectorizer.compact()
+
+    model.feature_weights = dict(DEFAULT_FEATURE_WEIGHTS)
+    model.numeric_scaler = MinMaxScaler()
+    if model.ordinal_columns:
+        model.numeric_features_normalized = model.numeric_scaler.fit_transform(
+            model.df[model.ordinal_columns]
+        ).astype(np.float32)
+    else:
+        model.numeric_features_normalized = np.array([], dtype=np.float32)
+
+    model.text_mode = "hashing"
+    model.lean = True
+    return model
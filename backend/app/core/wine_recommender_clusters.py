@@ -0,0 +1,285 @@
+"""
+Roteamento das consultas por clusters (KMeans) do catálogo, no estilo IVF.
+
+ClusterIndex agrupa os vinhos com KMeans num espaço que aproxima o scoring do
+recomendador: o TF-IDF projetado em poucas dimensões
+(SparseRandomProjection, que preserva aproximadamente o cosseno) com peso
+sqrt(w_texto), o one-hot das categóricas com peso sqrt(w_categórico / c) e as
+features ordinais normalizadas com peso sqrt(w_ordinal / d).
+
+A projeção só serve para o agrupamento. Para o roteamento, o índice guarda os
+centróides exatos de cada cluster: a média das linhas TF-IDF (esparsa), a
+fração de vinhos de cada categoria e a média das ordinais. No scoring
+"fused", cada componente é pontuado contra os centróides como no scoring
+(cosseno, fração de categorias coincidentes e distância ordinal) e apenas os
+vinhos dos n_probe clusters de maior pontuação são pontuados (como um
+filtro): o custo passa a depender do tamanho dos clusters e não do catálogo.
+n_probe controla a troca entre latência e revocação; com n_probe igual ao
+número de clusters o resultado é o da busca completa. Os clusters são
+acrescentados além de n_probe até haver candidatos suficientes para o top-N.
+
+O scoring "legacy" normaliza cada componente por min-max com os extremos do
+catálogo inteiro, que não se obtêm sem pontuar todos os vinhos: nele o índice
+não roteia, e sim pontua o catálogo inteiro de forma exata e barata. Guarda o
+TF-IDF normalizado e transposto (o cosseno percorre só as listas dos termos
+da consulta) e as linhas ordinais distintas de que os vinhos são feitos (os
+sliders têm poucos valores, então a distância é calculada uma vez por linha
+distinta). O ranking é o da busca completa, sem perda de revocação.
+
+O índice guarda uma impressão digital das matrizes do modelo e é ignorado se
+o modelo for retreinado ou compactado sem que ele seja gerado de novo.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import normalize
+from sklearn.random_projection import SparseRandomProjection
+
+from backend.app.core.wine_recommender_precomputed import recommendation_fingerprint
+
+
+CLUSTER_INDEX_VERSION = 2
+DEFAULT_N_PROBE = 8
+PROJECTION_COMPONENTS = 128
+
+
+def default_n_clusters(n_items):
+    """Quantidade padrão de clusters: raiz quadrada do tamanho do catálogo."""
+    return max(1, int(round(np.sqrt(n_items))))
+
+
+class ClusterIndex:
+    """Clusters KMeans do catálogo, seus centróides e a lista de vinhos de cada um."""
+
+    def __init__(
+        self,
+        model,
+        n_clusters=None,
+        n_probe=DEFAULT_N_PROBE,
+        n_components=PROJECTION_COMPONENTS,
+        random_state=42,
+    ):
+        """
+        Args:
+            model (WineRecommender): Modelo treinado
+            n_clusters (int): Quantidade de clusters (None = default_n_clusters)
+            n_probe (int): Clusters pontuados por consulta por padrão
+            n_components (int): Dimensões da projeção do TF-IDF no agrupamento
+            random_state (int): Seed da projeção e do KMeans
+        """
+        self.version = CLUSTER_INDEX_VERSION
+        self.fingerprint = recommendation_fingerprint(model)
+        self.random_state = random_state
+
+        text_matrix = sp.csr_matrix(model.text_matrix)
+        n_items = text_matrix.shape[0]
+        self.n_clusters = min(n_clusters or default_n_clusters(n_items), n_items)
+        self.n_probe = n_probe
+
+        weights = model.feature_weights
+        ordinal = np.asarray(model.numeric_features_normalized, dtype=np.float32)
+        self.n_ordinal = ordinal.shape[1] if ordinal.ndim == 2 else 0
+        categoric = {
+            col: (
+                np.asarray(model.df[col].to_numpy(), dtype=np.int64),
+                len(model.label_encoders[col].classes_),
+            )
+            for col in model.categoric_columns
+        }
+
+        projection = SparseRandomProjection(
+            n_components=min(n_components, text_matrix.shape[1]),
+            dense_output=True,
+            random_state=random_state,
+        )
+        blocks = [np.sqrt(weights["text"]) * projection.fit_transform(text_matrix)]
+        rows = np.arange(n_items)
+        for codes, n_classes in categoric.values():
+            one_hot = np.zeros((n_items, n_classes), dtype=np.float32)
+            one_hot[rows, codes] = np.sqrt(weights["categoric"] / len(categoric))
+            blocks.append(one_hot)
+        if self.n_ordinal:
+            blocks.append(np.sqrt(weights["ordinal"] / self.n_ordinal) * ordinal)
+        features = np.hstack(blocks).astype(np.float32)
+        del blocks
+
+        kmeans = KMeans(n_clusters=self.n_clusters, n_init=1, random_state=random_state)
+        labels = kmeans.fit_predict(features)
+        del features
+
+        # Vinhos agrupados por cluster, em ordem de posição dentro de cada um
+        order = np.argsort(labels, kind="stable")
+        self.positions = order.astype(np.int32)
+        self.offsets = np.searchsorted(labels[order], np.arange(self.n_clusters + 1))
+        self.sizes = np.diff(self.offsets)
+
+        # Centróides exatos: média de cada cluster (clusters x vinhos)
+        assignment = sp.csr_matrix(
+            (1.0 / self.sizes[labels], (labels, rows)),
+            shape=(self.n_clusters, n_items),
+        )
+        # Texto transposto (termos x clusters), como a matriz do FusedScorer
+        self.text_centroids_t = (assignment @ text_matrix).T.tocsr().astype(np.float32)
+        self.categoric_centroids = {
+            col: (
+                assignment
+                @ sp.csr_matrix(
+                    (np.ones(n_items), (rows, codes)), shape=(n_items, n_classes)
+                )
+            )
+            .toarray()
+            .astype(np.float32)
+            for col, (codes, n_classes) in categoric.items()
+        }
+        self.ordinal_centroids = (
+            np.asarray(assignment @ ordinal, dtype=np.float32) if self.n_ordinal else None
+        )
+
+        # Scoring "legacy" exato: TF-IDF normalizado e transposto (termos x vinhos)
+        self.text_items_t = normalize(text_matrix).T.tocsr()
+        # Linhas ordinais distintas e a linha de cada vinho
+        self.ordinal_rows = self.ordinal_row_ids = None
+        if self.n_ordinal:
+            unique_rows, inverse = np.unique(
+                np.asarray(model.numeric_features_normalized),
+                axis=0,
+                return_inverse=True,
+            )
+            self.ordinal_rows = unique_rows
+            self.ordinal_row_ids = inverse.ravel().astype(np.int32)
+
+    @property
+    def nbytes(self):
+        text = self.text_centroids_t
+        return (
+            self.positions.nbytes
+            + self.offsets.nbytes
+            + text.data.nbytes
+            + text.indices.nbytes
+            + text.indptr.nbytes
+            + sum(centroids.nbytes for centroids in self.categoric_centroids.values())
+            + (self.ordinal_centroids.nbytes if self.n_ordinal else 0)
+            + self.text_items_t.data.nbytes
+            + self.text_items_t.indices.nbytes
+            + self.text_items_t.indptr.nbytes
+            + (
+                self.ordinal_rows.nbytes + self.ordinal_row_ids.nbytes
+                if self.n_ordinal
+                else 0
+            )
+        )
+
+    def matches(self, model):
+        """Indica se o índice foi gerado por esta versão e para este modelo."""
+        return (
+            getattr(self, "version", None) == CLUSTER_INDEX_VERSION
+            and self.fingerprint == recommendation_fingerprint(model)
+        )
+
+    def cluster_scores(self, text_vector, categoric, ordinal_vector, weights):
+        """
+        Pontuação de cada cluster para uma consulta no scoring "fused".
+
+        Args:
+            text_vector (sp.csr_matrix): TF-IDF da consulta (None sem texto)
+            categoric (dict): Coluna -> código do LabelEncoder da consulta
+            ordinal_vector (np.ndarray): Ordinais normalizadas (None sem ordinais)
+            weights (dict): Pesos "text", "categoric" e "ordinal"
+
+        Returns:
+            np.ndarray ou None: Pontuação por cluster, ou None se a consulta
+                não tiver nenhuma feature pontuável
+        """
+        components = []
+        if text_vector is not None and weights.get("text", 0) > 0:
+            text = (text_vector @ self.text_centroids_t).toarray()[0]
+            components.append(weights["text"] * text)
+
+        codes = {
+            col: code for col, code in categoric.items() if col in self.categoric_centroids
+        }
+        if codes and weights.get("categoric", 0) > 0:
+            matches = sum(
+                self.categoric_centroids[col][:, code] for col, code in codes.items()
+            )
+            components.append(weights["categoric"] * matches / len(codes))
+
+        if ordinal_vector is not None and self.n_ordinal and weights.get("ordinal", 0) > 0:
+            distances = ((self.ordinal_centroids - ordinal_vector) ** 2).sum(axis=1)
+            components.append(weights["ordinal"] * (1 - distances / self.n_ordinal))
+
+        if not components:
+            return None
+        return np.sum(components, axis=0)
+
+    def text_cosines(self, text_vector):
+        """Cosseno do TF-IDF da consulta com todos os vinhos (ordem do catálogo)."""
+        return (normalize(text_vector) @ self.text_items_t).toarray()[0]
+
+    def legacy_similarity(self, text_cosines, ordinal_vector, weights, subset=None):
+        """
+        Similaridade final do scoring "legacy" com todos os vinhos (ou subset).
+
+        Mesma soma de recommend_wines (texto e depois ordinal, cada um
+        normalizado por min-max nos vinhos considerados), com a distância
+        ordinal calculada uma vez por linha ordinal distinta.
+
+        Args:
+            text_cosines (np.ndarray): Cosseno textual com todos os vinhos
+                (None sem texto ou com peso textual 0)
+            ordinal_vector (np.ndarray): Ordinais normalizadas (None sem
+                ordinais ou com peso ordinal 0)
+            weights (dict): Pesos "text" e "ordinal"
+            subset (np.ndarray): Posições do filtro por atributo (None = todos)
+
+        Returns:
+            np.ndarray ou None: Similaridade final, ou None se a consulta não
+                tiver nenhuma feature pontuável
+        """
+        components = {}
+        if text_cosines is not None:
+            components["text"] = text_cosines
+        if ordinal_vector is not None and self.n_ordinal:
+            distances = np.linalg.norm(self.ordinal_rows - ordinal_vector, axis=1)
+            components["ordinal"] = (1 / (1 + distances))[self.ordinal_row_ids]
+        if not components:
+            return None
+
+        similarities = []
+        for name, similarity in components.items():
+            if subset is not None:
+                similarity = similarity[subset]
+            normalized = (similarity - similarity.min()) / (
+                similarity.max() - similarity.min() + 1e-10
+            )
+            similarities.append(normalized * weights[name])
+        return np.sum(similarities, axis=0)
+
+    def probe(self, scores, n_probe, min_candidates):
+        """
+        Clusters de maior pontuação.
+
+        Args:
+            scores (np.ndarray): Saída de cluster_scores
+            n_probe (int): Clusters a pontuar
+            min_candidates (int): Mínimo de vinhos nos clusters escolhidos
+
+        Returns:
+            np.ndarray: Clusters escolhidos, em ordem crescente
+        """
+        ranked = np.argsort(-scores, kind="stable")
+        covered = np.cumsum(self.sizes[ranked])
+        n_probe = max(
+            min(max(n_probe, 1), self.n_clusters),
+            int(np.searchsorted(covered, min_candidates)) + 1,
+        )
+        return np.sort(ranked[:n_probe])
+
+    def candidates(self, clusters):
+        """Posições (ordenadas) dos vinhos dos clusters informados."""
+        blocks = [
+            self.positions[self.offsets[cluster] : self.offsets[cluster + 1]]
+            for cluster in clusters
+        ]
+        return np.sort(np.concatenate(blocks))
@@ -0,0 +1,115 @@
+"""
+Embeddings densos de baixa dimensão do texto dos vinhos (TruncatedSVD).
+
+A matriz TF-IDF de unigramas e bigramas tem dezenas de milhares de colunas e
+poucas entradas por linha: cada cosseno percorre índices espalhados na
+memória. TextEmbedding projeta o TF-IDF em poucas centenas de dimensões com
+TruncatedSVD no treino e guarda os vetores dos vinhos normalizados (L2) em
+float32 contíguo. A consulta continua sendo vetorizada pelo TF-IDF e é
+projetada nos mesmos componentes (fold-in, q @ Vᵀ); o cosseno vira um produto
+matriz-vetor denso (BLAS), e o de várias consultas, um único produto de
+matrizes.
+
+A similaridade é uma aproximação da do TF-IDF (termos raros e bigramas pesam
+menos depois da projeção). Os componentes só guardam as colunas do TF-IDF que
+aparecem no catálogo, o que importa no modo hashing (2^20 colunas).
+
+O embedding guarda uma impressão digital das matrizes do modelo e é ignorado
+se o modelo for retreinado ou compactado sem que ele seja gerado de novo.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+
+from backend.app.core.wine_recommender_precomputed import recommendation_fingerprint
+
+
+TEXT_EMBEDDING_VERSION = 1
+DEFAULT_EMBEDDING_DIM = 256
+TEXT_SIMILARITY_MODES = ("sparse", "embedding")
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    vectors /= norms
+    return vectors
+
+
+class TextEmbedding:
+    """Vetores SVD dos vinhos e componentes para projetar as consultas."""
+
+    def __init__(self, model, n_components=DEFAULT_EMBEDDING_DIM, random_state=42):
+        """
+        Args:
+            model (WineRecommender): Modelo treinado
+            n_components (int): Dimensões do embedding
+            random_state (int): Seed do TruncatedSVD
+        """
+        self.version = TEXT_EMBEDDING_VERSION
+        self.fingerprint = recommendation_fingerprint(model)
+
+        text_matrix = sp.csr_matrix(model.text_matrix)
+        # Só as colunas presentes no catálogo: as demais não mudam o cosseno
+        self.columns = np.unique(text_matrix.indices).astype(np.int64)
+        self.n_features = text_matrix.shape[1]
+        text_matrix = text_matrix[:, self.columns]
+
+        self.n_components = max(1, min(n_components, min(text_matrix.shape) - 1))
+        svd = TruncatedSVD(n_components=self.n_components, random_state=random_state)
+        self.item_vectors = np.ascontiguousarray(
+            _normalize_rows(svd.fit_transform(text_matrix).astype(np.float32))
+        )
+        # Transpostos (colunas x dimensões) para o fold-in esparso @ denso
+        self.components_t = np.ascontiguousarray(svd.components_.T.astype(np.float32))
+        self.explained_variance = float(svd.explained_variance_ratio_.sum())
+
+    @property
+    def nbytes(self):
+        return self.item_vectors.nbytes + self.components_t.nbytes + self.columns.nbytes
+
+    def matches(self, model):
+        """Indica se o embedding foi gerado por esta versão e para este modelo."""
+        return (
+            getattr(self, "version", None) == TEXT_EMBEDDING_VERSION
+            and self.fingerprint == recommendation_fingerprint(model)
+        )
+
+    def transform(self, text_vectors):
+        """
+        Projeta vetores TF-IDF (consultas) no espaço do embedding.
+
+        Args:
+            text_vectors (sp.csr_matrix): Linhas TF-IDF no espaço do vetorizador
+
+        Returns:
+            np.ndarray: Vetores normalizados (n x n_components, float32)
+        """
+        text_vectors = sp.csr_matrix(text_vectors)
+        positions = np.searchsorted(self.columns, text_vectors.indices)
+        positions = np.minimum(positions, len(self.columns) - 1)
+        known = self.columns[positions] == text_vectors.indices
+        rows = np.repeat(np.arange(text_vectors.shape[0]), np.diff(text_vectors.indptr))
+        folded = sp.csr_matrix(
+            (
+                text_vectors.data[known].astype(np.float32),
+                (rows[known], positions[known]),
+            ),
+            shape=(text_vectors.shape[0], len(self.columns)),
+        )
+        return _normalize_rows(np.asarray(folded @ self.components_t, dtype=np.float32))
+
+    def similarities(self, query_vectors, subset=None):
+        """
+        Cosseno das consultas projetadas com todos os vinhos (ou os de subset).
+
+        Args:
+            query_vectors (np.ndarray): Saída de transform
+            subset (np.ndarray): Posições dos vinhos (None = todos)
+
+        Returns:
+            np.ndarray: Matriz n_consultas x n_vinhos
+        """
+        item_vectors = self.item_vectors if subset is None else self.item_vectors[subset]
+        return query_vectors @ item_vectors.T
@@ -0,0 +1,157 @@
+"""
+Índices de filtros por atributo do WineRecommender.
+
+FilterIndex guarda, para cada coluna filtrável e cada valor, a lista ordenada
+das posições dos vinhos com esse valor (posting list, int32). As uvas são
+separadas por vírgula, de forma que "Syrah" encontra "Blend, Grenache, Syrah".
+Os valores são comparados sem diferença de maiúsculas, acentos e espaços nas
+pontas.
+
+Um filtro é um dicionário coluna -> valor ou lista de valores: os valores de
+uma mesma coluna se somam (OU) e as colunas se combinam (E), por interseção
+das posting lists. O recomendador então calcula as similaridades só nos
+vinhos selecionados, e consultas mais seletivas ficam mais rápidas.
+"""
+
+import unicodedata
+
+import numpy as np
+
+
+# Colunas filtráveis e se o valor é uma lista separada por vírgulas
+FILTER_COLUMNS = {
+    "technical_sheet_country": False,
+    "technical_sheet_wine_type": False,
+    "technical_sheet_grapes": True,
+    "technical_sheet_region": False,
+    "technical_sheet_closure_type": False,
+}
+
+
+def normalize_value(value):
+    """Valor de filtro sem acentos, em minúsculas e sem espaços nas pontas."""
+    text = unicodedata.normalize("NFKD", str(value).strip().casefold())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def _tokens(value, tokenized):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    parts = str(value).split(",") if tokenized else [value]
+    return [token for token in map(normalize_value, parts) if token]
+
+
+class FilterIndex:
+    """Posting lists (posições dos vinhos) por coluna e valor."""
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns (list): Colunas indexadas (chaves de FILTER_COLUMNS)
+        """
+        self.columns = list(columns)
+        self.postings = {column: {} for column in self.columns}
+        self.n_items = 0
+
+    @classmethod
+    def from_frame(cls, dataframe):
+        """
+        Índice das colunas filtráveis presentes num DataFrame com os valores originais.
+
+        Args:
+            dataframe (pd.DataFrame): Catálogo (antes da codificação)
+
+        Returns:
+            FilterIndex: Índice pronto para consultas
+        """
+        index = cls([column for column in FILTER_COLUMNS if column in dataframe.columns])
+        index.update(dataframe)
+        return index.finalize()
+
+    def update(self, dataframe):
+        """Acrescenta as linhas de um lote (posições a partir de n_items)."""
+        for column in self.columns:
+            tokenized = FILTER_COLUMNS[column]
+            postings = self.postings[column]
+            for position, value in enumerate(dataframe[column].to_numpy(), self.n_items):
+                for token in _tokens(value, tokenized):
+                    postings.setdefault(token, []).append(position)
+        self.n_items += len(dataframe)
+        return self
+
+    def finalize(self):
+        """Converte as posting lists em arrays int32 ordenados e sem repetição."""
+        for postings in self.postings.values():
+            for token, positions in postings.items():
+                postings[token] = np.unique(np.asarray(positions, dtype=np.int32))
+        return self
+
+    @property
+    def nbytes(self):
+        return sum(
+            positions.nbytes
+            for postings in self.postings.values()
+            for positions in postings.values()
+        )
+
+    def values(self, column):
+        """Valores (normalizados) indexados de uma coluna."""
+        return sorted(self.postings[column])
+
+    def validate(self, filters):
+        """
+        Confere um filtro.
+
+        Raises:
+            ValueError: Se o filtro não for um dicionário ou usar colunas não indexadas
+        """
+        if not isinstance(filters, dict):
+            raise ValueError("filters deve ser um dicionário coluna -> valor(es)")
+        unknown = [column for column in filters if column not in self.postings]
+        if unknown:
+            raise ValueError(
+                f"Colunas sem índice de filtro: {unknown}; disponíveis: {self.columns}"
+            )
+
+    def positions(self, filters):
+        """
+        Posições dos vinhos que atendem ao filtro.
+
+        Args:
+            filters (dict): Coluna -> valor ou lista de valores
+
+        Returns:
+            np.ndarray ou None: Posições ordenadas (int32), ou None se o filtro
+                não restringir nada
+        """
+        self.validate(filters)
+        selected = None
+        for column, wanted in filters.items():
+            if wanted is None:
+                continue
+            if isinstance(wanted, (str, int, float)):
+                wanted = [wanted]
+            tokens = {
+                token
+                for value in wanted
+                for token in _tokens(value, FILTER_COLUMNS[column])
+            }
+            if not tokens:
+                continue
+
+            lists = [
+                self.postings[column][token]
+                for token in tokens
+                if token in self.postings[column]
+            ]
+            if not lists:
+                return np.empty(0, dtype=np.int32)
+            column_positions = lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+
+            if selected is None:
+                selected = column_positions
+            else:
+                selected = np.intersect1d(selected, column_positions, assume_unique=True)
+            if not len(selected):
+                break
+        return selected
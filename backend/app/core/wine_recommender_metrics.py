@@ -1,5 +1,7 @@
 import numpy as np
 import pandas as pd
+from itertools import combinations
+from scipy import sparse
 from sklearn.model_selection import train_test_split
 
 
@@ -8,6 +10,18 @@ class JaccardWineEvaluator:
     Classe para avaliar recomendador de vinhos usando métrica Jaccard modificada
     """
 
+    # Pesos das características na similaridade Jaccard ponderada
+    weights = {
+        "technical_sheet_wine_type": 1.5,
+        "technical_sheet_region": 1.2,
+        "technical_sheet_country": 1.2,
+        "harmonizes_with": 1.2,
+        "fruit_tasting": 1,
+        "sugar_tasting": 1,
+        "acidity_tasting": 1,
+        "tannin_tasting": 1,
+    }
+
     def __init__(self, recommender, dataframe):
         """
         Inicializa o avaliador
@@ -19,195 +33,257 @@ class JaccardWineEvaluator:
         self.recommender = recommender
         self.df = dataframe
 
-<<<<<<< HEAD
-        self.categorical_columns = [
-            col
-            for col in [
-                "technical_sheet_wine_type",
-                "technical_sheet_region",
-                "technical_sheet_country",
-                "harmonizes_with",
-            ]
-            if col in self.df.columns
-        ]
-
-        self.numeric_columns = [
-            col
-            for col in [
-                "fruit_tasting",
-                "sugar_tasting",
-                "acidity_tasting",
-                "tannin_tasting",
-            ]
-            if col in self.df.columns
-        ]
-=======
         # Usar as mesmas colunas definidas no recomendador
         self.text_columns = recommender.text_columns
         self.categorical_columns = recommender.categoric_columns
         self.ordinal_columns = recommender.ordinal_columns
 
+        self._encode_features()
+
         print(
             f"Avaliador inicializado com {len(self.text_columns)} colunas de texto, "
             f"{len(self.categorical_columns)} colunas categóricas e {len(self.ordinal_columns)} colunas ordinais"
         )
->>>>>>> main
+
+    def _encode_features(self):
+        """
+        Pré-codifica as colunas em arrays NumPy para o cálculo vetorizado do Jaccard.
+
+        - Colunas comparadas por igualdade viram códigos inteiros (-1 = nulo).
+        - 'harmonizes_with' vira uma matriz binária esparsa de tokens por vinho.
+        - Colunas ordinais viram floats (NaN = nulo ou não numérico).
+        """
+        self._exact_codes = {}
+        self._token_matrix = None
+        self._ordinal_values = {}
+
+        # Cada entrada é (tipo, coluna); colunas repetidas entre texto e
+        # categóricas contam duas vezes, como na comparação original
+        self._features = []
+
+        for col in self.text_columns + self.categorical_columns:
+            if col not in self.df.columns:
+                continue
+            if col == "harmonizes_with" and col in self.text_columns:
+                if self._token_matrix is None:
+                    self._token_matrix, self._token_valid = self._encode_tokens(
+                        self.df[col]
+                    )
+                if ("tokens", col) not in self._features:
+                    self._features.append(("tokens", col))
+                    continue
+            if col not in self._exact_codes:
+                values = self.df[col]
+                codes, _ = pd.factorize(values.astype(str).str.lower())
+                codes[values.isna().to_numpy()] = -1
+                self._exact_codes[col] = codes.astype(np.int32)
+            self._features.append(("exact", col))
+
+        for col in self.ordinal_columns:
+            if col not in self.df.columns:
+                continue
+            if col not in self._ordinal_values:
+                self._ordinal_values[col] = pd.to_numeric(
+                    self.df[col], errors="coerce"
+                ).to_numpy(dtype=np.float64)
+            self._features.append(("ordinal", col))
+
+        # Índice id -> posição da linha (primeira ocorrência, como no .iloc[0])
+        ids = self.df["id"]
+        first = ~ids.duplicated().to_numpy()
+        self._row_by_id = pd.Series(
+            np.arange(len(self.df))[first], index=ids.to_numpy()[first]
+        )
+
+    @staticmethod
+    def _encode_tokens(values):
+        """
+        Codifica os tokens separados por vírgula de cada vinho num bitset esparso.
+
+        Parâmetros:
+        values (Series): Coluna de texto tokenizável
+
+        Retorna:
+        tuple: (matriz CSR binária vinhos x tokens, máscara de não nulos)
+        """
+        valid = values.notna().to_numpy()
+        vocabulary = {}
+        indptr = [0]
+        indices = []
+        for value, is_valid in zip(values.to_numpy(), valid):
+            if is_valid:
+                for token in set(str(value).lower().split(",")):
+                    indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), indices, indptr),
+            shape=(len(values), max(len(vocabulary), 1)),
+        )
+        return matrix, valid
+
+    def _rows_for_ids(self, ids):
+        """
+        Converte ids de vinhos em posições de linha, descartando ids desconhecidos.
+
+        Parâmetros:
+        ids (list): Ids dos vinhos
+
+        Retorna:
+        np.ndarray: Posições das linhas encontradas
+        """
+        rows = self._row_by_id.reindex(ids).to_numpy()
+        missing = np.isnan(rows)
+        if missing.any():
+            print(f"IDs de vinho não encontrados: {list(np.asarray(ids)[missing])}")
+        return rows[~missing].astype(np.int64)
+
+    def _pairwise_jaccard(self, rows_a, rows_b, weighted=True):
+        """
+        Calcula a similaridade Jaccard modificada para pares de vinhos em lote
+
+        Parâmetros:
+        rows_a (array): Posições das linhas do primeiro vinho de cada par
+        rows_b (array): Posições das linhas do segundo vinho de cada par
+        weighted (bool): Se deve aplicar pesos às características
+
+        Retorna:
+        np.ndarray: Similaridade Jaccard modificada de cada par
+        """
+        rows_a = np.asarray(rows_a, dtype=np.int64)
+        rows_b = np.asarray(rows_b, dtype=np.int64)
+        intersection = np.zeros(len(rows_a))
+        union = np.zeros(len(rows_a))
+
+        for kind, col in self._features:
+            weight = self.weights.get(col, 1.0) if weighted else 1.0
+
+            if kind == "exact":
+                codes_a = self._exact_codes[col][rows_a]
+                codes_b = self._exact_codes[col][rows_b]
+                valid = (codes_a >= 0) & (codes_b >= 0)
+                intersection += weight * (valid & (codes_a == codes_b))
+                union += weight * valid
+
+            elif kind == "tokens":
+                valid = self._token_valid[rows_a] & self._token_valid[rows_b]
+                tokens_a = self._token_matrix[rows_a]
+                tokens_b = self._token_matrix[rows_b]
+                common = np.asarray(
+                    tokens_a.multiply(tokens_b).sum(axis=1), dtype=np.float64
+                ).ravel()
+                total = (
+                    np.asarray(tokens_a.sum(axis=1), dtype=np.float64).ravel()
+                    + np.asarray(tokens_b.sum(axis=1), dtype=np.float64).ravel()
+                    - common
+                )
+                ratio = np.divide(
+                    common, total, out=np.zeros_like(common), where=total > 0
+                )
+                intersection += weight * ratio * valid
+                union += weight * valid
+
+            else:
+                values_a = self._ordinal_values[col][rows_a]
+                values_b = self._ordinal_values[col][rows_b]
+                valid = ~(np.isnan(values_a) | np.isnan(values_b))
+                # Para valores numéricos, proximidade relativa assumindo escala 0-10
+                similarity = 1 - np.abs(values_a - values_b) / 10.0
+                intersection += weight * np.where(valid, similarity, 0)
+                union += weight * valid
+
+        return np.divide(
+            intersection, union, out=np.zeros_like(intersection), where=union > 0
+        )
 
     def _jaccard_similarity(self, wine1, wine2, weighted=True):
         """
-        Calcula similaridade Jaccard modificada entre dois vinhos
+        Calcula similaridade Jaccard modificada entre dois vinhos do DataFrame
 
         Parâmetros:
-        wine1 (Series): Primeiro vinho
-        wine2 (Series): Segundo vinho
+        wine1 (int): Id do primeiro vinho
+        wine2 (int): Id do segundo vinho
         weighted (bool): Se deve aplicar pesos às características
 
         Retorna:
         float: Valor da similaridade Jaccard modificada
         """
-        # Definir pesos para diferentes características (se necessário)
-        weights = {
-            "technical_sheet_wine_type": 1.5,
-            "technical_sheet_region": 1.2,
-<<<<<<< HEAD
-            "technical_sheet_country": 0.8,
-            "harmonizes_with": 1.0,
-            "fruit_tasting": 1.0,
-            "sugar_tasting": 1.3,
-            "acidity_tasting": 1.2,
-            "tannin_tasting": 1.1,
-=======
-            "technical_sheet_country": 1.2,
-            "harmonizes_with": 1.2,
-            "fruit_tasting": 1,
-            "sugar_tasting": 1,
-            "acidity_tasting": 1,
-            "tannin_tasting": 1,
->>>>>>> main
-        }
-
-        # Inicializar contadores
-        intersection = 0
-        union = 0
-<<<<<<< HEAD
-=======
-        used_features = 0
-
-        # Calcular para colunas textuais
-        for col in self.text_columns:
-            if col in wine1.index and col in wine2.index:
-                if pd.notna(wine1[col]) and pd.notna(wine2[col]):
-                    weight = weights.get(col, 1.0) if weighted else 1.0
-
-                    if col == "harmonizes_with":
-                        # Comparação tokenizada para 'harmonizes_with'
-                        tokens1 = set(str(wine1[col]).lower().split(","))
-                        tokens2 = set(str(wine2[col]).lower().split(","))
-                        common_tokens = tokens1.intersection(tokens2)
-                        all_tokens = tokens1.union(tokens2)
-
-                        if all_tokens:
-                            token_ratio = len(common_tokens) / len(all_tokens)
-                            intersection += token_ratio * weight
-                            union += weight
-                            used_features += 1
-                    else:
-                        # Para outras variáveis textuais, comparação direta
-                        if str(wine1[col]).lower() == str(wine2[col]).lower():
-                            intersection += weight
-                        union += weight
-                        used_features += 1
->>>>>>> main
-
-        # Calcular para colunas categóricas
-        for col in self.categorical_columns:
-            if col in wine1.index and col in wine2.index:
-<<<<<<< HEAD
-                if not pd.isna(wine1[col]) and not pd.isna(wine2[col]):
-                    # Para valores de texto, considerar parcialmente
-                    if wine1[col] == wine2[col]:
-                        if weighted:
-                            intersection += weights.get(col, 1.0)
-                        else:
-                            intersection += 1
-                    # Para harmonizes_with, checar tokens compartilhados
-                    elif col == "harmonizes_with":
-                        tokens1 = set(str(wine1[col]).lower().split(","))
-                        tokens2 = set(str(wine2[col]).lower().split(","))
-
-                        common_tokens = tokens1.intersection(tokens2)
-                        if common_tokens:
-                            token_ratio = len(common_tokens) / len(
-                                tokens1.union(tokens2)
-                            )
-                            if weighted:
-                                intersection += token_ratio * weights.get(col, 1.0)
-                            else:
-                                intersection += token_ratio
-
-                    if weighted:
-                        union += weights.get(col, 1.0)
-                    else:
-                        union += 1
-
-        # Calcular para colunas numéricas
-        for col in self.numeric_columns:
-            if col in wine1.index and col in wine2.index:
-                if not pd.isna(wine1[col]) and not pd.isna(wine2[col]):
-                    # Para valores numéricos, calcular proximidade relativa
-                    max_val = 10.0  # Assumindo escala 0-10
-                    diff = abs(float(wine1[col]) - float(wine2[col])) / max_val
-                    similarity = 1 - diff  # Normalizado entre 0-1
-
-                    if weighted:
-                        intersection += similarity * weights.get(col, 1.0)
-                        union += weights.get(col, 1.0)
-                    else:
-                        intersection += similarity
-                        union += 1
-=======
-                if pd.notna(wine1[col]) and pd.notna(wine2[col]):
-                    weight = weights.get(col, 1.0) if weighted else 1.0
-
-                    if str(wine1[col]).lower() == str(wine2[col]).lower():
-                        intersection += weight
-                    union += weight
-                    used_features += 1
-
-        # Calcular para colunas ordinais
-        for col in self.ordinal_columns:
-            if col in wine1.index and col in wine2.index:
-                if pd.notna(wine1[col]) and pd.notna(wine2[col]):
-                    weight = weights.get(col, 1.0) if weighted else 1.0
-
-                    try:
-                        # Para valores numéricos, calcular proximidade relativa
-                        val1 = float(wine1[col])
-                        val2 = float(wine2[col])
-                        max_val = 10.0  # Assumindo escala 0-10
-                        diff = abs(val1 - val2) / max_val
-                        similarity = 1 - diff  # Normalizado entre 0-1
-
-                        intersection += similarity * weight
-                        union += weight
-                        used_features += 1
-                    except (ValueError, TypeError):
-                        # Ignorar se não conseguir converter para float
-                        pass
->>>>>>> main
-
-        # Calcular Jaccard
-        if union == 0:
+        rows = self._rows_for_ids([wine1, wine2])
+        if len(rows) < 2:
             return 0
-<<<<<<< HEAD
-        return intersection / union
-=======
+        return float(self._pairwise_jaccard(rows[:1], rows[1:], weighted)[0])
+
+    def _input_features(self, rows):
+        """
+        Monta os dicionários de entrada do recomendador para as linhas informadas.
 
-        jaccard = intersection / union
-        return jaccard
->>>>>>> main
+        Parâmetros:
+        rows (array): Posições das linhas
+
+        Retorna:
+        list: Um dicionário de características não nulas por linha
+        """
+        columns = list(
+            dict.fromkeys(
+                self.text_columns + self.categorical_columns + self.ordinal_columns
+            )
+        )
+        records = self.df.iloc[rows][columns].to_dict("records")
+        return [{k: v for k, v in record.items() if pd.notna(v)} for record in records]
 
-    def evaluate_recommendations(self, test_size=0.2, num_tests=100, top_n=5):
+    def _score_recommendations(self, query_rows, recommendations):
+        """
+        Calcula em lote o Jaccard médio com o vinho base e a diversidade interna
+
+        Parâmetros:
+        query_rows (list): Posição da linha do vinho base de cada consulta
+        recommendations (list): Posições das linhas recomendadas por consulta
+
+        Retorna:
+        tuple: (Jaccard médio por consulta, diversidade interna por consulta),
+            com NaN quando não há pares suficientes
+        """
+        n_queries = len(query_rows)
+        base_a, base_b, base_group = [], [], []
+        internal_a, internal_b, internal_group = [], [], []
+
+        for group, (query_row, rec_rows) in enumerate(
+            zip(query_rows, recommendations)
+        ):
+            base_a.extend([query_row] * len(rec_rows))
+            base_b.extend(rec_rows)
+            base_group.extend([group] * len(rec_rows))
+            for row1, row2 in combinations(rec_rows, 2):
+                internal_a.append(row1)
+                internal_b.append(row2)
+                internal_group.append(group)
+
+        def group_mean(rows_a, rows_b, groups):
+            scores = self._pairwise_jaccard(rows_a, rows_b)
+            totals = np.bincount(groups, weights=scores, minlength=n_queries)
+            counts = np.bincount(groups, minlength=n_queries)
+            return np.divide(
+                totals,
+                counts,
+                out=np.full(n_queries, np.nan),
+                where=counts > 0,
+            )
+
+        jaccard = group_mean(base_a, base_b, np.asarray(base_group, dtype=np.int64))
+        internal = group_mean(
+            internal_a, internal_b, np.asarray(internal_group, dtype=np.int64)
+        )
+        return jaccard, 1 - internal
+
+    def evaluate_recommendations(
+        self,
+        test_size=0.2,
+        num_tests=100,
+        top_n=5,
+        random_state=None,
+        diversity_factor=0.5,
+        feature_weights=None,
+    ):
         """
         Avalia as recomendações usando a métrica Jaccard
 
@@ -215,91 +291,34 @@ class JaccardWineEvaluator:
         test_size (float): Proporção do conjunto de teste
         num_tests (int): Número de testes a realizar
         top_n (int): Número de recomendações a considerar
+        random_state (int): Seed da amostragem das consultas de teste
+        diversity_factor (float): Fator de diversificação repassado ao recomendador
+        feature_weights (dict): Pesos repassados ao recomendador (None = pesos do modelo)
 
         Retorna:
         dict: Resultados da avaliação
         """
         # Separar conjunto de teste
-        _, test_df = train_test_split(self.df, test_size=test_size, random_state=42)
+        _, test_rows = train_test_split(
+            np.arange(len(self.df)), test_size=test_size, random_state=42
+        )
 
         # Limitar número de testes se necessário
-<<<<<<< HEAD
-        test_samples = test_df.sample(min(num_tests, len(test_df)))
-=======
-        test_samples = test_df.sample(min(num_tests, len(test_df))).reset_index(
-            drop=True
+        rng = np.random.default_rng(random_state)
+        test_rows = rng.choice(
+            test_rows, min(num_tests, len(test_rows)), replace=False
         )
-        print(f"Avaliando {len(test_samples)} amostras de teste")
->>>>>>> main
+        print(f"Avaliando {len(test_rows)} amostras de teste")
 
-        jaccard_scores = []
         coverage = set()
-        diversidade_interna = []
-<<<<<<< HEAD
-
-        for _, wine in test_samples.iterrows():
-            # Criar input de características
-            input_features = {}
-            for col in self.categorical_columns + self.numeric_columns:
-                if pd.notna(wine[col]):
-                    input_features[col] = wine[col]
-
-            # Obter recomendações
-            recomendacoes = self.recommender.recommend_wines(
-                input_features, top_n=top_n
-            )
-
-            # Adicionar à cobertura
-            coverage.update(recomendacoes)
-
-            # Calcular jaccard médio entre vinho base e recomendações
-            jacc_scores = []
-            for rec_id in recomendacoes:
-                rec_wine = self.df[self.df["id"] == rec_id].iloc[0]
-                jacc = self._jaccard_similarity(wine, rec_wine)
-                jacc_scores.append(jacc)
-
-            # Adicionar à lista geral
-            if jacc_scores:
-                jaccard_scores.append(np.mean(jacc_scores))
-
-            # Calcular diversidade interna das recomendações
-            if len(recomendacoes) > 1:
-                internal_scores = []
-                for i, rec_id1 in enumerate(recomendacoes):
-                    for rec_id2 in recomendacoes[i + 1 :]:
-                        rec_wine1 = self.df[self.df["id"] == rec_id1].iloc[0]
-                        rec_wine2 = self.df[self.df["id"] == rec_id2].iloc[0]
-                        sim = self._jaccard_similarity(rec_wine1, rec_wine2)
-                        internal_scores.append(sim)
-
-                # Diversidade = 1 - similaridade média interna
-                if internal_scores:
-                    diversidade_interna.append(1 - np.mean(internal_scores))
-=======
-        sucessos = 0
+        query_rows = []
+        recommendations = []
         erros = 0
 
-        for idx, wine in test_samples.iterrows():
+        for idx, (row, input_features) in enumerate(
+            zip(test_rows, self._input_features(test_rows))
+        ):
             try:
-                # Criar input de características
-                input_features = {}
-
-                # Incluir características de texto
-                for col in self.text_columns:
-                    if pd.notna(wine[col]):
-                        input_features[col] = wine[col]
-
-                # Incluir características categóricas
-                for col in self.categorical_columns:
-                    if pd.notna(wine[col]):
-                        input_features[col] = wine[col]
-
-                # Incluir características ordinais
-                for col in self.ordinal_columns:
-                    if pd.notna(wine[col]):
-                        input_features[col] = wine[col]
-
                 # Verificar se há características suficientes
                 if len(input_features) == 0:
                     print(f"Amostra {idx} não tem características suficientes")
@@ -307,7 +326,10 @@ class JaccardWineEvaluator:
 
                 # Obter recomendações
                 recomendacoes = self.recommender.recommend_wines(
-                    input_features, top_n=top_n
+                    input_features,
+                    top_n=top_n,
+                    diversity_factor=diversity_factor,
+                    feature_weights=feature_weights,
                 )
 
                 if not recomendacoes:
@@ -317,83 +339,45 @@ class JaccardWineEvaluator:
                 # Adicionar à cobertura
                 coverage.update(recomendacoes)
 
-                # Calcular jaccard médio entre vinho base e recomendações
-                jacc_scores = []
-                for rec_id in recomendacoes:
-                    rec_wine_df = self.df[self.df["id"] == rec_id]
-                    if len(rec_wine_df) == 0:
-                        print(f"ID de vinho não encontrado: {rec_id}")
-                        continue
-
-                    rec_wine = rec_wine_df.iloc[0]
-                    jacc = self._jaccard_similarity(wine, rec_wine)
-                    jacc_scores.append(jacc)
-
-                # Adicionar à lista geral
-                if jacc_scores:
-                    jaccard_scores.append(np.mean(jacc_scores))
-                    sucessos += 1
-
-                    if idx % 20 == 0:  # Mostrar progresso
-                        print(
-                            f"Amostra {idx}: Jaccard médio = {np.mean(jacc_scores):.4f}"
-                        )
-
-                # Calcular diversidade interna das recomendações
-                if len(recomendacoes) > 1:
-                    internal_scores = []
-                    for i, rec_id1 in enumerate(recomendacoes):
-                        rec_wine1_df = self.df[self.df["id"] == rec_id1]
-                        if len(rec_wine1_df) == 0:
-                            continue
-
-                        for rec_id2 in recomendacoes[i + 1 :]:
-                            rec_wine2_df = self.df[self.df["id"] == rec_id2]
-                            if len(rec_wine2_df) == 0:
-                                continue
-
-                            sim = self._jaccard_similarity(
-                                rec_wine1_df.iloc[0], rec_wine2_df.iloc[0]
-                            )
-                            internal_scores.append(sim)
-
-                    # Diversidade = 1 - similaridade média interna
-                    if internal_scores:
-                        diversidade_interna.append(1 - np.mean(internal_scores))
+                rec_rows = self._rows_for_ids(recomendacoes)
+                if len(rec_rows):
+                    query_rows.append(row)
+                    recommendations.append(list(rec_rows))
             except Exception as e:
                 print(f"Erro na amostra {idx}: {e}")
                 erros += 1
 
+        jaccard_scores, diversidade_interna = self._score_recommendations(
+            query_rows, recommendations
+        )
+        for idx in range(0, len(jaccard_scores), 20):  # Mostrar progresso
+            print(f"Amostra {idx}: Jaccard médio = {jaccard_scores[idx]:.4f}")
+
+        sucessos = len(jaccard_scores)
+        diversidade_interna = diversidade_interna[~np.isnan(diversidade_interna)]
         print(f"Avaliação concluída: {sucessos} sucessos, {erros} erros")
->>>>>>> main
 
         # Calcular métricas agregadas
         resultados = {
-            "jaccard_médio": np.mean(jaccard_scores) if jaccard_scores else 0,
-            "jaccard_desvio": np.std(jaccard_scores) if jaccard_scores else 0,
-<<<<<<< HEAD
-            "cobertura": len(coverage) / len(self.df),
-            "diversidade_interna": (
-                np.mean(diversidade_interna) if diversidade_interna else 0
-            ),
-=======
+            "jaccard_médio": np.mean(jaccard_scores) if sucessos else 0,
+            "jaccard_desvio": np.std(jaccard_scores) if sucessos else 0,
             "cobertura": len(coverage) / len(self.df) if len(self.df) > 0 else 0,
             "diversidade_interna": (
-                np.mean(diversidade_interna) if diversidade_interna else 0
+                np.mean(diversidade_interna) if len(diversidade_interna) else 0
             ),
             "amostras_avaliadas": sucessos,
-            "total_amostras": len(test_samples),
->>>>>>> main
+            "total_amostras": len(test_rows),
         }
 
         return resultados
 
-    def evaluate_by_types(self, types=None):
+    def evaluate_by_types(self, types=None, random_state=None):
         """
         Avalia as recomendações por tipos de vinhos
 
         Parâmetros:
         types (list): Lista de tipos de vinho a avaliar, ou None para todos
+        random_state (int): Seed da amostragem por tipo
 
         Retorna:
         dict: Resultados por tipo de vinho
@@ -401,61 +385,33 @@ class JaccardWineEvaluator:
         if "technical_sheet_wine_type" not in self.df.columns:
             return {"error": "Coluna de tipo de vinho não disponível"}
 
+        rows_by_type = self.df.groupby(
+            "technical_sheet_wine_type", sort=False
+        ).indices
         if types is None:
             types = self.df["technical_sheet_wine_type"].unique()
 
+        rng = np.random.default_rng(random_state)
         resultados_por_tipo = {}
 
         for tipo in types:
             # Filtrar vinhos do tipo específico
-            vinhos_tipo = self.df[self.df["technical_sheet_wine_type"] == tipo]
+            vinhos_tipo = rows_by_type.get(tipo, [])
             if len(vinhos_tipo) < 5:  # Precisamos de alguns exemplos
                 continue
 
             # Selecionar amostra para teste
-            amostra_teste = vinhos_tipo.sample(min(20, len(vinhos_tipo)))
-
-            jaccard_scores = []
-<<<<<<< HEAD
-
-            for _, wine in amostra_teste.iterrows():
-                # Criar input de características
-                input_features = {}
-                for col in self.categorical_columns + self.numeric_columns:
-                    if pd.notna(wine[col]):
-                        input_features[col] = wine[col]
-
-                # Obter recomendações
-                recomendacoes = self.recommender.recommend_wines(
-                    input_features, top_n=5
-                )
-
-                # Calcular jaccard médio
-                jacc_scores = []
-                for rec_id in recomendacoes:
-                    rec_wine = self.df[self.df["id"] == rec_id].iloc[0]
-                    jacc = self._jaccard_similarity(wine, rec_wine)
-                    jacc_scores.append(jacc)
+            amostra_teste = rng.choice(
+                vinhos_tipo, min(20, len(vinhos_tipo)), replace=False
+            )
 
-                if jacc_scores:
-                    jaccard_scores.append(np.mean(jacc_scores))
-=======
-            sucessos = 0
+            query_rows = []
+            recommendations = []
 
-            for _, wine in amostra_teste.iterrows():
+            for row, input_features in zip(
+                amostra_teste, self._input_features(amostra_teste)
+            ):
                 try:
-                    # Criar input de características
-                    input_features = {}
-
-                    # Incluir todas as características disponíveis
-                    for col in (
-                        self.text_columns
-                        + self.categorical_columns
-                        + self.ordinal_columns
-                    ):
-                        if pd.notna(wine[col]):
-                            input_features[col] = wine[col]
-
                     # Obter recomendações
                     recomendacoes = self.recommender.recommend_wines(
                         input_features, top_n=5
@@ -464,28 +420,22 @@ class JaccardWineEvaluator:
                     if not recomendacoes:
                         continue
 
-                    # Calcular jaccard médio
-                    jacc_scores = []
-                    for rec_id in recomendacoes:
-                        rec_wine_df = self.df[self.df["id"] == rec_id]
-                        if len(rec_wine_df) == 0:
-                            continue
-
-                        jacc = self._jaccard_similarity(wine, rec_wine_df.iloc[0])
-                        jacc_scores.append(jacc)
-
-                    if jacc_scores:
-                        jaccard_scores.append(np.mean(jacc_scores))
-                        sucessos += 1
+                    rec_rows = self._rows_for_ids(recomendacoes)
+                    if len(rec_rows):
+                        query_rows.append(row)
+                        recommendations.append(list(rec_rows))
                 except Exception as e:
                     print(f"Erro na avaliação por tipo {tipo}: {e}")
->>>>>>> main
+
+            jaccard_scores, _ = self._score_recommendations(
+                query_rows, recommendations
+            )
 
             # Adicionar resultados para o tipo
             resultados_por_tipo[tipo] = {
-                "jaccard_médio": np.mean(jaccard_scores) if jaccard_scores else 0,
-<<<<<<< HEAD
-                "número_amostras": len(amostra_teste),
+                "jaccard_médio": np.mean(jaccard_scores) if len(jaccard_scores) else 0,
+                "número_amostras": len(jaccard_scores),
+                "total_amostras": len(amostra_teste),
             }
 
         return resultados_por_tipo
@@ -497,10 +447,3 @@ class JaccardWineEvaluator:
 # print(f"Jaccard Médio: {results['jaccard_médio']:.3f}")
 # print(f"Cobertura: {results['cobertura']:.2%}")
 # print(f"Diversidade Interna: {results['diversidade_interna']:.3f}")
-=======
-                "número_amostras": sucessos,
-                "total_amostras": len(amostra_teste),
-            }
-
-        return resultados_por_tipo
->>>>>>> main
@@ -0,0 +1,142 @@
+"""
+Tabela pré-calculada da similaridade ordinal para o espaço discreto dos sliders.
+
+O formulário envia apenas valores inteiros de 1 a 5 para as quatro colunas
+ordinais (fruit_tasting, sugar_tasting, acidity_tasting e tannin_tasting):
+são 5^4 = 625 combinações. OrdinalSimilarityTable calcula, no treino, o vetor
+de similaridade ordinal normalizada de cada combinação com todos os vinhos e o
+guarda quantizado em uint16 (erro absoluto máximo de 1/131070, as
+similaridades estão em [0, 1]). Na consulta, a componente ordinal vira uma
+leitura de linha da tabela, sem OrdinalEncoder, MinMaxScaler e np.linalg.norm.
+
+Consultas fora desse espaço (colunas ausentes, valores fora de 1-5) seguem o
+cálculo normal. A tabela guarda uma versão e uma impressão digital das
+features e codificadores do modelo; se não baterem (modelo retreinado ou
+compactado depois da tabela), ela é ignorada.
+"""
+
+import hashlib
+import itertools
+
+import numpy as np
+
+
+ORDINAL_TABLE_VERSION = 1
+SLIDER_VALUES = (1, 2, 3, 4, 5)
+DEFAULT_MAX_TABLE_MB = 256
+
+_QUANTIZATION_SCALE = np.iinfo(np.uint16).max
+
+
+def ordinal_similarity(numeric_features, query_vector):
+    """
+    Similaridade ordinal normalizada (min-max) de uma consulta com todos os vinhos.
+
+    Args:
+        numeric_features (np.ndarray): Features ordinais normalizadas (n x d)
+        query_vector (np.ndarray): Consulta codificada e normalizada (1 x d)
+
+    Returns:
+        np.ndarray: Similaridades em [0, 1]
+    """
+    distances = np.linalg.norm(numeric_features - query_vector, axis=1)
+    ordinal_sim = 1 / (1 + distances)
+    return (ordinal_sim - ordinal_sim.min()) / (
+        ordinal_sim.max() - ordinal_sim.min() + 1e-10
+    )
+
+
+def model_fingerprint(model):
+    """Hash das features ordinais e dos codificadores de que a tabela depende."""
+    digest = hashlib.sha1()
+    digest.update(repr(list(model.ordinal_columns)).encode())
+    features = np.ascontiguousarray(model.numeric_features_normalized)
+    digest.update(features.dtype.str.encode())
+    digest.update(features.tobytes())
+    for column in model.ordinal_columns:
+        digest.update(
+            np.asarray(model.ordinal_encoders[column].categories_[0], np.float64).tobytes()
+        )
+        digest.update(np.float64(model.ordinal_means[column]).tobytes())
+    if model.ordinal_columns:
+        digest.update(np.asarray(model.numeric_scaler.data_min_, np.float64).tobytes())
+        digest.update(np.asarray(model.numeric_scaler.data_max_, np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def table_nbytes(n_items, n_columns, values=SLIDER_VALUES):
+    """Tamanho (bytes) da tabela para n_items vinhos e n_columns colunas ordinais."""
+    return len(values) ** n_columns * n_items * np.dtype(np.uint16).itemsize
+
+
+class OrdinalSimilarityTable:
+    """Similaridade ordinal de cada combinação de sliders com todos os vinhos."""
+
+    def __init__(self, model, values=SLIDER_VALUES):
+        """
+        Args:
+            model (WineRecommender): Modelo treinado (com colunas ordinais)
+            values (tuple): Valores possíveis de cada slider
+        """
+        self.version = ORDINAL_TABLE_VERSION
+        self.columns = list(model.ordinal_columns)
+        self.values = tuple(values)
+        self.fingerprint = model_fingerprint(model)
+
+        features = model.numeric_features_normalized
+        combinations = itertools.product(self.values, repeat=len(self.columns))
+        self.table = np.empty(
+            (len(self.values) ** len(self.columns), len(features)), dtype=np.uint16
+        )
+        for row, combination in enumerate(combinations):
+            query_vector = model._ordinal_query_vector(dict(zip(self.columns, combination)))
+            self.table[row] = np.rint(
+                ordinal_similarity(features, query_vector) * _QUANTIZATION_SCALE
+            )
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def matches(self, model):
+        """Indica se a tabela foi gerada por esta versão e para este modelo."""
+        return (
+            getattr(self, "version", None) == ORDINAL_TABLE_VERSION
+            and self.columns == list(model.ordinal_columns)
+            and self.fingerprint == model_fingerprint(model)
+        )
+
+    def row_index(self, input_features):
+        """
+        Linha da tabela para a consulta.
+
+        Returns:
+            int ou None: Índice da combinação, ou None se alguma coluna ordinal
+                estiver ausente ou fora dos valores dos sliders
+        """
+        index = 0
+        for column in self.columns:
+            try:
+                value = float(input_features.get(column))
+            except (TypeError, ValueError):
+                return None
+            if value not in self.values:
+                return None
+            index = index * len(self.values) + self.values.index(value)
+        return index
+
+    def lookup(self, input_features):
+        """
+        Similaridade ordinal normalizada da consulta, lida da tabela.
+
+        Args:
+            input_features (dict): Features da consulta
+
+        Returns:
+            np.ndarray ou None: Similaridades em [0, 1], ou None se a consulta
+                estiver fora do espaço dos sliders
+        """
+        index = self.row_index(input_features)
+        if index is None:
+            return None
+        return self.table[index] * (1.0 / _QUANTIZATION_SCALE)
@@ -0,0 +1,244 @@
+"""
+Scoring de uma consulta em paralelo, por blocos de linhas do catálogo.
+
+Uma chamada de recommend_wines percorre a matriz TF-IDF (ou a de itens do
+scoring fundido) inteira num único núcleo. ShardedScorer divide os vinhos em
+blocos contíguos de linhas e calcula, num pool de threads, as similaridades e
+o top-k parcial de cada bloco; os top-k parciais são então combinados. Os
+blocos das matrizes CSR e densas são views (sem cópia) e o trabalho de cada
+thread fica nos kernels do NumPy e do SciPy (sparsetools), que liberam a GIL,
+de forma que a latência cai com a quantidade de núcleos em catálogos grandes.
+
+No scoring "legacy", a normalização por min-max de cada componente precisa
+do mínimo e do máximo do catálogo inteiro: o cálculo é feito em duas etapas
+(similaridades brutas e seus extremos por bloco; depois a combinação e o
+top-k parcial com os extremos globais). O scoring "fused" não normaliza e é
+feito numa etapa só, sobre blocos de colunas da matriz de itens transposta
+(montados na primeira consulta: uma cópia da matriz de itens por processo).
+
+Empates podem sair numa ordem diferente da do cálculo num único bloco.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+
+
+# Mínimo de vinhos por bloco: abaixo disso o custo das threads não compensa
+MIN_SHARD_ROWS = 5000
+
+
+def shard_bounds(n_items, n_shards):
+    """Limites [início, fim) de n_shards blocos contíguos de tamanhos próximos."""
+    bounds = np.linspace(0, n_items, n_shards + 1).astype(np.int64)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def row_block(matrix, start, stop):
+    """Linhas [start, stop) de uma csr_matrix, sem copiar data e indices."""
+    indptr = matrix.indptr[start : stop + 1]
+    return sp.csr_matrix(
+        (
+            matrix.data[indptr[0] : indptr[-1]],
+            matrix.indices[indptr[0] : indptr[-1]],
+            indptr - indptr[0],
+        ),
+        shape=(stop - start, matrix.shape[1]),
+        copy=False,
+    )
+
+
+def partial_top_k(scores, k, offset=0):
+    """
+    Os k maiores valores de um bloco, sem ordenar o bloco inteiro.
+
+    Returns:
+        tuple: (posições no catálogo, valores)
+    """
+    if k < len(scores):
+        positions = np.argpartition(-scores, k - 1)[:k]
+    else:
+        positions = np.arange(len(scores))
+    return positions + offset, scores[positions]
+
+
+def merge_top_k(parts, k):
+    """
+    Combina os top-k parciais dos blocos.
+
+    Returns:
+        tuple: (posições, valores) em ordem decrescente de valor
+    """
+    positions = np.concatenate([part[0] for part in parts])
+    scores = np.concatenate([part[1] for part in parts])
+    order = np.lexsort((positions, -scores))[:k]
+    return positions[order], scores[order]
+
+
+def _min_max(values, low, high):
+    return (values - low) / (high - low + 1e-10)
+
+
+def raw_components(text, ordinal, start, stop):
+    """
+    Similaridades textual e ordinal sem normalização das linhas [start, stop).
+
+    Args:
+        text (tuple ou None): ("sparse", matriz TF-IDF, vetor da consulta)
+            ou ("embedding", vetores dos vinhos, vetor projetado)
+        ordinal (tuple ou None): ("table", similaridades já normalizadas,
+            None) ou ("features", features ordinais normalizadas, vetor da
+            consulta)
+        start (int): Primeira linha
+        stop (int): Linha final (exclusiva)
+
+    Returns:
+        dict: "text" e/ou "ordinal" -> similaridades do bloco
+    """
+    components = {}
+    if text is not None:
+        kind, items, query = text
+        if kind == "sparse":
+            block = row_block(items, start, stop)
+            components["text"] = cosine_similarity(query, block)[0]
+        else:
+            components["text"] = items[start:stop] @ query
+    if ordinal is not None:
+        kind, values, query = ordinal
+        if kind == "table":
+            components["ordinal"] = values[start:stop]
+        else:
+            distances = np.linalg.norm(values[start:stop] - query, axis=1)
+            components["ordinal"] = 1 / (1 + distances)
+    return components
+
+
+def component_limits(blocks, normalized=()):
+    """
+    Mínimo e máximo de cada componente em todos os blocos.
+
+    Args:
+        blocks (list): Extremos ((mínimo, máximo) por componente) de cada bloco
+        normalized (tuple): Componentes que já vêm normalizados
+
+    Returns:
+        dict: Componente -> (mínimo, máximo) globais
+    """
+    limits = {}
+    for block in blocks:
+        for name, (low, high) in block.items():
+            if name in normalized:
+                continue
+            if name in limits:
+                low, high = min(low, limits[name][0]), max(high, limits[name][1])
+            limits[name] = (low, high)
+    return limits
+
+
+def block_limits(components):
+    """Extremos (mínimo, máximo) de cada componente de um bloco não vazio."""
+    return {
+        name: (values.min(), values.max())
+        for name, values in components.items()
+        if len(values)
+    }
+
+
+def combine_top_k(components, limits, weights, k, offset=0):
+    """
+    Soma ponderada dos componentes normalizados com os extremos globais e top-k.
+
+    A soma segue a ordem de recommend_wines (texto e depois ordinal), com o
+    mesmo resultado do cálculo num único bloco.
+
+    Returns:
+        tuple: (posições no catálogo, similaridades finais)
+    """
+    final = 0
+    for name, values in components.items():
+        if name in limits:
+            values = _min_max(values, *limits[name])
+        final = final + values * weights[name]
+    return partial_top_k(final, k, offset)
+
+
+class ShardedScorer:
+    """Pool de threads e blocos de linhas para o scoring de uma consulta."""
+
+    def __init__(self, n_threads, min_shard_rows=MIN_SHARD_ROWS):
+        """
+        Args:
+            n_threads (int): Threads (e blocos) por consulta
+            min_shard_rows (int): Mínimo de vinhos por bloco
+        """
+        self.n_threads = n_threads
+        self.min_shard_rows = min_shard_rows
+        self.pid = os.getpid()
+        self.pool = ThreadPoolExecutor(
+            max_workers=n_threads, thread_name_prefix="wine-scoring"
+        )
+        self._fused_blocks = None
+
+    def shards(self, n_items):
+        """Blocos do catálogo (um só se ele for pequeno demais para dividir)."""
+        n_shards = min(self.n_threads, max(1, n_items // self.min_shard_rows))
+        return shard_bounds(n_items, n_shards)
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+    def legacy_top_k(self, text, ordinal, weights, n_items, k):
+        """
+        Top-k do scoring "legacy" de uma consulta.
+
+        Args:
+            text (tuple ou None): Texto da consulta (ver raw_components)
+            ordinal (tuple ou None): Ordinais da consulta (ver raw_components)
+            weights (dict): Pesos "text" e "ordinal"
+            n_items (int): Vinhos no catálogo
+            k (int): Candidatos
+
+        Returns:
+            tuple: (posições, similaridades finais) em ordem decrescente
+        """
+        shards = self.shards(n_items)
+        blocks = list(
+            self.pool.map(lambda bounds: raw_components(text, ordinal, *bounds), shards)
+        )
+        # A tabela ordinal já vem normalizada
+        normalized = ("ordinal",) if ordinal is not None and ordinal[0] == "table" else ()
+        limits = component_limits([block_limits(block) for block in blocks], normalized)
+
+        def combine(shard):
+            (start, _), block = shard
+            return combine_top_k(block, limits, weights, k, start)
+
+        return merge_top_k(list(self.pool.map(combine, zip(shards, blocks))), k)
+
+    def fused_top_k(self, item_matrix_t, query_matrix, k):
+        """
+        Top-k do scoring "fused" de uma consulta.
+
+        Args:
+            item_matrix_t (sp.csr_matrix): Matriz de itens transposta do FusedScorer
+            query_matrix (sp.csr_matrix): Vetor da consulta (1 x largura)
+            k (int): Candidatos
+
+        Returns:
+            tuple: (posições, similaridades finais) em ordem decrescente
+        """
+        n_items = item_matrix_t.shape[1]
+        shards = self.shards(n_items)
+        cached = self._fused_blocks
+        if cached is None or cached[0] is not item_matrix_t or cached[1] != shards:
+            blocks = [item_matrix_t[:, start:stop].tocsr() for start, stop in shards]
+            cached = self._fused_blocks = (item_matrix_t, shards, blocks)
+
+        def score(shard):
+            (start, _), block = shard
+            return partial_top_k((query_matrix @ block).toarray()[0], k, start)
+
+        return merge_top_k(list(self.pool.map(score, zip(shards, cached[2]))), k)
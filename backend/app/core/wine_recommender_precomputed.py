@@ -0,0 +1,174 @@
+"""
+Tabela materializada de recomendações para consultas só com os sliders.
+
+Boa parte das consultas do formulário chega com harmonização, país e uva
+vazios: só os quatro sliders (1-5) importam, ou seja, 625 consultas possíveis.
+RecommendationTable guarda, para cada combinação, o top-N já diversificado
+(e, opcionalmente, para cada combinação junto com um único valor de tipo de
+vinho ou de país). Essas consultas são respondidas por leitura de uma linha da
+tabela, sem passar pelo scoring.
+
+A tabela vale para os parâmetros com que foi gerada (top_n, diversity_factor,
+feature_weights, scoring e modo da similaridade textual) e para o modelo de que foi gerada: ela guarda uma
+impressão digital das matrizes do modelo e é ignorada se o modelo for
+retreinado ou compactado sem que ela seja gerada de novo.
+"""
+
+import hashlib
+import itertools
+
+import numpy as np
+import scipy.sparse as sp
+
+from backend.app.core.wine_recommender_ordinal import SLIDER_VALUES, model_fingerprint
+
+
+RECOMMENDATION_TABLE_VERSION = 1
+BATCH_SIZE = 256
+
+
+def recommendation_fingerprint(model):
+    """Hash das features ordinais, da matriz TF-IDF e dos ids do modelo."""
+    digest = hashlib.sha1(model_fingerprint(model).encode())
+    text_matrix = sp.csr_matrix(model.text_matrix)
+    for array in (text_matrix.data, text_matrix.indices, text_matrix.indptr):
+        digest.update(array.dtype.str.encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(np.ascontiguousarray(model.df["id"].to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+def _is_empty(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+class RecommendationTable:
+    """Top-N diversificado de cada combinação dos sliders (e contexto opcional)."""
+
+    def __init__(
+        self,
+        model,
+        top_n=5,
+        diversity_factor=0.5,
+        context_columns=(),
+        values=SLIDER_VALUES,
+    ):
+        """
+        Args:
+            model (WineRecommender): Modelo treinado
+            top_n (int): Recomendações por consulta
+            diversity_factor (float): Fator de diversificação
+            context_columns (tuple): Colunas categóricas em que cada valor
+                conhecido (um por consulta) também é pré-calculado
+            values (tuple): Valores possíveis de cada slider
+        """
+        self.version = RECOMMENDATION_TABLE_VERSION
+        self.top_n = top_n
+        self.diversity_factor = diversity_factor
+        self.feature_weights = dict(model.feature_weights)
+        self.scoring = model._scoring()
+        self.text_similarity = model._text_similarity_mode()
+        self.columns = list(model.ordinal_columns)
+        self.context_columns = [
+            column for column in context_columns if column in model.label_encoders
+        ]
+        self.values = tuple(values)
+        self.fingerprint = recommendation_fingerprint(model)
+
+        # Contexto (coluna, valor) -> bloco de linhas; o bloco 0 é sem contexto
+        self.contexts = {None: 0}
+        for column in self.context_columns:
+            for value in model.label_encoders[column].classes_:
+                self.contexts[(column, str(value))] = len(self.contexts)
+
+        queries = []
+        for context in self.contexts:
+            for combination in itertools.product(self.values, repeat=len(self.columns)):
+                query = dict(zip(self.columns, combination))
+                if context is not None:
+                    query[context[0]] = context[1]
+                queries.append(query)
+
+        self.ids = np.full((len(queries), top_n), -1, dtype=np.int64)
+        for start in range(0, len(queries), BATCH_SIZE):
+            batch = model.recommend_wines_batch(
+                queries[start : start + BATCH_SIZE],
+                top_n=top_n,
+                diversity_factor=diversity_factor,
+            )
+            for row, ids in enumerate(batch, start):
+                self.ids[row, : len(ids)] = ids
+        if len(self.ids) and self.ids.max() <= np.iinfo(np.int32).max:
+            self.ids = self.ids.astype(np.int32)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matches(self, model):
+        """Indica se a tabela foi gerada por esta versão e para este modelo."""
+        return (
+            getattr(self, "version", None) == RECOMMENDATION_TABLE_VERSION
+            and self.columns == list(model.ordinal_columns)
+            and self.fingerprint == recommendation_fingerprint(model)
+        )
+
+    def serves(
+        self, top_n, diversity_factor, feature_weights, scoring, text_similarity="sparse"
+    ):
+        """Indica se os parâmetros da consulta são os da geração da tabela."""
+        return (
+            top_n == self.top_n
+            and diversity_factor == self.diversity_factor
+            and scoring == self.scoring
+            and dict(feature_weights) == self.feature_weights
+            and text_similarity == getattr(self, "text_similarity", "sparse")
+        )
+
+    def row_index(self, input_features):
+        """
+        Linha da tabela para a consulta.
+
+        Returns:
+            int ou None: Índice da linha, ou None se a consulta tiver outras
+                features além dos sliders (e de um valor de contexto)
+        """
+        index, context = 0, None
+        for column, value in input_features.items():
+            if column in self.columns or _is_empty(value):
+                continue
+            if context is not None:
+                return None
+            context = (column, str(value))
+        if context not in self.contexts:
+            return None
+
+        for column in self.columns:
+            try:
+                value = float(input_features.get(column))
+            except (TypeError, ValueError):
+                return None
+            if value not in self.values:
+                return None
+            index = index * len(self.values) + self.values.index(value)
+        return self.contexts[context] * len(self.values) ** len(self.columns) + index
+
+    def lookup(self, input_features):
+        """
+        Recomendações pré-calculadas da consulta.
+
+        Args:
+            input_features (dict): Features da consulta (já filtradas pelo modelo)
+
+        Returns:
+            list ou None: Ids recomendados, ou None se a consulta não estiver
+                na tabela
+        """
+        index = self.row_index(input_features)
+        if index is None:
+            return None
+        ids = self.ids[index]
+        return ids[ids >= 0].tolist()
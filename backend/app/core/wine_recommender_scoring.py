@@ -0,0 +1,133 @@
+"""
+Scoring fundido do WineRecommender: uma única multiplicação esparsa por consulta.
+
+A matriz de itens empilha, para cada vinho, os blocos
+
+    [ TF-IDF (normalizado por L2) | one-hot das categóricas | x | ||x||² ]
+
+onde x são as features ordinais normalizadas (0-1). O vetor da consulta leva
+os pesos de cada bloco, de forma que os pesos podem mudar a cada consulta sem
+reconstruir a matriz:
+
+    [ w_t * tfidf(q) | w_c / k nas categorias da consulta | 2 w_o q / d | -w_o / d ]
+
+O produto dá w_t * cos(q, x) + w_c * (fração das k categóricas informadas que
+coincidem) + w_o * (||q||² - ||x - q||²) / d, em que d é o número de colunas
+ordinais. O termo ||q||² é constante por consulta e não muda o ranking, então a
+parte ordinal equivale a 1 - ||x - q||² / d, uma similaridade em [0, 1] como as
+outras duas. Ao contrário do scoring original, os componentes não são
+normalizados por min-max a cada consulta e o peso categórico é usado.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+
+SCORING_MODES = ("legacy", "fused")
+
+
+class FusedScorer:
+    """Matriz de itens fundida e montagem dos vetores de consulta."""
+
+    def __init__(self, text_matrix, categoric_codes, ordinal_features):
+        """
+        Args:
+            text_matrix (sp.csr_matrix): TF-IDF dos vinhos (linhas normalizadas)
+            categoric_codes (dict): coluna -> (códigos do LabelEncoder por
+                vinho, quantidade de classes)
+            ordinal_features (np.ndarray): Features ordinais normalizadas (n x d)
+        """
+        n_items = text_matrix.shape[0]
+        blocks = [sp.csr_matrix(text_matrix, dtype=np.float32)]
+        offset = text_matrix.shape[1]
+
+        self.categoric_offsets = {}
+        rows = np.arange(n_items)
+        for column, (codes, n_classes) in categoric_codes.items():
+            codes = np.asarray(codes, dtype=np.int64)
+            blocks.append(
+                sp.csr_matrix(
+                    (np.ones(n_items, dtype=np.float32), (rows, codes)),
+                    shape=(n_items, n_classes),
+                )
+            )
+            self.categoric_offsets[column] = (offset, n_classes)
+            offset += n_classes
+
+        self.ordinal_offset = offset
+        ordinal = np.asarray(ordinal_features, dtype=np.float32)
+        self.n_ordinal = ordinal.shape[1] if ordinal.ndim == 2 else 0
+        if self.n_ordinal:
+            blocks.append(sp.csr_matrix(ordinal))
+            blocks.append(sp.csr_matrix((ordinal**2).sum(axis=1, keepdims=True)))
+
+        # Guardada transposta (colunas x vinhos) para que consulta @ matriz não
+        # precise converter a matriz de itens a cada chamada
+        self.item_matrix_t = sp.hstack(blocks, format="csr").T.tocsr()
+
+    @property
+    def width(self):
+        return self.item_matrix_t.shape[0]
+
+    @property
+    def nbytes(self):
+        matrix = self.item_matrix_t
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+    def query_matrix(self, queries, weights):
+        """
+        Monta os vetores (já ponderados) de um lote de consultas.
+
+        Args:
+            queries (list): Dicionários com "text" (linha TF-IDF ou None),
+                "categoric" ({coluna: código}) e "ordinal" (vetor normalizado
+                ou None)
+            weights (dict): Pesos "text", "categoric" e "ordinal"
+
+        Returns:
+            sp.csr_matrix: Matriz n_consultas x largura da matriz de itens
+        """
+        rows, columns, values = [], [], []
+        for i, query in enumerate(queries):
+            text = query.get("text")
+            if text is not None and weights.get("text", 0) > 0:
+                rows.extend([i] * text.nnz)
+                columns.extend(text.indices)
+                values.extend(text.data * weights["text"])
+
+            categoric = [
+                self.categoric_offsets[column][0] + code
+                for column, code in query.get("categoric", {}).items()
+                if column in self.categoric_offsets
+                and 0 <= code < self.categoric_offsets[column][1]
+            ]
+            if categoric and weights.get("categoric", 0) > 0:
+                rows.extend([i] * len(categoric))
+                columns.extend(categoric)
+                values.extend([weights["categoric"] / len(categoric)] * len(categoric))
+
+            ordinal = query.get("ordinal")
+            if ordinal is not None and self.n_ordinal and weights.get("ordinal", 0) > 0:
+                weight = weights["ordinal"] / self.n_ordinal
+                rows.extend([i] * (self.n_ordinal + 1))
+                columns.extend(
+                    range(self.ordinal_offset, self.ordinal_offset + self.n_ordinal + 1)
+                )
+                values.extend(np.append(2 * weight * np.ravel(ordinal), -weight))
+
+        return sp.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (rows, columns)),
+            shape=(len(queries), self.width),
+        )
+
+    def scores(self, query_matrix):
+        """
+        Similaridade final de cada consulta com todos os vinhos.
+
+        Args:
+            query_matrix (sp.csr_matrix): Saída de query_matrix
+
+        Returns:
+            np.ndarray: Matriz n_consultas x n_vinhos
+        """
+        return (query_matrix @ self.item_matrix_t).toarray()
@@ -0,0 +1,691 @@
+"""
+Recomendador dividido em shards de linhas do catálogo, um processo por shard.
+
+build_shards divide um WineRecommender treinado em N fatias contíguas de
+vinhos (WineShard: ids, linhas do TF-IDF, features ordinais normalizadas,
+códigos das categóricas e, com o embedding ativo, os vetores SVD) e salva cada
+uma num arquivo próprio, ao lado do coordenador: um esqueleto do modelo com o
+vetorizador, os codificadores, o scaler, o vocabulário e o índice de filtros,
+além dos ids de todos os vinhos. Como o vetorizador e os codificadores são os
+mesmos para todos os shards, as pontuações de shards diferentes são
+comparáveis.
+
+ShardedRecommender carrega o coordenador e inicia um processo (spawn) por
+shard, que carrega apenas o seu arquivo. Cada consulta é codificada uma única
+vez no coordenador e enviada a todos os shards, que devolvem o seu top-k
+parcial com as pontuações, os ids e os vetores de texto dos candidatos; o
+coordenador combina os top-k e aplica a diversificação (MMR).
+
+No scoring "legacy", a normalização por min-max de cada componente usa os
+extremos do catálogo inteiro: a consulta faz duas rodadas (extremos das
+similaridades brutas em cada shard; depois o top-k parcial com os extremos
+globais), com o mesmo ranking do modelo inteiro a menos da ordem de empates.
+O scoring "fused" faz uma rodada só. Filtros por atributo são resolvidos no
+coordenador e cada shard recebe as suas posições. O índice de clusters e as
+tabelas pré-calculadas não são usados nos shards.
+
+Uso:
+    build_shards(model, "model/shards", 4)
+    with ShardedRecommender("model/shards") as recommender:
+        recommender.recommend_wines({"technical_sheet_country": "Chile"})
+"""
+
+import copy
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from backend.app.core.wine_recommender_parallel import (
+    block_limits,
+    combine_top_k,
+    component_limits,
+    partial_top_k,
+    raw_components,
+    shard_bounds,
+)
+from backend.app.core.wine_recommender_precomputed import recommendation_fingerprint
+from backend.app.core.wine_recommender_scoring import FusedScorer
+from backend.app.core.wine_recommender_vocabulary import DEFAULT_COMPLETIONS
+from backend.app.utils.metrics import (
+    RECOMMENDER_QUERY_SECONDS,
+    RECOMMENDER_STAGE_SECONDS,
+    span,
+    timed,
+)
+
+
+SHARD_FORMAT_VERSION = 1
+COORDINATOR_FILE = "coordinator.pkl"
+# Consultas "legacy" guardadas por um shard entre as duas rodadas
+MAX_PENDING_QUERIES = 256
+SHARD_COMMANDS = ("extremes", "top_k", "fused_top_k", "item")
+
+
+class WineShard:
+    """Fatia contígua de linhas do catálogo, servida por um processo."""
+
+    def __init__(self, model, index, start, stop, build_id, embedding=None):
+        """
+        Args:
+            model (WineRecommender): Modelo treinado
+            index (int): Número do shard
+            start (int): Primeira linha do catálogo
+            stop (int): Linha final do catálogo (exclusiva)
+            build_id (str): Identificador da divisão, igual no coordenador
+            embedding (TextEmbedding): Embedding de texto ativo (None = TF-IDF)
+        """
+        self.version = SHARD_FORMAT_VERSION
+        self.index = index
+        self.start = start
+        self.stop = stop
+        self.build_id = build_id
+        self.ids = model.df["id"].to_numpy()[start:stop].copy()
+        self.text_matrix = sp.csr_matrix(model.text_matrix[start:stop])
+        self.numeric_features = np.ascontiguousarray(
+            model.numeric_features_normalized[start:stop]
+        )
+        self.categoric = {
+            col: (
+                model.df[col].to_numpy()[start:stop].copy(),
+                len(model.label_encoders[col].classes_),
+            )
+            for col in model.categoric_columns
+        }
+        self.item_vectors = (
+            None if embedding is None else embedding.item_vectors[start:stop].copy()
+        )
+        self._fused_scorer = None
+        self._pending = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_fused_scorer"] = None
+        state["_pending"] = {}
+        return state
+
+    def _rows(self, subset):
+        """Linhas do shard (ou de subset): texto, ordinais e vetores SVD."""
+        if subset is None:
+            return self.text_matrix, self.numeric_features, self.item_vectors
+        return (
+            self.text_matrix[subset],
+            self.numeric_features[subset],
+            None if self.item_vectors is None else self.item_vectors[subset],
+        )
+
+    def _candidates(self, positions, scores, subset, embedding):
+        """Top-k parcial com posições globais, ids e vetores da diversificação."""
+        if subset is not None:
+            positions = subset[positions]
+        rows = self.item_vectors[positions] if embedding else self.text_matrix[positions]
+        return positions + self.start, scores, self.ids[positions], rows
+
+    def extremes(self, request_id, queries, subset=None):
+        """
+        Primeira rodada do scoring "legacy": similaridades brutas da consulta.
+
+        As similaridades ficam guardadas até a chamada de top_k com o mesmo
+        request_id.
+
+        Args:
+            request_id (int): Identificador da consulta no coordenador
+            queries (list): Dicionários com "text" (linha TF-IDF ou None),
+                "embedded" (vetor SVD ou None) e "ordinal" (vetor ou None)
+            subset (np.ndarray): Posições locais dos vinhos (None = todos)
+
+        Returns:
+            list: (mínimo, máximo) de cada componente, por consulta
+        """
+        text_matrix, numeric_features, item_vectors = self._rows(subset)
+        n_rows = len(numeric_features)
+        blocks = []
+        for query in queries:
+            text = ordinal = None
+            if query["embedded"] is not None:
+                text = ("embedding", item_vectors, query["embedded"])
+            elif query["text"] is not None:
+                text = ("sparse", text_matrix, query["text"])
+            if query["ordinal"] is not None:
+                ordinal = ("features", numeric_features, query["ordinal"])
+            blocks.append(raw_components(text, ordinal, 0, n_rows) if n_rows else {})
+
+        while len(self._pending) >= MAX_PENDING_QUERIES:
+            self._pending.pop(next(iter(self._pending)))
+        self._pending[request_id] = (blocks, subset)
+        return [block_limits(block) for block in blocks]
+
+    def top_k(self, request_id, limits, weights, k, embedding=False):
+        """
+        Segunda rodada do scoring "legacy": top-k com os extremos globais.
+
+        Args:
+            request_id (int): Identificador usado em extremes
+            limits (list): (mínimo, máximo) globais de cada componente, por consulta
+            weights (dict): Pesos "text" e "ordinal"
+            k (int): Candidatos por consulta
+            embedding (bool): Devolve os vetores SVD em vez das linhas TF-IDF
+
+        Returns:
+            list: (posições globais, similaridades, ids, vetores) por consulta
+        """
+        blocks, subset = self._pending.pop(request_id)
+        results = []
+        for block, query_limits in zip(blocks, limits):
+            if block:
+                ranked = combine_top_k(block, query_limits, weights, k)
+            else:
+                ranked = (np.array([], dtype=np.int64), np.array([]))
+            results.append(self._candidates(*ranked, subset, embedding))
+        return results
+
+    def fused_top_k(self, query_matrix, k, subset=None, embedding=False):
+        """
+        Top-k parcial do scoring "fused".
+
+        Args:
+            query_matrix (sp.csr_matrix): Vetores das consultas (FusedScorer.query_matrix)
+            k (int): Candidatos por consulta
+            subset (np.ndarray): Posições locais dos vinhos (None = todos)
+            embedding (bool): Devolve os vetores SVD em vez das linhas TF-IDF
+
+        Returns:
+            list: (posições globais, similaridades, ids, vetores) por consulta
+        """
+        if self._fused_scorer is None:
+            self._fused_scorer = FusedScorer(
+                self.text_matrix, self.categoric, self.numeric_features
+            )
+        item_matrix_t = self._fused_scorer.item_matrix_t
+        if subset is not None:
+            item_matrix_t = item_matrix_t[:, subset]
+        scores = (query_matrix @ item_matrix_t).toarray()
+        return [
+            self._candidates(*partial_top_k(row, k), subset, embedding) for row in scores
+        ]
+
+    def item(self, position):
+        """
+        Vetores de um vinho do shard, usados como consulta em similar_wines.
+
+        Args:
+            position (int): Posição local do vinho
+
+        Returns:
+            tuple: (linha TF-IDF, vetor SVD ou None, features ordinais)
+        """
+        return (
+            self.text_matrix[position],
+            None if self.item_vectors is None else self.item_vectors[position],
+            self.numeric_features[position : position + 1],
+        )
+
+
+def coordinator_skeleton(model):
+    """
+    Esqueleto do modelo usado pelo coordenador.
+
+    Mantém o vetorizador, os codificadores, o scaler, o vocabulário, o índice
+    de filtros e os ids dos vinhos; a matriz de itens do FusedScorer fica sem
+    linhas (serve só para montar os vetores das consultas) e o embedding, só
+    com os componentes da projeção.
+
+    Args:
+        model (WineRecommender): Modelo treinado
+
+    Returns:
+        WineRecommender: Esqueleto (não recomenda sozinho)
+    """
+    embedding = model._active_embedding()
+    ordinal = np.asarray(model.numeric_features_normalized)
+    skeleton = copy.copy(model)
+    skeleton.df = pd.DataFrame({"id": model.df["id"].to_numpy()})
+    skeleton.fused_scorer = FusedScorer(
+        sp.csr_matrix((0, model.text_matrix.shape[1]), dtype=np.float32),
+        {
+            col: (np.array([], dtype=np.int64), len(model.label_encoders[col].classes_))
+            for col in model.categoric_columns
+        },
+        ordinal[:0],
+    )
+    skeleton.text_matrix = None
+    skeleton.numeric_features_normalized = None
+    skeleton.ordinal_table = None
+    skeleton.recommendation_table = None
+    skeleton.cluster_index = None
+    skeleton.text_embedding = None
+    skeleton.text_similarity_mode = "sparse"
+    if embedding is not None:
+        skeleton.text_embedding = copy.copy(embedding)
+        skeleton.text_embedding.item_vectors = None
+        skeleton.text_similarity_mode = "embedding"
+    for attribute in model._transient_attributes:
+        skeleton.__dict__.pop(attribute, None)
+    return skeleton
+
+
+def build_shards(model, directory, n_shards):
+    """
+    Divide o modelo em shards e salva cada um e o coordenador em directory.
+
+    Args:
+        model (WineRecommender): Modelo treinado
+        directory (str): Diretório de saída
+        n_shards (int): Quantidade de shards
+
+    Returns:
+        str: Caminho do arquivo do coordenador
+    """
+    n_items = len(model.df)
+    n_shards = max(1, min(n_shards, n_items))
+    build_id = recommendation_fingerprint(model)
+    embedding = model._active_embedding()
+    os.makedirs(directory, exist_ok=True)
+
+    bounds = [(int(start), int(stop)) for start, stop in shard_bounds(n_items, n_shards)]
+    files = []
+    for index, (start, stop) in enumerate(bounds):
+        shard = WineShard(model, index, start, stop, build_id, embedding)
+        files.append(f"shard_{index:03d}.pkl")
+        joblib.dump(shard, os.path.join(directory, files[-1]))
+
+    path = os.path.join(directory, COORDINATOR_FILE)
+    joblib.dump(
+        {
+            "version": SHARD_FORMAT_VERSION,
+            "build_id": build_id,
+            "bounds": bounds,
+            "shards": files,
+            "model": coordinator_skeleton(model),
+        },
+        path,
+    )
+    print(f"Modelo dividido em {n_shards} shards salvos em {directory}")
+    return path
+
+
+def _serve_shard(path, connection):
+    """Laço do processo de um shard: executa os comandos do coordenador."""
+    # O encerramento é comandado pelo coordenador
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        shard = joblib.load(path)
+    except Exception as e:
+        connection.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    connection.send(("ok", (shard.version, shard.build_id, shard.start, shard.stop)))
+
+    while True:
+        try:
+            command, args = connection.recv()
+        except EOFError:
+            break
+        if command == "stop":
+            break
+        try:
+            if command not in SHARD_COMMANDS:
+                raise ValueError(f"Comando desconhecido: {command}")
+            connection.send(("ok", getattr(shard, command)(*args)))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class ShardedRecommender:
+    """Coordenador: espalha as consultas pelos shards e combina os top-k."""
+
+    def __init__(self, directory, start=True):
+        """
+        Args:
+            directory (str): Diretório gerado por build_shards
+            start (bool): Inicia os processos dos shards
+        """
+        path = os.path.join(directory, COORDINATOR_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Coordenador não encontrado: {path}")
+        coordinator = joblib.load(path)
+        if coordinator.get("version") != SHARD_FORMAT_VERSION:
+            raise ValueError(f"Formato de shards incompatível em {directory}")
+
+        self.directory = directory
+        self.build_id = coordinator["build_id"]
+        self.bounds = coordinator["bounds"]
+        self.shard_files = coordinator["shards"]
+        self.model = coordinator["model"]
+        # O embedding foi validado contra o modelo inteiro em build_shards
+        self.model._text_embedding_checked = True
+        self.df = self.model.df
+        self.workers = []
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        if start:
+            self.start()
+
+    def start(self):
+        """Inicia um processo por shard e confere se ele pertence a esta divisão."""
+        context = multiprocessing.get_context("spawn")
+        try:
+            for index, name in enumerate(self.shard_files):
+                connection, child_connection = context.Pipe()
+                process = context.Process(
+                    target=_serve_shard,
+                    args=(os.path.join(self.directory, name), child_connection),
+                    name=f"wine-shard-{index}",
+                    daemon=True,
+                )
+                process.start()
+                child_connection.close()
+                self.workers.append((connection, process))
+
+            for index, (connection, _) in enumerate(self.workers):
+                try:
+                    status, value = connection.recv()
+                except EOFError:
+                    status, value = "error", "processo encerrado"
+                if status != "ok":
+                    raise RuntimeError(f"Erro ao carregar o shard {index}: {value}")
+                if value != (SHARD_FORMAT_VERSION, self.build_id, *self.bounds[index]):
+                    raise ValueError(
+                        f"Shard {index} não corresponde ao coordenador em {self.directory}"
+                    )
+        except Exception:
+            self.close()
+            raise
+        print(f"{len(self.workers)} shards iniciados ({len(self.df)} vinhos)")
+
+    def close(self):
+        """Encerra os processos dos shards."""
+        for connection, _ in self.workers:
+            try:
+                connection.send(("stop", ()))
+            except (OSError, ValueError):
+                pass
+        for connection, process in self.workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _scatter(self, commands):
+        """
+        Envia um comando a cada shard e espera todas as respostas.
+
+        Args:
+            commands (list): (comando, argumentos) de cada shard
+
+        Returns:
+            list: Resultado de cada shard
+        """
+        if not self.workers:
+            raise RuntimeError("Shards não iniciados: use start()")
+        with self._lock, span(RECOMMENDER_STAGE_SECONDS, stage="scatter"):
+            for (connection, _), command in zip(self.workers, commands):
+                connection.send(command)
+            replies = []
+            for connection, _ in self.workers:
+                try:
+                    replies.append(connection.recv())
+                except EOFError:
+                    replies.append(("error", "processo encerrado"))
+        for index, (status, value) in enumerate(replies):
+            if status != "ok":
+                raise RuntimeError(f"Erro no shard {index}: {value}")
+        return [value for _, value in replies]
+
+    def _request(self, index, command):
+        """Envia um comando a um único shard e devolve o resultado."""
+        with self._lock:
+            connection = self.workers[index][0]
+            connection.send(command)
+            try:
+                status, value = connection.recv()
+            except EOFError:
+                status, value = "error", "processo encerrado"
+        if status != "ok":
+            raise RuntimeError(f"Erro no shard {index}: {value}")
+        return value
+
+    def _split(self, subset):
+        """Posições locais de subset em cada shard (None = todos os vinhos)."""
+        if subset is None:
+            return [None] * len(self.bounds)
+        return [
+            subset[np.searchsorted(subset, start) : np.searchsorted(subset, stop)] - start
+            for start, stop in self.bounds
+        ]
+
+    def _legacy_queries(self, inputs, feature_weights):
+        """Texto (TF-IDF ou projetado no embedding) e ordinais de cada consulta."""
+        model = self.model
+        queries = [{"text": None, "embedded": None, "ordinal": None} for _ in inputs]
+        if feature_weights["text"] > 0 and model.text_columns:
+            assembler = model._text_assembler()
+            texts, positions = [], []
+            for position, input_features in enumerate(inputs):
+                parts = assembler.query_parts(input_features)
+                if parts:
+                    texts.append(parts)
+                    positions.append(position)
+            if texts:
+                input_vectors = model._vectorize_queries(texts).tocsr()
+                embedding = model._active_embedding()
+                embedded = None if embedding is None else embedding.transform(input_vectors)
+                for row, position in enumerate(positions):
+                    queries[position]["text"] = input_vectors[row]
+                    if embedded is not None:
+                        queries[position]["embedded"] = embedded[row]
+        if feature_weights["ordinal"] > 0:
+            for query, input_features in zip(queries, inputs):
+                query["ordinal"] = model._ordinal_query_vector(input_features)
+        return queries
+
+    def _gather(self, queries, feature_weights, scoring, k, subset=None):
+        """
+        Top-k global de cada consulta já codificada.
+
+        Returns:
+            list: (similaridades, ids, vetores da diversificação) por consulta,
+                ou None para consultas sem feature pontuável
+        """
+        embedding = self.model._active_embedding() is not None
+        local_subsets = self._split(subset)
+        if scoring == "fused":
+            query_matrix = self.model.fused_scorer.query_matrix(queries, feature_weights)
+            scored = [i for i, nnz in enumerate(np.diff(query_matrix.indptr)) if nnz]
+            if not scored:
+                return [None] * len(queries)
+            query_matrix = query_matrix[scored]
+            parts = self._scatter(
+                [
+                    ("fused_top_k", (query_matrix, k, local, embedding))
+                    for local in local_subsets
+                ]
+            )
+        else:
+            scored = [
+                i
+                for i, query in enumerate(queries)
+                if query["text"] is not None or query["ordinal"] is not None
+            ]
+            if not scored:
+                return [None] * len(queries)
+            request_id = next(self._request_ids)
+            scored_queries = [queries[i] for i in scored]
+            extremes = self._scatter(
+                [
+                    ("extremes", (request_id, scored_queries, local))
+                    for local in local_subsets
+                ]
+            )
+            limits = [
+                component_limits([shard[i] for shard in extremes])
+                for i in range(len(scored))
+            ]
+            parts = self._scatter(
+                [("top_k", (request_id, limits, feature_weights, k, embedding))]
+                * len(self.workers)
+            )
+
+        results = [None] * len(queries)
+        for row, i in enumerate(scored):
+            shards = [shard[row] for shard in parts]
+            positions = np.concatenate([shard[0] for shard in shards])
+            scores = np.concatenate([shard[1] for shard in shards])
+            order = np.lexsort((positions, -scores))[:k]
+            ids = np.concatenate([shard[2] for shard in shards])
+            rows = [shard[3] for shard in shards]
+            rows = np.vstack(rows) if embedding else sp.vstack(rows, format="csr")
+            results[i] = (scores[order], ids[order], rows[order])
+        return results
+
+    def _select(self, ranked, top_n, diversity_factor, random_state):
+        """Ids recomendados a partir dos candidatos combinados (com MMR)."""
+        if ranked is None:
+            return []
+        scores, ids, rows = ranked
+        if not len(ids):
+            return []
+        if diversity_factor <= 0:
+            return ids[:top_n].tolist()
+        candidates = pd.DataFrame({"id": ids, "similarity": scores})
+        with span(RECOMMENDER_STAGE_SECONDS, stage="mmr"):
+            return self.model._safe_diversify(
+                candidates=candidates,
+                text_matrix=rows,
+                similarity_scores=scores,
+                top_n=top_n,
+                lambda_param=diversity_factor,
+                random_state=random_state,
+            )
+
+    def _prepare(self, inputs, feature_weights, scoring):
+        """Consultas filtradas, resolvidas e codificadas para o scoring."""
+        model = self.model
+        valid_columns = model.text_columns + model.ordinal_columns + model.categoric_columns
+        inputs = [
+            model.resolve_input(
+                {k: v for k, v in input_features.items() if k in valid_columns}
+            )
+            for input_features in inputs
+        ]
+        if scoring == "fused":
+            return model._fused_queries(inputs)
+        return self._legacy_queries(inputs, feature_weights)
+
+    @timed(RECOMMENDER_QUERY_SECONDS)
+    def recommend_wines(self, input_features, **options):
+        """
+        Recomenda vinhos consultando todos os shards.
+
+        Aceita as mesmas opções de recommend_wines_batch.
+
+        Returns:
+            list: Ids recomendados
+        """
+        return self.recommend_wines_batch([input_features], **options)[0]
+
+    def recommend_wines_batch(
+        self,
+        inputs,
+        top_n=5,
+        diversity_factor=0.5,
+        random_state=None,
+        feature_weights=None,
+        scoring=None,
+        filters=None,
+        n_probe=None,
+    ):
+        """
+        Recomenda vinhos para várias consultas, numa rodada de mensagens por shard.
+
+        Args:
+            inputs (list): Lista de dicionários de features
+            top_n (int): Quantidade de recomendações por consulta
+            diversity_factor (float): 0-1 (0=sem diversificação, 1=máxima diversificação)
+            random_state (int): Seed para reprodutibilidade
+            feature_weights (dict): Pesos a usar no lugar dos do modelo
+            scoring (str): "legacy" ou "fused" (None = scoring do modelo)
+            filters (dict): Filtro por atributo (ver WineRecommender.filter_positions)
+            n_probe (int): Ignorado (os shards não usam o índice de clusters)
+
+        Returns:
+            list: Lista de ids recomendados para cada consulta
+        """
+        if feature_weights is None:
+            feature_weights = self.model.feature_weights
+        scoring = scoring or self.model._scoring()
+
+        subset = self.model.filter_positions(filters)
+        n_candidates = len(self.df) if subset is None else len(subset)
+        if not inputs or not n_candidates:
+            return [[] for _ in inputs]
+
+        queries = self._prepare(inputs, feature_weights, scoring)
+        k = min(5 * top_n, n_candidates)
+        return [
+            self._select(ranked, top_n, diversity_factor, random_state)
+            for ranked in self._gather(queries, feature_weights, scoring, k, subset)
+        ]
+
+    def similar_wines(
+        self,
+        wine_id,
+        top_n=5,
+        diversity_factor=0.5,
+        random_state=None,
+        feature_weights=None,
+    ):
+        """
+        Recomenda vinhos parecidos com um vinho do catálogo (scoring "legacy").
+
+        Returns:
+            list ou None: Ids recomendados, ou None se o id não existir
+        """
+        if feature_weights is None:
+            feature_weights = self.model.feature_weights
+
+        positions = np.flatnonzero(self.df["id"].to_numpy() == wine_id)
+        if len(positions) == 0:
+            return None
+        position = int(positions[0])
+        index = next(i for i, (_, stop) in enumerate(self.bounds) if position < stop)
+        text_vector, item_vector, ordinal_vector = self._request(
+            index, ("item", (position - self.bounds[index][0],))
+        )
+
+        query = {"text": None, "embedded": None, "ordinal": None}
+        if feature_weights["text"] > 0 and self.model.text_columns:
+            query["text"] = text_vector
+            if self.model._active_embedding() is not None:
+                query["embedded"] = item_vector
+        if feature_weights["ordinal"] > 0 and self.model.ordinal_columns:
+            query["ordinal"] = ordinal_vector
+
+        # Um candidato a mais: o próprio vinho sai do ranking
+        k = min(5 * top_n + 1, len(self.df))
+        ranked = self._gather([query], feature_weights, "legacy", k)[0]
+        if ranked is not None:
+            keep = np.flatnonzero(ranked[1] != wine_id)[: 5 * top_n]
+            ranked = tuple(values[keep] for values in ranked)
+        return self._select(ranked, top_n, diversity_factor, random_state)
+
+    def filter_positions(self, filters):
+        return self.model.filter_positions(filters)
+
+    def complete(self, column, prefix, limit=DEFAULT_COMPLETIONS):
+        return self.model.complete(column, prefix, limit)
+
+    def text_cache_stats(self):
+        return self.model.text_cache_stats()
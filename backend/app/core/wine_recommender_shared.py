@@ -0,0 +1,192 @@
+"""
+Publicação das matrizes do WineRecommender em memória compartilhada.
+
+O processo principal carrega o modelo uma única vez e copia para segmentos de
+multiprocessing.shared_memory os arrays da matriz TF-IDF (data, indices e
+indptr), as features ordinais normalizadas, os ids dos vinhos e, quando
+existirem, a matriz de itens do FusedScorer, a tabela ordinal e os vetores do
+embedding de texto. Os workers recebem apenas o "esqueleto" do modelo
+(vetorizador, codificadores e pesos) e montam as matrizes como views somente
+leitura sobre os segmentos, sem cópia: a memória ocupada pelas matrizes não
+cresce com a quantidade de processos.
+
+Os segmentos devem ser anexados por processos iniciados pelo processo que os
+publicou (que compartilham o mesmo resource_tracker); é ele quem os remove em
+close().
+"""
+
+import copy
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+
+# Atributos grandes do modelo que vão para a memória compartilhada
+SHARED_ATTRIBUTES = ("text_matrix", "numeric_features_normalized", "df")
+
+
+def _model_arrays(model):
+    text_matrix = csr_matrix(model.text_matrix)
+    arrays = {
+        "text_data": text_matrix.data,
+        "text_indices": text_matrix.indices,
+        "text_indptr": text_matrix.indptr,
+        "numeric_features": np.ascontiguousarray(model.numeric_features_normalized),
+        "ids": model.df["id"].to_numpy(),
+    }
+    shapes = {"text_shape": tuple(text_matrix.shape)}
+
+    fused_scorer = getattr(model, "fused_scorer", None)
+    if fused_scorer is not None:
+        item_matrix_t = fused_scorer.item_matrix_t
+        arrays["fused_data"] = item_matrix_t.data
+        arrays["fused_indices"] = item_matrix_t.indices
+        arrays["fused_indptr"] = item_matrix_t.indptr
+        shapes["fused_shape"] = tuple(item_matrix_t.shape)
+
+    if getattr(model, "ordinal_table", None) is not None:
+        arrays["ordinal_table"] = model.ordinal_table.table
+    if getattr(model, "text_embedding", None) is not None:
+        arrays["embedding_items"] = model.text_embedding.item_vectors
+        arrays["embedding_components"] = model.text_embedding.components_t
+    return arrays, shapes
+
+
+def model_skeleton(model):
+    """
+    Cópia rasa do modelo sem as matrizes e o DataFrame.
+
+    Args:
+        model (WineRecommender): Modelo treinado
+
+    Returns:
+        WineRecommender: Modelo sem text_matrix, numeric_features_normalized e df
+            (e sem a matriz de itens do FusedScorer, a tabela ordinal e os
+            vetores do embedding)
+    """
+    skeleton = copy.copy(model)
+    for attribute in SHARED_ATTRIBUTES:
+        setattr(skeleton, attribute, None)
+    if getattr(model, "fused_scorer", None) is not None:
+        skeleton.fused_scorer = copy.copy(model.fused_scorer)
+        skeleton.fused_scorer.item_matrix_t = None
+    if getattr(model, "ordinal_table", None) is not None:
+        skeleton.ordinal_table = copy.copy(model.ordinal_table)
+        skeleton.ordinal_table.table = None
+    if getattr(model, "text_embedding", None) is not None:
+        skeleton.text_embedding = copy.copy(model.text_embedding)
+        skeleton.text_embedding.item_vectors = None
+        skeleton.text_embedding.components_t = None
+    return skeleton
+
+
+class SharedModel:
+    """
+    Segmentos de memória compartilhada com as matrizes de um modelo.
+
+    Exemplo:
+        with SharedModel(model) as shared:
+            # em cada worker: attach_model(shared.skeleton, shared.manifest)
+            ...
+    """
+
+    def __init__(self, model):
+        """
+        Args:
+            model (WineRecommender): Modelo treinado a publicar
+        """
+        arrays, shapes = _model_arrays(model)
+        self.skeleton = model_skeleton(model)
+        self.manifest = dict(shapes, arrays={})
+        self.segments = []
+
+        try:
+            for name, array in arrays.items():
+                segment = shared_memory.SharedMemory(
+                    create=True, size=max(array.nbytes, 1)
+                )
+                self.segments.append(segment)
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+                view[...] = array
+                del view
+                self.manifest["arrays"][name] = (
+                    segment.name,
+                    array.dtype.str,
+                    array.shape,
+                )
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def nbytes(self):
+        """Tamanho total dos segmentos, em bytes."""
+        return sum(segment.size for segment in self.segments)
+
+    def close(self):
+        """Fecha e remove os segmentos (chamar só depois que os workers saírem)."""
+        for segment in self.segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_model(skeleton, manifest):
+    """
+    Monta um modelo utilizável a partir do esqueleto e dos segmentos publicados.
+
+    As matrizes são views somente leitura sobre a memória compartilhada e o df
+    contém apenas a coluna id, suficiente para recommend_wines,
+    recommend_wines_batch e similar_wines.
+
+    Args:
+        skeleton (WineRecommender): Esqueleto gerado por SharedModel
+        manifest (dict): SharedModel.manifest
+
+    Returns:
+        WineRecommender: Modelo pronto para recomendações
+    """
+    segments, arrays = [], {}
+    for name, (segment_name, dtype, shape) in manifest["arrays"].items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        segments.append(segment)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+
+    model = copy.copy(skeleton)
+    model.text_matrix = csr_matrix(
+        (arrays["text_data"], arrays["text_indices"], arrays["text_indptr"]),
+        shape=manifest["text_shape"],
+        copy=False,
+    )
+    model.numeric_features_normalized = arrays["numeric_features"]
+    model.df = pd.DataFrame({"id": arrays["ids"]}, copy=False)
+    if "fused_shape" in manifest:
+        model.fused_scorer = copy.copy(skeleton.fused_scorer)
+        model.fused_scorer.item_matrix_t = csr_matrix(
+            (arrays["fused_data"], arrays["fused_indices"], arrays["fused_indptr"]),
+            shape=manifest["fused_shape"],
+            copy=False,
+        )
+    if "ordinal_table" in arrays:
+        model.ordinal_table = copy.copy(skeleton.ordinal_table)
+        model.ordinal_table.table = arrays["ordinal_table"]
+    if "embedding_items" in arrays:
+        model.text_embedding = copy.copy(skeleton.text_embedding)
+        model.text_embedding.item_vectors = arrays["embedding_items"]
+        model.text_embedding.components_t = arrays["embedding_components"]
+    # Mantém os segmentos abertos enquanto o modelo existir
+    model._shared_segments = segments
+    return model
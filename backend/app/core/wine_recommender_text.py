@@ -0,0 +1,498 @@
+"""
+Montagem e vetorização do texto do WineRecommender.
+
+TextAssembler junta as colunas de texto de cada vinho (e de cada consulta)
+num único texto, coluna a coluna, com pesos por coluna.
+
+O TfidfVectorizer guarda em memória o vocabulário de todos os unigramas e
+bigramas do catálogo, que cresce sem limite com o texto e exige todo o corpus
+de uma vez. HashingTfidfVectorizer usa um espaço fixo de n_features colunas
+(HashingVectorizer) e acumula as frequências de documento em partial_fit, de
+forma que o IDF pode ser calculado em streaming, lote a lote, com memória
+constante.
+
+A ponderação segue a do TfidfVectorizer usado no modelo: IDF suavizado,
+cortes min_df/max_df (as colunas cortadas recebem peso zero) e normalização L2.
+
+QueryVectorCache guarda as contagens de termos de cada campo das consultas,
+que se repetem muito (harmonização, país, uva), e monta o vetor TF-IDF da
+consulta somando as contagens dos campos, sem tokenizar de novo.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import (
+    CountVectorizer,
+    HashingVectorizer,
+    TfidfVectorizer,
+)
+from sklearn.preprocessing import normalize
+from sklearn.utils.sparsefuncs_fast import inplace_csr_row_normalize_l2
+
+
+# 2^20 colunas: poucas colisões para catálogos de centenas de milhares de vinhos
+DEFAULT_N_FEATURES = 2**20
+
+
+class TextAssembler:
+    """
+    Monta o texto combinado usado pelo TF-IDF, no treino e nas consultas.
+
+    Cada coluna entra no texto repetida pelo seu peso (inteiro): peso 2 em
+    harmonizes_with dobra a frequência dos seus termos, peso 0 exclui a
+    coluna. Sem pesos, o resultado é o " ".join dos valores de cada linha,
+    com nulos como texto vazio.
+
+    O catálogo é montado por colunas (listas de strings unidas com zip), sem
+    chamar uma função Python por linha do DataFrame.
+    """
+
+    def __init__(self, columns, weights=None):
+        """
+        Args:
+            columns (list): Colunas de texto, na ordem do texto combinado
+            weights (dict): Repetições por coluna (padrão 1)
+        """
+        weights = dict(weights or {})
+        for column, weight in weights.items():
+            if int(weight) != weight or weight < 0:
+                raise ValueError(
+                    f"Peso de {column} deve ser um inteiro não negativo: {weight}"
+                )
+        self.columns = list(columns)
+        self.weights = {column: int(weights.get(column, 1)) for column in self.columns}
+
+    def _parts(self):
+        return [
+            column for column in self.columns for _ in range(self.weights[column])
+        ]
+
+    def assemble(self, dataframe):
+        """
+        Texto combinado de cada linha do catálogo.
+
+        Args:
+            dataframe (pd.DataFrame): Linhas com as colunas de texto
+
+        Returns:
+            pd.Series: Texto de cada linha, com o mesmo índice
+        """
+        parts = self._parts()
+        if not parts:
+            return pd.Series("", index=dataframe.index, dtype=object)
+
+        values = {
+            column: dataframe[column].fillna("").astype(str).tolist()
+            for column in dict.fromkeys(parts)
+        }
+        texts = [" ".join(row) for row in zip(*(values[column] for column in parts))]
+        return pd.Series(texts, index=dataframe.index, dtype=object)
+
+    def query_parts(self, features):
+        """
+        Campos do texto de uma consulta, na ordem em que foram informados e
+        repetidos pelo peso de cada coluna.
+
+        Args:
+            features (dict): Features da consulta
+
+        Returns:
+            list: Textos dos campos (vazia sem colunas de texto)
+        """
+        return [
+            str(value)
+            for column, value in features.items()
+            if value is not None and column in self.weights
+            for _ in range(self.weights[column])
+        ]
+
+    def assemble_query(self, features):
+        """
+        Texto de uma consulta, na ordem em que as features foram informadas.
+
+        Args:
+            features (dict): Features da consulta
+
+        Returns:
+            str ou None: Texto da consulta, ou None sem colunas de texto
+        """
+        parts = self.query_parts(features)
+        return " ".join(parts) if parts else None
+
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF sobre HashingVectorizer com IDF acumulado em streaming.
+
+    Exemplo:
+        vectorizer = HashingTfidfVectorizer(stop_words=stopwords)
+        for chunk in chunks:
+            vectorizer.partial_fit(chunk)
+        matrix = vectorizer.transform(texts)
+    """
+
+    def __init__(
+        self,
+        n_features=DEFAULT_N_FEATURES,
+        ngram_range=(1, 2),
+        stop_words=None,
+        min_df=2,
+        max_df=0.8,
+        dtype=np.float64,
+    ):
+        """
+        Args:
+            n_features (int): Colunas do espaço de hashing
+            ngram_range (tuple): Faixa de n-gramas
+            stop_words (list): Palavras ignoradas
+            min_df (int): Documentos mínimos para um termo ter peso
+            max_df (float): Fração máxima de documentos para um termo ter peso
+            dtype: Tipo da matriz gerada (np.float32 no modelo compacto)
+        """
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.stop_words = stop_words
+        self.min_df = min_df
+        self.max_df = max_df
+        self.dtype = dtype
+        self.document_frequency_ = np.zeros(n_features, dtype=np.int32)
+        self.n_documents_ = 0
+        self.idf_ = None
+
+    def _hashing(self):
+        return HashingVectorizer(
+            n_features=self.n_features,
+            ngram_range=self.ngram_range,
+            stop_words=self.stop_words,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float64,
+        )
+
+    def counts(self, texts):
+        """
+        Contagens brutas de termos (sem IDF) no espaço de hashing.
+
+        Args:
+            texts (iterable): Textos
+
+        Returns:
+            sp.csr_matrix: Matriz n_textos x n_features
+        """
+        return self._hashing().transform(texts)
+
+    def partial_fit(self, texts):
+        """
+        Acumula as frequências de documento de um lote de textos.
+
+        Args:
+            texts (iterable): Textos do lote
+
+        Returns:
+            HashingTfidfVectorizer: self
+        """
+        return self.partial_fit_counts(self.counts(texts))
+
+    def partial_fit_counts(self, counts):
+        """
+        Acumula as frequências de documento de contagens já calculadas.
+
+        Permite ajustar o IDF e guardar as contagens do mesmo lote para
+        aplicar o IDF final depois, sem vetorizar os textos duas vezes.
+
+        Args:
+            counts (sp.csr_matrix): Saída de counts()
+
+        Returns:
+            HashingTfidfVectorizer: self
+        """
+        if self.document_frequency_ is None:
+            raise ValueError("Vetorizador compactado não aceita novos lotes")
+        self.document_frequency_ += np.bincount(
+            counts.indices, minlength=self.n_features
+        ).astype(np.int32)
+        self.n_documents_ += counts.shape[0]
+        self._update_idf()
+        return self
+
+    def fit(self, chunks):
+        """
+        Ajusta o IDF a partir de um iterador de lotes de textos.
+
+        Args:
+            chunks (iterable): Lotes (listas ou Series) de textos
+
+        Returns:
+            HashingTfidfVectorizer: self
+        """
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        return self
+
+    def fit_transform(self, texts):
+        """Ajusta com um único lote e retorna a matriz TF-IDF dele."""
+        texts = list(texts)
+        return self.partial_fit(texts).transform(texts)
+
+    def _update_idf(self):
+        n_documents = self.n_documents_
+        document_frequency = self.document_frequency_
+        # IDF suavizado, como no TfidfTransformer(smooth_idf=True)
+        idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+        max_documents = (
+            self.max_df if isinstance(self.max_df, int) else self.max_df * n_documents
+        )
+        kept = (document_frequency >= self.min_df) & (document_frequency <= max_documents)
+        self.idf_ = np.where(kept, idf, 0).astype(np.float32)
+
+    def compact(self):
+        """
+        Descarta as frequências de documento, mantendo o IDF já calculado.
+
+        Usado pelo modelo compacto: transform continua funcionando, mas
+        partial_fit deixa de aceitar novos lotes.
+        """
+        self.document_frequency_ = None
+
+    @property
+    def n_terms_(self):
+        """Colunas com peso (termos que passaram por min_df/max_df)."""
+        return int(np.count_nonzero(self.idf_)) if self.idf_ is not None else 0
+
+    def transform(self, texts):
+        """
+        Gera a matriz TF-IDF (CSR, normalizada por L2) dos textos.
+
+        Args:
+            texts (iterable): Textos
+
+        Returns:
+            sp.csr_matrix: Matriz n_textos x n_features
+        """
+        return self.transform_counts(self.counts(texts))
+
+    def transform_counts(self, counts):
+        """
+        Aplica o IDF e a normalização L2 a contagens de counts().
+
+        Args:
+            counts (sp.csr_matrix): Contagens (modificadas no lugar)
+
+        Returns:
+            sp.csr_matrix: Matriz TF-IDF no dtype do vetorizador
+        """
+        if self.idf_ is None:
+            raise ValueError("HashingTfidfVectorizer ainda não foi ajustado")
+        counts.data *= self.idf_[counts.indices]
+        counts.eliminate_zeros()
+        return sp.csr_matrix(normalize(counts, norm="l2", copy=False), dtype=self.dtype)
+
+
+DEFAULT_TEXT_CACHE_SIZE = 4096
+
+
+class QueryVectorCache:
+    """
+    Cache LRU, por campo, das contagens de termos do texto das consultas.
+
+    O texto da consulta é o " ".join dos campos; como a tokenização não
+    atravessa espaços, seus unigramas e bigramas são os de cada campo mais os
+    bigramas entre o último termo de um campo e o primeiro do seguinte (após
+    remover as stop words). O cache guarda, por campo normalizado (minúsculas,
+    espaços simples), as colunas e contagens dos termos e os termos das
+    pontas. O vetor da consulta soma as contagens dos campos e aplica o IDF e
+    a normalização L2 do vetorizador direto nos arrays, sem a validação do
+    scikit-learn a cada chamada, com o mesmo resultado de vectorizer.transform.
+
+    Vale para TfidfVectorizer e HashingTfidfVectorizer com analyzer "word" e
+    n-gramas de até 2 termos (supported indica se o vetorizador é compatível).
+    """
+
+    def __init__(self, vectorizer, max_entries=DEFAULT_TEXT_CACHE_SIZE, on_lookup=None):
+        """
+        Args:
+            vectorizer: TfidfVectorizer ou HashingTfidfVectorizer ajustado
+            max_entries (int): Máximo de campos em cache
+            on_lookup (callable): Chamada com (acertos, faltas) de cada lote
+        """
+        self.vectorizer = vectorizer
+        self.max_entries = max_entries
+        self.on_lookup = on_lookup
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._term_columns = {}
+        self._lock = threading.Lock()
+
+        self._hashing = isinstance(vectorizer, HashingTfidfVectorizer)
+        analyzer = vectorizer._hashing() if self._hashing else vectorizer
+        self.supported = (
+            isinstance(vectorizer, (TfidfVectorizer, HashingTfidfVectorizer))
+            and analyzer.analyzer == "word"
+            and analyzer.ngram_range[1] <= 2
+            and (
+                self._hashing
+                or (vectorizer.norm == "l2" and vectorizer.use_idf and not vectorizer.sublinear_tf)
+            )
+        )
+        if not self.supported:
+            return
+        self._bigrams = analyzer.ngram_range[1] == 2
+        self._preprocess = analyzer.build_preprocessor()
+        self._tokenize = analyzer.build_tokenizer()
+        self._stop_words = analyzer.get_stop_words() or ()
+        if self._hashing:
+            self._n_columns = vectorizer.n_features
+        else:
+            self._n_columns = len(vectorizer.vocabulary_)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Acertos, faltas, taxa de acerto e tamanho do cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._term_columns.clear()
+
+    def _counts(self, texts):
+        """Contagens brutas, como as que o vetorizador calcula antes do IDF."""
+        if self._hashing:
+            return self.vectorizer.counts(texts)
+        return CountVectorizer.transform(self.vectorizer, texts)
+
+    def _term_column(self, term):
+        """Coluna de um termo já analisado (bigrama entre campos), ou None."""
+        column = self._term_columns.get(term, -1)
+        if column != -1:
+            return column
+        if self._hashing:
+            hasher = FeatureHasher(
+                n_features=self._n_columns, input_type="string", alternate_sign=False
+            )
+            column = int(hasher.transform([[term]]).indices[0])
+        else:
+            column = self.vectorizer.vocabulary_.get(term)
+        with self._lock:
+            if len(self._term_columns) >= self.max_entries:
+                self._term_columns.clear()
+            self._term_columns[term] = column
+        return column
+
+    def _field(self, text):
+        """Colunas, contagens e termos das pontas de um campo (do cache ou calculados)."""
+        key = " ".join(self._preprocess(text).split())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, True
+
+        counts = self._counts([key])
+        tokens = [
+            token for token in self._tokenize(key) if token not in self._stop_words
+        ]
+        entry = (
+            counts.indices.astype(np.int64),
+            counts.data.astype(np.float64),
+            tokens[0] if tokens else None,
+            tokens[-1] if tokens else None,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry, False
+
+    def _row(self, parts):
+        """Colunas ordenadas e contagens somadas do texto de uma consulta."""
+        indices, counts, hits = [], [], 0
+        previous = None
+        for text in parts:
+            (field_indices, field_counts, first, last), hit = self._field(text)
+            hits += hit
+            indices.append(field_indices)
+            counts.append(field_counts)
+            if first is None:
+                continue
+            if self._bigrams and previous is not None:
+                column = self._term_column(f"{previous} {first}")
+                if column is not None:
+                    indices.append(np.array([column], dtype=np.int64))
+                    counts.append(np.ones(1))
+            previous = last
+
+        indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+        columns, inverse = np.unique(indices, return_inverse=True)
+        counts = np.bincount(
+            inverse,
+            weights=np.concatenate(counts) if counts else None,
+            minlength=len(columns),
+        )
+        # Sem termos, bincount devolve int64 e o IDF não é aplicado no lugar
+        return columns, counts.astype(np.float64, copy=False), hits
+
+    def transform(self, queries):
+        """
+        Matriz TF-IDF das consultas, igual a vectorizer.transform dos textos unidos.
+
+        Args:
+            queries (list): Campos de cada consulta (TextAssembler.query_parts)
+
+        Returns:
+            sp.csr_matrix: Matriz n_consultas x n_colunas
+        """
+        indptr, all_columns, all_counts, hits, fields = [0], [], [], 0, 0
+        for parts in queries:
+            columns, counts, row_hits = self._row(parts)
+            hits += row_hits
+            fields += len(parts)
+            all_columns.append(columns)
+            all_counts.append(counts)
+            indptr.append(indptr[-1] + len(columns))
+
+        with self._lock:
+            self.hits += hits
+            self.misses += fields - hits
+        if self.on_lookup is not None:
+            self.on_lookup(hits, fields - hits)
+
+        vectorizer = self.vectorizer
+        columns = np.concatenate(all_columns).astype(np.int32)
+        data = np.concatenate(all_counts)
+        if self._hashing:
+            # Mesmas operações de HashingTfidfVectorizer.transform_counts
+            data *= vectorizer.idf_[columns]
+        else:
+            # Contagens no dtype do vetorizador, como em TfidfTransformer.transform
+            data = data.astype(vectorizer.dtype)
+            data *= vectorizer._tfidf.idf_[columns]
+        matrix = sp.csr_matrix(
+            (data, columns, np.asarray(indptr, dtype=np.int32)),
+            shape=(len(queries), self._n_columns),
+        )
+        if self._hashing:
+            matrix.eliminate_zeros()
+        inplace_csr_row_normalize_l2(matrix)
+        if self._hashing:
+            matrix = sp.csr_matrix(matrix, dtype=vectorizer.dtype)
+        return matrix
@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+
+# Modelo compartilhado (somente leitura) e catálogo original carregados uma
+# vez por processo do pool
+_WORKER_MODEL = None
+_WORKER_DATAFRAME = None
+
+
+def _init_worker(model_path, dataframe_path):
+    """Carrega o modelo no processo do pool com os arrays mapeados em memória."""
+    global _WORKER_MODEL, _WORKER_DATAFRAME
+    _WORKER_MODEL = joblib.load(model_path, mmap_mode="r")
+    _WORKER_DATAFRAME = joblib.load(dataframe_path)
+    # As consultas de teste são as mesmas para todos os candidatos
+    _WORKER_MODEL.enable_component_cache()
+
+
+def _evaluate_in_worker(params, evaluation_kwargs):
+    """Avalia um conjunto de parâmetros com o modelo do processo atual."""
+    return evaluate_params(
+        _WORKER_MODEL, _WORKER_DATAFRAME, params, evaluation_kwargs
+    )
+
+
+def tuning_fingerprint(model, dataframe):
+    """
+    Identifica o modelo e o catálogo avaliados, para invalidar o cache de
+    métricas (também o persistido em disco) quando algum deles muda.
+
+    Returns:
+        str: Hash dos formatos do catálogo e da matriz de texto, do modo de
+            scoring e dos pesos do modelo
+    """
+    description = {
+        "catalogue": list(dataframe.shape),
+        "model_rows": len(model.df),
+        "text_matrix": list(model.text_matrix.shape),
+        "text_mode": getattr(model, "text_mode", "vocabulary"),
+        "scoring": getattr(model, "scoring", "legacy"),
+        "text_embedding": getattr(model, "text_embedding", None) is not None,
+        "feature_weights": {
+            k: round(float(v), 6) for k, v in model.feature_weights.items()
+        },
+    }
+    encoded = json.dumps(description, sort_keys=True).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def evaluate_params(model, dataframe, params, evaluation_kwargs):
+    """
+    Avalia um conjunto de parâmetros sem alterar o modelo.
+
+    Args:
+        model (WineRecommender): Modelo treinado
+        dataframe (pd.DataFrame): Catálogo original, não codificado
+        params (dict): text_weight, ordinal_weight, categoric_weight e diversity_factor
+        evaluation_kwargs (dict): Opções de WineRecommender.evaluate_diversity_metrics
+
+    Returns:
+        dict: Métricas de diversidade
+    """
+    feature_weights = {
+        "text": params["text_weight"],
+        "ordinal": params["ordinal_weight"],
+        "categoric": params["categoric_weight"],
+    }
+    metrics = model.evaluate_diversity_metrics(
+        feature_weights=feature_weights,
+        diversity_factor=params["diversity_factor"],
+        dataframe=dataframe,
+        **evaluation_kwargs,
+    )
+    return {k: float(v) for k, v in metrics.items()}
+
+
+class DiversityTuner:
+    """
+    Busca de pesos e fator de diversificação do WineRecommender em paralelo.
+
+    Os candidatos são avaliados num pool de processos que carregam uma única
+    cópia do modelo em disco com os arrays mapeados em memória (somente
+    leitura). As pontuações ficam em cache por conjunto de parâmetros e a busca
+    para cedo quando atinge a tolerância ou deixa de melhorar.
+    """
+
+    def __init__(
+        self,
+        model,
+        dataframe,
+        target_jaccard=0.4,
+        target_coverage=0.5,
+        n_jobs=None,
+        num_tests=50,
+        top_n=5,
+        random_state=42,
+        patience=None,
+        tol=0.0,
+        cache_path=None,
+    ):
+        """
+        Args:
+            model (WineRecommender): Modelo treinado (não é alterado)
+            dataframe (pd.DataFrame): Catálogo original, não codificado, de
+                onde saem as consultas de teste
+            target_jaccard (float): Jaccard médio desejado
+            target_coverage (float): Porcentagem do catálogo a ser recomendado
+            n_jobs (int): Processos do pool (None = todos os núcleos, 1 = sem pool)
+            num_tests (int): Consultas de teste por avaliação
+            top_n (int): Quantidade de recomendações por consulta
+            random_state (int): Seed das consultas de teste, igual para todos os candidatos
+            patience (int): Para após N candidatos sem melhora (None = sem limite)
+            tol (float): Para quando a perda for menor ou igual a este valor
+            cache_path (str): Arquivo JSON para persistir o cache entre execuções
+        """
+        self.model = model
+        self.dataframe = dataframe
+        self.target_jaccard = target_jaccard
+        self.target_coverage = target_coverage
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.evaluation_kwargs = {
+            "num_tests": num_tests,
+            "top_n": top_n,
+            "random_state": random_state,
+        }
+        self.fingerprint = tuning_fingerprint(model, dataframe)
+        self.patience = patience
+        self.tol = tol
+        self.cache_path = cache_path
+        self.cache = {}
+        self.history = []
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+
+    @staticmethod
+    def grid(text_weights, diversity_factors, text_ordinal_total=0.6, categoric=0.4):
+        """
+        Gera a grade de candidatos mantendo a soma texto + ordinal constante.
+
+        Args:
+            text_weights (list): Pesos textuais a testar
+            diversity_factors (list): Fatores de diversificação a testar
+            text_ordinal_total (float): Soma fixa dos pesos textual e ordinal
+            categoric (float): Peso categórico
+
+        Returns:
+            list: Lista de dicionários de parâmetros
+        """
+        return [
+            {
+                "text_weight": float(text_w),
+                "ordinal_weight": float(text_ordinal_total - text_w),
+                "categoric_weight": float(categoric),
+                "diversity_factor": float(div_factor),
+            }
+            for text_w in text_weights
+            for div_factor in diversity_factors
+        ]
+
+    @staticmethod
+    def random_candidates(
+        n_iter,
+        text_range=(0.1, 0.9),
+        ordinal_range=(0.1, 0.9),
+        categoric_range=(0.0, 0.5),
+        diversity_range=(0.0, 1.0),
+        random_state=None,
+    ):
+        """
+        Sorteia candidatos uniformemente num espaço de busca contínuo.
+
+        Args:
+            n_iter (int): Quantidade de candidatos
+            text_range (tuple): Intervalo do peso textual
+            ordinal_range (tuple): Intervalo do peso ordinal
+            categoric_range (tuple): Intervalo do peso categórico
+            diversity_range (tuple): Intervalo do fator de diversificação
+            random_state (int): Seed do sorteio
+
+        Returns:
+            list: Lista de dicionários de parâmetros
+        """
+        rng = np.random.default_rng(random_state)
+        return [
+            {
+                "text_weight": float(rng.uniform(*text_range)),
+                "ordinal_weight": float(rng.uniform(*ordinal_range)),
+                "categoric_weight": float(rng.uniform(*categoric_range)),
+                "diversity_factor": float(rng.uniform(*diversity_range)),
+            }
+            for _ in range(n_iter)
+        ]
+
+    def _cache_key(self, params):
+        # As métricas dependem também das consultas de teste e do modelo avaliado
+        return json.dumps(
+            {
+                "params": {k: round(v, 6) for k, v in sorted(params.items())},
+                **self.evaluation_kwargs,
+                "model": self.fingerprint,
+            },
+            sort_keys=True,
+        )
+
+    def loss(self, metrics):
+        """Função de perda combinada: distância às metas de Jaccard e cobertura."""
+        return abs(metrics["jaccard_médio"] - self.target_jaccard) + abs(
+            metrics["cobertura"] - self.target_coverage
+        )
+
+    def search(self, candidates):
+        """
+        Avalia os candidatos e retorna o melhor conjunto de parâmetros.
+
+        Args:
+            candidates (list): Dicionários de parâmetros (ver grid/random_candidates)
+
+        Returns:
+            tuple: (melhores parâmetros, menor perda)
+        """
+        best_params, best_score = None, float("inf")
+        since_improvement = 0
+        pending = [p for p in candidates if self._cache_key(p) not in self.cache]
+        print(
+            f"Busca com {len(candidates)} candidatos "
+            f"({len(candidates) - len(pending)} em cache), {self.n_jobs} processos"
+        )
+
+        executor = None
+        model_path = dataframe_path = None
+        cache_was_enabled = getattr(self.model, "_component_cache", None) is not None
+        try:
+            if self.n_jobs > 1 and len(pending) > 1:
+                # Uma única cópia do modelo em disco, mapeada pelos processos
+                fd, model_path = tempfile.mkstemp(suffix=".pkl")
+                os.close(fd)
+                joblib.dump(self.model, model_path)
+                fd, dataframe_path = tempfile.mkstemp(suffix=".pkl")
+                os.close(fd)
+                joblib.dump(self.dataframe, dataframe_path)
+                executor = ProcessPoolExecutor(
+                    max_workers=self.n_jobs,
+                    initializer=_init_worker,
+                    initargs=(model_path, dataframe_path),
+                )
+            else:
+                self.model.enable_component_cache()
+
+            chunk_size = self.n_jobs if executor else 1
+            for start in range(0, len(candidates), chunk_size):
+                chunk = candidates[start : start + chunk_size]
+                to_run = [p for p in chunk if self._cache_key(p) not in self.cache]
+
+                if executor:
+                    futures = [
+                        executor.submit(
+                            _evaluate_in_worker, params, self.evaluation_kwargs
+                        )
+                        for params in to_run
+                    ]
+                    results = [future.result() for future in futures]
+                else:
+                    results = [
+                        evaluate_params(
+                            self.model, self.dataframe, params, self.evaluation_kwargs
+                        )
+                        for params in to_run
+                    ]
+                for params, metrics in zip(to_run, results):
+                    self.cache[self._cache_key(params)] = metrics
+
+                for params in chunk:
+                    metrics = self.cache[self._cache_key(params)]
+                    score = self.loss(metrics)
+                    self.history.append({"params": params, "score": score, **metrics})
+
+                    if score < best_score:
+                        best_score, best_params = score, params
+                        since_improvement = 0
+                    else:
+                        since_improvement += 1
+
+                if best_score <= self.tol:
+                    print(f"Parada antecipada: perda {best_score:.4f} <= {self.tol}")
+                    break
+                if self.patience is not None and since_improvement >= self.patience:
+                    print(
+                        f"Parada antecipada: {since_improvement} candidatos sem melhora"
+                    )
+                    break
+        finally:
+            if executor:
+                executor.shutdown()
+            if not cache_was_enabled:
+                self.model.disable_component_cache()
+            for path in (model_path, dataframe_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            if self.cache_path:
+                with open(self.cache_path, "w", encoding="utf-8") as f:
+                    json.dump(self.cache, f, ensure_ascii=False)
+
+        print(f"Melhor perda: {best_score:.4f} com {best_params}")
+        return best_params, best_score
@@ -0,0 +1,244 @@
+"""
+Vocabulário dos campos livres da consulta (país, região, tipo, uvas e harmonização).
+
+O formulário recebe país, uva e harmonização como texto livre ("franca",
+"cabernet sauvignom", "queijo"), que antes ia direto para o vetorizador e para
+o LabelEncoder: qualquer diferença de acento ou digitação virava o código 0
+pelo caminho de exceção. WineVocabulary guarda, no treino, os valores
+conhecidos de cada coluna (as uvas e a harmonização separadas por vírgula),
+com a grafia mais frequente no catálogo como forma canônica, e resolve cada
+valor da consulta nessa ordem:
+
+1. igualdade sem diferença de maiúsculas, acentos e espaços (dicionário);
+2. semelhança de trigramas de caracteres (coeficiente de Dice) acima de
+   MIN_SIMILARITY, pelo índice invertido trigrama -> termos.
+
+Valores que não se resolvem ficam como vieram. O autocompletar usa uma trie
+(marisa-trie) com o termo inteiro e cada palavra a partir da qual ele pode
+ser digitado, de forma que "sauv" completa "Cabernet Sauvignon".
+"""
+
+from collections import Counter
+
+import marisa_trie
+import numpy as np
+
+from backend.app.core.wine_recommender_filters import normalize_value
+
+
+# Colunas do vocabulário e se o valor é uma lista separada por vírgulas
+VOCABULARY_COLUMNS = {
+    "technical_sheet_country": False,
+    "technical_sheet_region": False,
+    "technical_sheet_wine_type": False,
+    "technical_sheet_grapes": True,
+    "harmonizes_with": True,
+}
+
+MIN_SIMILARITY = 0.7
+DEFAULT_COMPLETIONS = 10
+
+
+def _key(value):
+    """Forma normalizada de um termo, com os espaços internos simplificados."""
+    return " ".join(normalize_value(value).split())
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _word_starts(key):
+    """O termo e cada sufixo que começa numa palavra (prefixos do autocompletar)."""
+    starts = [key]
+    for position, char in enumerate(key[:-1]):
+        if char in " -":
+            starts.append(key[position + 1 :])
+    return starts
+
+
+class ColumnVocabulary:
+    """Termos conhecidos de uma coluna, com busca exata, aproximada e por prefixo."""
+
+    def __init__(self):
+        self.spellings = {}
+
+    def add(self, term):
+        term = " ".join(str(term).split())
+        key = _key(term)
+        if key:
+            self.spellings.setdefault(key, Counter())[term] += 1
+
+    def finalize(self):
+        """Fixa as formas canônicas e monta a trie e o índice de trigramas."""
+        keys = sorted(self.spellings)
+        self.ids = {key: term_id for term_id, key in enumerate(keys)}
+        self.canonical = [self.spellings[key].most_common(1)[0][0] for key in keys]
+        self.counts = np.array(
+            [sum(self.spellings[key].values()) for key in keys], dtype=np.int32
+        )
+        self.trie = marisa_trie.RecordTrie(
+            "<i",
+            [
+                (start, (term_id,))
+                for term_id, key in enumerate(keys)
+                for start in _word_starts(key)
+            ],
+        )
+
+        postings = {}
+        self.trigram_counts = np.empty(len(keys), dtype=np.int32)
+        for term_id, key in enumerate(keys):
+            grams = _trigrams(key)
+            self.trigram_counts[term_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(term_id)
+        self.trigrams = {
+            gram: np.asarray(term_ids, dtype=np.int32)
+            for gram, term_ids in postings.items()
+        }
+        del self.spellings
+        return self
+
+    def __len__(self):
+        return len(self.canonical)
+
+    def resolve(self, value, min_similarity=MIN_SIMILARITY):
+        """
+        Forma canônica de um termo.
+
+        Args:
+            value (str): Termo da consulta
+            min_similarity (float): Semelhança mínima de trigramas (0-1)
+
+        Returns:
+            str ou None: Termo do catálogo, ou None se nenhum for próximo o bastante
+        """
+        key = _key(value)
+        if not key:
+            return None
+        term_id = self.ids.get(key)
+        if term_id is not None:
+            return self.canonical[term_id]
+
+        grams = _trigrams(key)
+        lists = [self.trigrams[gram] for gram in grams if gram in self.trigrams]
+        if not lists:
+            return None
+        shared = np.bincount(np.concatenate(lists), minlength=len(self))
+        similarity = 2 * shared / (len(grams) + self.trigram_counts)
+        best = np.flatnonzero(similarity == similarity.max())
+        if similarity[best[0]] < min_similarity:
+            return None
+        # Empate: o termo mais frequente no catálogo
+        return self.canonical[best[np.argmax(self.counts[best])]]
+
+    def complete(self, prefix, limit=DEFAULT_COMPLETIONS):
+        """
+        Termos que começam (ou têm uma palavra que começa) com o prefixo.
+
+        Returns:
+            list: Até limit termos canônicos, dos mais frequentes no catálogo
+        """
+        term_ids = {term_id for _, (term_id,) in self.trie.items(_key(prefix))}
+        ranked = sorted(
+            term_ids,
+            key=lambda term_id: (-self.counts[term_id], self.canonical[term_id]),
+        )
+        return [self.canonical[term_id] for term_id in ranked[:limit]]
+
+
+class WineVocabulary:
+    """Vocabulário das colunas de VOCABULARY_COLUMNS presentes no catálogo."""
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns (list): Colunas do vocabulário (chaves de VOCABULARY_COLUMNS)
+        """
+        self.columns = list(columns)
+        self.vocabularies = {column: ColumnVocabulary() for column in self.columns}
+
+    @classmethod
+    def from_frame(cls, dataframe):
+        """
+        Vocabulário de um DataFrame com os valores originais.
+
+        Args:
+            dataframe (pd.DataFrame): Catálogo (antes da codificação)
+
+        Returns:
+            WineVocabulary: Vocabulário pronto para consultas
+        """
+        vocabulary = cls(
+            [column for column in VOCABULARY_COLUMNS if column in dataframe.columns]
+        )
+        vocabulary.update(dataframe)
+        return vocabulary.finalize()
+
+    def update(self, dataframe):
+        """Acrescenta os valores de um lote."""
+        for column in self.columns:
+            tokenized = VOCABULARY_COLUMNS[column]
+            vocabulary = self.vocabularies[column]
+            for value in dataframe[column].dropna().to_numpy():
+                for term in str(value).split(",") if tokenized else [value]:
+                    vocabulary.add(term)
+        return self
+
+    def finalize(self):
+        for vocabulary in self.vocabularies.values():
+            vocabulary.finalize()
+        return self
+
+    def __contains__(self, column):
+        return column in self.vocabularies
+
+    def resolve(self, column, value, min_similarity=MIN_SIMILARITY):
+        """
+        Forma canônica de um valor (um único termo) de uma coluna.
+
+        Returns:
+            str ou None: Valor do catálogo, ou None se não for reconhecido
+
+        Raises:
+            ValueError: Se a coluna não fizer parte do vocabulário
+        """
+        return self._vocabulary(column).resolve(value, min_similarity)
+
+    def complete(self, column, prefix, limit=DEFAULT_COMPLETIONS):
+        """
+        Sugestões de autocompletar de uma coluna.
+
+        Raises:
+            ValueError: Se a coluna não fizer parte do vocabulário
+        """
+        return self._vocabulary(column).complete(prefix, limit)
+
+    def canonicalize(self, column, value):
+        """
+        Troca os termos reconhecidos de um valor da consulta pelas formas canônicas.
+
+        Nas colunas separadas por vírgula, cada termo é resolvido à parte e os
+        que não se resolvem são mantidos. Valores que não são texto, ou em que
+        nada muda, são devolvidos como vieram.
+        """
+        if not isinstance(value, str) or column not in self.vocabularies:
+            return value
+        vocabulary = self.vocabularies[column]
+        if VOCABULARY_COLUMNS[column]:
+            terms = [term.strip() for term in value.split(",")]
+        else:
+            terms = [value.strip()]
+        resolved = [vocabulary.resolve(term) or term for term in terms]
+        if resolved == terms:
+            return value
+        return ", ".join(term for term in resolved if term)
+
+    def _vocabulary(self, column):
+        if column not in self.vocabularies:
+            raise ValueError(
+                f"Coluna sem vocabulário: {column}; disponíveis: {self.columns}"
+            )
+        return self.vocabularies[column]
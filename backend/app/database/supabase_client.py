@@ -9,12 +9,16 @@ from backend.app.config.settings import (
     SUPABASE_URL,
     SUPABASE_KEY,
     EVINO_PRODUCTS_URL,
+    MAX_SCROLLS,
+    SCROLL_DELAY,
+    CRAWL_CHECKPOINT_PATH,
     JSON_OBJS_PATH,
     IMAGE_PATH,
 )
 from backend.app.core.scraper_aux import *
 from backend.app.core.scraper import *
 from backend.app.utils.helpers import *
+from backend.app.utils.metrics import SCRAPER_STAGE_SECONDS, span
 
 
 logger = logging.getLogger("evino_scraper")
@@ -238,19 +242,155 @@ def scrape_product_links(driver, supabase: Client):
         return 0
 
 
-def save_links_to_supabase(supabase, links):
+def load_crawl_checkpoint(checkpoint_path=CRAWL_CHECKPOINT_PATH) -> dict:
+    """
+    Carrega o checkpoint da extração incremental de links.
+
+    Args:
+        checkpoint_path (str): Caminho do arquivo JSON de checkpoint.
+
+    Returns:
+        dict: Estado salvo ou um estado inicial se o arquivo não existir.
+    """
+    state = {"scrolls": 0, "completed": True, "seen": [], "updated_at": None}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        try:
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                state.update(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Checkpoint {checkpoint_path} inválido, ignorando: {e}")
+    return state
+
+
+def save_crawl_checkpoint(state: dict, checkpoint_path=CRAWL_CHECKPOINT_PATH):
+    """
+    Salva o checkpoint da extração de links de forma atômica.
+
+    Args:
+        state (dict): Estado da extração.
+        checkpoint_path (str): Caminho do arquivo JSON de checkpoint.
+    """
+    if not checkpoint_path:
+        return
+    directory = os.path.dirname(checkpoint_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    state["updated_at"] = datetime.datetime.now().isoformat()
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def scrape_product_links_incremental(
+    driver,
+    supabase: Client,
+    checkpoint_path=CRAWL_CHECKPOINT_PATH,
+    max_scrolls=MAX_SCROLLS,
+    resume=True,
+):
+    """
+    Extrai links de produtos de forma incremental, salvando a cada rolagem.
+
+    Após cada passo de rolagem os links renderizados são coletados e os ainda
+    não vistos são salvos imediatamente no Supabase, junto com um checkpoint.
+    A extração para assim que um passo não traz nenhum link novo. Se a execução
+    anterior foi interrompida, as rolagens já feitas são refeitas sem aplicar
+    essa regra de parada até alcançar o ponto salvo no checkpoint.
+
+    Args:
+        driver (webdriver.Chrome): O navegador inicializado.
+        supabase (Client): Cliente do Supabase.
+        checkpoint_path (str): Caminho do arquivo JSON de checkpoint.
+        max_scrolls (int): Número máximo de rolagens.
+        resume (bool): Se deve retomar a partir do checkpoint.
+
+    Returns:
+        int ou None: Número de novos links adicionados ou None em caso de erro.
+    """
+    if not driver:
+        logger.error("Erro: O navegador não foi inicializado corretamente")
+        return None
+
+    state = load_crawl_checkpoint(checkpoint_path) if resume else None
+    if not state or state.get("completed", True):
+        resume_until = -1
+        state = {"scrolls": 0, "completed": False, "seen": []}
+    else:
+        resume_until = int(state.get("scrolls", 0))
+        logger.info(f"Retomando extração interrompida no scroll {resume_until}")
+
+    known_urls = set(get_existing_urls(supabase))
+    known_urls.update(state.get("seen", []))
+    new_links_count = 0
+
+    try:
+        logger.info(f"Acessando página de vinhos: {EVINO_PRODUCTS_URL}")
+        driver.get(EVINO_PRODUCTS_URL)
+        time.sleep(SCROLL_DELAY)
+
+        last_height = driver.execute_script("return document.body.scrollHeight")
+        for scroll in range(max_scrolls + 1):
+            grew = True
+            if scroll > 0:
+                last_height, grew = scroll_once(driver, last_height)
+
+            page_links = []
+            for link in collect_product_links(driver):
+                full_url = EVINO_BASE_URL + link if link.startswith("/") else link
+                if full_url not in known_urls and full_url not in page_links:
+                    page_links.append(full_url)
+
+            if page_links:
+                new_links_count += save_links_to_supabase(
+                    supabase, page_links, existing_urls=known_urls
+                )
+                state["seen"].extend(page_links)
+
+            state["scrolls"] = scroll
+            save_crawl_checkpoint(state, checkpoint_path)
+            logger.info(
+                f"Scroll {scroll}/{max_scrolls}: {len(page_links)} links novos"
+            )
+
+            if not page_links and scroll > resume_until:
+                logger.info("Nenhum link novo neste passo, encerrando a extração")
+                break
+            if not grew:
+                logger.info(f"Fim da página alcançado após {scroll} scrolls")
+                break
+
+    except Exception as e:
+        logger.error(
+            f"Erro durante a extração de links: {e}. "
+            f"Checkpoint salvo em {checkpoint_path} para retomar."
+        )
+        return None
+
+    state["completed"] = True
+    state["seen"] = []
+    save_crawl_checkpoint(state, checkpoint_path)
+    logger.info(f"Extração incremental concluída: {new_links_count} novos links")
+    return new_links_count
+
+
+def save_links_to_supabase(supabase, links, existing_urls=None):
     """
     Salva os links no Supabase.
 
     Args:
         supabase (Client): Cliente do Supabase.
         links (list): Lista de links de produtos.
+        existing_urls (set, optional): URLs já conhecidas; evita buscar a tabela
+            inteira a cada chamada e é atualizado com as URLs inseridas.
 
     Returns:
         int: Número de novos links adicionados.
     """
     # Busca URLs já existentes no Supabase
-    existing_urls = get_existing_urls(supabase)
+    if existing_urls is None:
+        existing_urls = set(get_existing_urls(supabase))
 
     count = 0
     for link in links:
@@ -261,6 +401,7 @@ def save_links_to_supabase(supabase, links):
 
         if full_url not in existing_urls:
             if insert_product_url(supabase, full_url):
+                existing_urls.add(full_url)
                 count += 1
 
     logger.info(f"{count} novos links salvos no Supabase")
@@ -313,13 +454,14 @@ def process_and_upsert_wine_data(driver, url, id):
 
         if wine_data:
             wine_data["id"] = id
-            result = supabase.table("wine_data").upsert(wine_data).execute()
-            update_scraped = (
-                supabase.table("scrape_db")
-                .update({"scraped": 1})
-                .eq("id", id)
-                .execute()
-            )
+            with span(SCRAPER_STAGE_SECONDS, stage="upsert"):
+                result = supabase.table("wine_data").upsert(wine_data).execute()
+                update_scraped = (
+                    supabase.table("scrape_db")
+                    .update({"scraped": 1})
+                    .eq("id", id)
+                    .execute()
+                )
 
             if result.data and update_scraped.data:
                 logger.info(
@@ -380,8 +522,9 @@ def process_and_upsert_wine_data_locally(driver, url, id):
 
             try:
                 # Salvar dados em um arquivo JSON local
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(wine_data, f, ensure_ascii=False, indent=4)
+                with span(SCRAPER_STAGE_SECONDS, stage="save_json"):
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        json.dump(wine_data, f, ensure_ascii=False, indent=4)
 
                 # Verificar explicitamente se o arquivo foi criado e tem conteúdo
                 if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
@@ -393,12 +536,13 @@ def process_and_upsert_wine_data_locally(driver, url, id):
 
             # Só atualiza o status se o salvamento foi bem sucedido
             if save_success:
-                update_scraped = (
-                    supabase.table("scrape_db")
-                    .update({"scraped": 1})
-                    .eq("id", id)
-                    .execute()
-                )
+                with span(SCRAPER_STAGE_SECONDS, stage="upsert"):
+                    update_scraped = (
+                        supabase.table("scrape_db")
+                        .update({"scraped": 1})
+                        .eq("id", id)
+                        .execute()
+                    )
 
                 if update_scraped.data:
                     logger.info(
@@ -2,6 +2,8 @@ import time
 import datetime
 import logging
 import schedule
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from supabase import Client
 import sys
 
@@ -179,3 +181,101 @@ def run_extraction(driver, url, id):
     except Exception as e:
         logger.error(f"\nErro durante a extração: {str(e)}\n")
         return -1
+
+
+def process_products_concurrently(
+    product_data,
+    concurrency=1,
+    batch_size=10,
+    max_batches=None,
+    interval_minutes=0,
+    save_locally=True,
+):
+    """
+    Processa produtos em lotes com vários navegadores em paralelo, sem interação.
+
+    Cada thread inicializa o seu próprio navegador na primeira vez que recebe um
+    produto e o reaproveita nos lotes seguintes; todos são fechados ao final.
+
+    Args:
+        product_data (list): Lista de produtos com 'id' e 'url'
+        concurrency (int): Quantidade de navegadores (threads) em paralelo.
+        batch_size (int): Quantidade de produtos por lote.
+        max_batches (int, optional): Número máximo de lotes; None processa todos.
+        interval_minutes (float): Pausa entre lotes em minutos (0 = sem pausa).
+        save_locally (bool): Se True salva em JSON local, senão faz upsert no Supabase.
+
+    Returns:
+        tuple: (total processado com sucesso, total com falha)
+    """
+    process_fn = (
+        process_and_upsert_wine_data_locally
+        if save_locally
+        else process_and_upsert_wine_data
+    )
+    concurrency = max(1, int(concurrency))
+    batch_size = max(1, int(batch_size))
+
+    product_pairs = [(item["id"], item["url"]) for item in product_data]
+    batches = [
+        product_pairs[i : i + batch_size]
+        for i in range(0, len(product_pairs), batch_size)
+    ]
+    if max_batches is not None:
+        batches = batches[:max_batches]
+
+    local = threading.local()
+    drivers = []
+    drivers_lock = threading.Lock()
+
+    def get_driver():
+        # Inicialização preguiçosa: um navegador por thread, só quando necessário
+        if not hasattr(local, "driver"):
+            local.driver = initialize_browser()
+            if local.driver:
+                with drivers_lock:
+                    drivers.append(local.driver)
+        return local.driver
+
+    def process_one(pair):
+        current_id, current_url = pair
+        driver = get_driver()
+        if not driver:
+            logger.error(f"Navegador indisponível para o produto ID {current_id}")
+            return False
+        try:
+            return process_fn(driver, current_url, current_id) > 0
+        except Exception as e:
+            logger.error(f"Erro ao processar produto {current_id}: {str(e)}")
+            return False
+
+    total_processed = 0
+    total_failed = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for batch_number, batch in enumerate(batches, start=1):
+                if batch_number > 1 and interval_minutes > 0:
+                    logger.info(
+                        f"Aguardando {interval_minutes} minutos até o próximo lote"
+                    )
+                    time.sleep(interval_minutes * 60)
+
+                logger.info(
+                    f"---- Processando lote {batch_number}/{len(batches)} "
+                    f"({len(batch)} produtos, {concurrency} navegadores) ----"
+                )
+                results = list(executor.map(process_one, batch))
+                batch_processed = sum(results)
+                total_processed += batch_processed
+                total_failed += len(results) - batch_processed
+
+                logger.info(
+                    f"Lote {batch_number} concluído: {batch_processed} com sucesso, "
+                    f"{len(results) - batch_processed} com falha"
+                )
+    finally:
+        for driver in drivers:
+            close_browser(driver)
+
+    return total_processed, total_failed
@@ -0,0 +1,304 @@
+"""
+Instrumentação leve de tempo para o scraper e o recomendador.
+
+Registra histogramas de duração por etapa (span/timed) e contadores num
+registro em memória, exportado no formato texto do Prometheus por arquivo ou
+por um endpoint HTTP /metrics.
+
+Importe sempre como backend.app.utils.metrics para que todos os módulos
+usem o mesmo registro.
+"""
+
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Nomes das métricas
+SCRAPER_STAGE_SECONDS = "evino_scraper_stage_seconds"
+SCRAPER_PAGE_SECONDS = "evino_scraper_page_seconds"
+SCRAPER_PAGES_TOTAL = "evino_scraper_pages_total"
+RECOMMENDER_STAGE_SECONDS = "evino_recommender_stage_seconds"
+RECOMMENDER_QUERY_SECONDS = "evino_recommender_query_seconds"
+RECOMMENDER_TABLE_LOOKUPS_TOTAL = "evino_recommender_table_lookups_total"
+RECOMMENDER_TEXT_CACHE_TOTAL = "evino_recommender_text_cache_total"
+API_REQUEST_SECONDS = "evino_api_request_seconds"
+API_REQUESTS_TOTAL = "evino_api_requests_total"
+
+METRIC_HELP = {
+    SCRAPER_STAGE_SECONDS: "Tempo por etapa do scraper",
+    SCRAPER_PAGE_SECONDS: "Tempo total de extração de uma página de produto",
+    SCRAPER_PAGES_TOTAL: "Páginas de produto processadas",
+    RECOMMENDER_STAGE_SECONDS: "Tempo por etapa do recomendador",
+    RECOMMENDER_QUERY_SECONDS: "Tempo total de uma consulta de recomendação",
+    RECOMMENDER_TABLE_LOOKUPS_TOTAL: "Consultas respondidas (hit) ou não (miss) pela tabela de recomendações",
+    RECOMMENDER_TEXT_CACHE_TOTAL: "Campos de texto das consultas encontrados (hit) ou não (miss) no cache de vetorização",
+    API_REQUEST_SECONDS: "Tempo de resposta do serviço de recomendação por rota",
+    API_REQUESTS_TOTAL: "Requisições ao serviço de recomendação por rota e status",
+}
+
+# Limites dos buckets em segundos, de 100µs (consultas) a 2min (páginas)
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Registro de histogramas e contadores, seguro entre threads."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        """Registra uma observação (em segundos) no histograma."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def increment(self, name, value=1, **labels):
+        """Soma value ao contador."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def summary(self):
+        """
+        Resumo das séries de histograma.
+
+        Returns:
+            dict: {(nome, labels): {"count", "sum", "mean"}}
+        """
+        with self._lock:
+            return {
+                (name, key): {
+                    "count": count,
+                    "sum": total,
+                    "mean": total / count if count else 0.0,
+                }
+                for name, series in self._histograms.items()
+                for key, (_, total, count) in series.items()
+            }
+
+    def render(self):
+        """
+        Renderiza o registro no formato texto do Prometheus.
+
+        Returns:
+            str: Conteúdo para o endpoint /metrics
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, (counts, total, count) in sorted(
+                    self._histograms[name].items()
+                ):
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets, counts):
+                        cumulative += bucket_count
+                        labels = _format_labels(key, [("le", _format_value(bound))])
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(key, [("le", "+Inf")])
+                    lines.append(f"{name}_bucket{labels} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total!r}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def span(name, registry=None, **labels):
+    """
+    Mede o tempo do bloco e registra no histograma name.
+
+    Exemplo:
+        with span(SCRAPER_STAGE_SECONDS, stage="parse"):
+            soup = BeautifulSoup(html, "html.parser")
+
+    Args:
+        name (str): Nome do histograma
+        registry (MetricsRegistry, optional): Registro (padrão: REGISTRY)
+        **labels: Labels da série (ex.: stage="page_load")
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (registry or REGISTRY).observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(name, **labels):
+    """
+    Decorator equivalente a span, para funções inteiras.
+
+    Args:
+        name (str): Nome do histograma
+        **labels: Labels da série
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def increment(name, value=1, **labels):
+    """Soma value ao contador name do registro global."""
+    REGISTRY.increment(name, value, **labels)
+
+
+def render_prometheus():
+    """Retorna o registro global no formato texto do Prometheus."""
+    return REGISTRY.render()
+
+
+def write_metrics_file(path):
+    """
+    Grava as métricas no formato do Prometheus (ex.: para o textfile collector
+    do node_exporter), de forma atômica.
+
+    Args:
+        path (str): Caminho do arquivo
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class MetricsFileWriter:
+    """Regrava o arquivo de métricas periodicamente numa thread e ao parar."""
+
+    def __init__(self, path, interval=15):
+        """
+        Args:
+            path (str): Caminho do arquivo
+            interval (float): Intervalo entre gravações, em segundos
+        """
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            write_metrics_file(self.path)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        write_metrics_file(self.path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """
+    Serve as métricas em http://host:port/metrics numa thread em segundo plano.
+
+    Args:
+        port (int): Porta HTTP
+        host (str): Endereço de escuta
+
+    Returns:
+        ThreadingHTTPServer: Servidor iniciado (use shutdown() para parar)
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,148 @@
+"""
+Perfilamento de CPU (cProfile) e memória (tracemalloc) por etapa.
+
+Usado pela opção --profile dos subcomandos train e evaluate do backend/main.py
+para identificar os pontos quentes do treino, das recomendações e da
+avaliação sem precisar cronometrar à mão no notebook.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class ProfileSession:
+    """
+    Coleta perfis de CPU e de alocações de memória para etapas nomeadas.
+
+    Cada etapa roda sob cProfile e tracemalloc; ao final, report() lista o
+    tempo e o pico de memória de cada etapa, as N funções mais caras (tempo
+    cumulativo e próprio) e os N pontos do código que mais alocaram memória
+    ainda retida ao fim da etapa.
+
+    Os tempos medidos ficam inflados pelo próprio tracemalloc; use-os para
+    comparar proporções entre funções, não como latência absoluta.
+    """
+
+    def __init__(self, top_n=25, trace_frames=1):
+        """
+        Args:
+            top_n (int): Quantidade de funções e pontos de alocação no relatório
+            trace_frames (int): Quadros de pilha guardados por alocação
+        """
+        self.top_n = top_n
+        self.trace_frames = trace_frames
+        self.sections = []
+
+    @contextmanager
+    def section(self, name):
+        """
+        Perfila o bloco como uma etapa do relatório.
+
+        Args:
+            name (str): Nome da etapa (ex.: "prepare_features")
+        """
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.trace_frames)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        base_memory = tracemalloc.get_traced_memory()[0]
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+
+            self.sections.append(
+                {
+                    "name": name,
+                    "seconds": elapsed,
+                    "retained_mb": (current - base_memory) / 1024**2,
+                    "peak_mb": (peak - base_memory) / 1024**2,
+                    "stats": pstats.Stats(profiler),
+                    "allocations": after.compare_to(before, "lineno")[: self.top_n],
+                }
+            )
+
+    def _format_stats(self, stats, sort_key):
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats(sort_key).print_stats(self.top_n)
+        # Remove o cabeçalho do pstats até a tabela
+        text = buffer.getvalue()
+        table_start = text.find("   ncalls")
+        return (text[table_start:] if table_start >= 0 else text).rstrip() + "\n"
+
+    def report(self):
+        """
+        Monta o relatório em texto.
+
+        Returns:
+            str: Relatório com uma seção por etapa
+        """
+        lines = []
+        for section in self.sections:
+            lines.append(f"===== {section['name']} =====")
+            lines.append(
+                f"Tempo: {section['seconds']:.3f}s | memória: pico "
+                f"{section['peak_mb']:.1f} MB, retida {section['retained_mb']:.1f} MB"
+            )
+            lines.append("")
+            lines.append(f"--- Top {self.top_n} funções por tempo cumulativo ---")
+            lines.append(self._format_stats(section["stats"], "cumulative"))
+            lines.append(f"--- Top {self.top_n} funções por tempo próprio ---")
+            lines.append(self._format_stats(section["stats"], "tottime"))
+            lines.append(f"--- Top {self.top_n} pontos de alocação (memória retida) ---")
+            for stat in section["allocations"]:
+                frame = stat.traceback[0]
+                lines.append(
+                    f"{stat.size_diff / 1024:>10.1f} KB {stat.count_diff:>8} blocos  "
+                    f"{frame.filename}:{frame.lineno}"
+                )
+            lines.append("")
+        return "\n".join(lines)
+
+    def summary(self):
+        """Resumo de uma linha por etapa, para o log."""
+        return [
+            f"{s['name']}: {s['seconds']:.2f}s, pico {s['peak_mb']:.1f} MB"
+            for s in self.sections
+        ]
+
+    def write(self, path):
+        """
+        Grava o relatório em texto e um .prof por etapa (para snakeviz/pstats).
+
+        Args:
+            path (str): Caminho do relatório (ex.: logs/profile_train.txt)
+
+        Returns:
+            list: Caminhos dos arquivos gravados
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report())
+        written = [path]
+
+        base, _ = os.path.splitext(path)
+        for section in self.sections:
+            prof_path = f"{base}_{section['name']}.prof"
+            section["stats"].dump_stats(prof_path)
+            written.append(prof_path)
+        return written
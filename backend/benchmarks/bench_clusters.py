@@ -0,0 +1,154 @@
+"""
+Mede a revocação do índice de clusters em relação à busca completa.
+
+Para cada catálogo (sintético ou um CSV) e scoring, treina o modelo, gera o
+índice de clusters (build_cluster_index) e, para cada n_probe pedido, compara
+o top-k sem diversificação com o da busca completa: a concordância dos ids
+(recall@k) e a fração dos itens cuja pontuação na busca completa é de top-k
+(recall@k por pontuação, que não depende da ordem de empates), além da
+latência média por consulta. No scoring "legacy" o índice pontua o catálogo
+inteiro de forma exata e n_probe não muda o resultado.
+
+Uso:
+    python backend/benchmarks/bench_clusters.py --sizes 20000 --probes 1 2 4 8 16
+    python backend/benchmarks/bench_clusters.py --csv db.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.app.core.wine_recommender import WineRecommender
+from backend.benchmarks.bench_embedding import overlap
+from backend.benchmarks.common import base_report, write_report
+from backend.benchmarks.synthetic_catalogue import (
+    DEFAULT_SOURCE,
+    generate_catalogue,
+    generate_queries,
+    load_source,
+)
+
+
+def timed_top_k(model, queries, k, n_probe):
+    """Top-k sem diversificação de cada consulta e a latência média (ms)."""
+    start = time.perf_counter()
+    results = [
+        model.recommend_wines(query, top_n=k, diversity_factor=0, n_probe=n_probe)
+        for query in queries
+    ]
+    return results, (time.perf_counter() - start) / len(queries) * 1e3
+
+
+def exhaustive_scores(model, query, scoring):
+    """Pontuação da consulta com todos os vinhos, por id."""
+    valid_columns = model.text_columns + model.ordinal_columns + model.categoric_columns
+    query = model.resolve_input({k: v for k, v in query.items() if k in valid_columns})
+    if scoring == "fused":
+        scores = next(model._fused_similarities([query], model.feature_weights))
+    else:
+        components = model._component_similarities(query)
+        scores = sum(
+            similarity * model.feature_weights[name]
+            for name, similarity in components.items()
+        )
+    if scores is None or np.isscalar(scores):
+        scores = np.zeros(len(model.df))
+    return pd.Series(scores, index=model.df["id"].to_numpy()).groupby(level=0).max()
+
+
+def score_recall(references, candidate):
+    """Fração média dos itens do candidato com pontuação de top-k na busca completa."""
+    values = [
+        float(np.mean(scores[found].to_numpy() >= scores[expected].min() - 1e-9))
+        for (scores, expected), found in zip(references, candidate)
+        if expected and found
+    ]
+    return float(np.mean(values)) if values else 0.0
+
+
+def bench_catalogue(name, catalogue, queries, scoring, args):
+    print(f"\n== {name} ({len(catalogue)} vinhos), scoring {scoring} ==")
+    model = WineRecommender(catalogue.copy(), lean=True, scoring=scoring)
+    exact, exact_ms = timed_top_k(model, queries, args.top_k, 0)
+    references = [
+        (exhaustive_scores(model, query, scoring), expected)
+        for query, expected in zip(queries, exact)
+    ]
+
+    start = time.perf_counter()
+    index = model.build_cluster_index()
+    result = {
+        "catalogue": name,
+        "scoring": scoring,
+        "n_wines": len(catalogue),
+        "n_queries": len(queries),
+        "top_k": args.top_k,
+        "n_clusters": index.n_clusters,
+        "index_mb": index.nbytes / 1024**2,
+        "build_seconds": time.perf_counter() - start,
+        "exhaustive_ms": exact_ms,
+        "probes": [],
+    }
+    print(f"  busca completa {exact_ms:.2f}ms/consulta")
+    for n_probe in args.probes:
+        found, ms = timed_top_k(model, queries, args.top_k, n_probe)
+        probe_result = {
+            "n_probe": n_probe,
+            "ms": ms,
+            "recall": overlap(exact, found),
+            "score_recall": score_recall(references, found),
+        }
+        print(
+            f"  n_probe={n_probe:<3} {ms:.2f}ms/consulta | recall@{args.top_k} "
+            f"{probe_result['recall']:.3f} | por pontuação "
+            f"{probe_result['score_recall']:.3f}"
+        )
+        result["probes"].append(probe_result)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[20000], help="Tamanhos")
+    parser.add_argument("--csv", nargs="*", default=[], help="Catálogos em CSV")
+    parser.add_argument(
+        "--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Valores de n_probe"
+    )
+    parser.add_argument(
+        "--scoring",
+        nargs="+",
+        choices=["legacy", "fused"],
+        default=["legacy", "fused"],
+        help="Scorings medidos",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Consultas por catálogo")
+    parser.add_argument("--top-k", type=int, default=5, help="Top-k comparado")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Catálogo base")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    source = load_source(args.source)
+    queries = generate_queries(args.queries, source=source)
+    catalogues = [(path, pd.read_csv(path)) for path in args.csv] + [
+        (f"sintético {n_wines}", generate_catalogue(n_wines, source=source))
+        for n_wines in args.sizes
+    ]
+    report = {
+        **base_report("clusters"),
+        "results": [
+            bench_catalogue(name, catalogue, queries, scoring, args)
+            for name, catalogue in catalogues
+            for scoring in args.scoring
+        ],
+    }
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
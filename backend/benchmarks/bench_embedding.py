@@ -0,0 +1,134 @@
+"""
+Compara a similaridade textual no TF-IDF esparso com o embedding SVD denso.
+
+Para cada tamanho de catálogo sintético, treina o modelo (vocabulário) e mede
+a latência das consultas individuais e em lote, a concordância do top-k e as
+métricas Jaccard/cobertura do avaliador (JaccardWineEvaluator) com o cosseno
+no TF-IDF e com o embedding de cada dimensão pedida (build_text_embedding).
+
+Uso:
+    python backend/benchmarks/bench_embedding.py --sizes 10000 50000 --dims 128 256
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.app.core.wine_recommender import WineRecommender
+from backend.benchmarks.bench_recommender import bench_batch, bench_single
+from backend.benchmarks.common import base_report, write_report
+from backend.benchmarks.synthetic_catalogue import (
+    DEFAULT_SOURCE,
+    generate_catalogue,
+    generate_queries,
+    load_source,
+)
+
+
+def top_k(model, queries, k):
+    """Top-k sem diversificação de cada consulta."""
+    return [model.recommend_wines(query, top_n=k, diversity_factor=0) for query in queries]
+
+
+def overlap(reference, candidate):
+    """Fração média do top-k de referência presente no top-k do candidato."""
+    values = [
+        len(set(expected) & set(found)) / len(expected)
+        for expected, found in zip(reference, candidate)
+        if expected
+    ]
+    return float(np.mean(values)) if values else 0.0
+
+
+def bench_mode(model, catalogue, queries, args):
+    """Latência e qualidade do modo de similaridade textual atual do modelo."""
+    for query in queries[:3]:
+        model.recommend_wines(query)
+    result = {
+        "single": bench_single(model, queries, diversity_factor=0.5),
+        "batch": bench_batch(model, queries, args.batch_size),
+    }
+    metrics_result = model.evaluate_diversity_metrics(
+        dataframe=catalogue, num_tests=args.num_tests
+    )
+    result["jaccard"] = float(metrics_result["jaccard_médio"])
+    result["coverage"] = float(metrics_result["cobertura"])
+    return result
+
+
+def describe(name, result):
+    print(
+        f"  {name:<14} p50 {result['single']['p50_ms']:.2f}ms | lote "
+        f"{result['batch']['per_query_ms']:.2f}ms/consulta | Jaccard "
+        f"{result['jaccard']:.4f} | cobertura {result['coverage']:.3f}"
+        + (f" | top-k {result['overlap']:.3f}" if "overlap" in result else "")
+    )
+
+
+def bench_size(n_wines, source, args):
+    print(f"\n== {n_wines} vinhos ==")
+    catalogue = generate_catalogue(n_wines, source=source)
+    queries = generate_queries(args.queries, source=source)
+    model = WineRecommender(catalogue.copy())
+
+    result = {"n_wines": n_wines, "n_queries": len(queries), "top_k": args.top_k}
+    result["sparse"] = bench_mode(model, catalogue, queries, args)
+    result["sparse"]["text_nnz"] = int(model.text_matrix.nnz)
+    describe("TF-IDF", result["sparse"])
+    reference = top_k(model, queries, args.top_k)
+
+    result["embedding"] = []
+    for dims in args.dims:
+        start = time.perf_counter()
+        embedding = model.build_text_embedding(dims)
+        build_seconds = time.perf_counter() - start
+
+        dims_result = bench_mode(model, catalogue, queries, args)
+        dims_result.update(
+            {
+                "dims": embedding.n_components,
+                "build_seconds": build_seconds,
+                "embedding_mb": embedding.nbytes / 1024**2,
+                "explained_variance": embedding.explained_variance,
+                "overlap": overlap(reference, top_k(model, queries, args.top_k)),
+            }
+        )
+        describe(f"SVD {embedding.n_components}", dims_result)
+        result["embedding"].append(dims_result)
+        model.set_text_similarity("sparse")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 50000], help="Tamanhos"
+    )
+    parser.add_argument(
+        "--dims", type=int, nargs="+", default=[128, 256], help="Dimensões do embedding"
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Consultas por tamanho")
+    parser.add_argument("--batch-size", type=int, default=32, help="Consultas por lote")
+    parser.add_argument(
+        "--num-tests", type=int, default=50, help="Consultas da avaliação Jaccard"
+    )
+    parser.add_argument("--top-k", type=int, default=10, help="Top-k da concordância")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Catálogo base")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    source = load_source(args.source)
+    report = {
+        **base_report("embedding"),
+        "results": [bench_size(n_wines, source, args) for n_wines in args.sizes],
+    }
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
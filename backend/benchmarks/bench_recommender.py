@@ -0,0 +1,245 @@
+"""
+Benchmark do WineRecommender com catálogos sintéticos de tamanho crescente.
+
+Mede tempo de treino, memória, latência p50/p99 e QPS para consultas
+individuais e em lote, e grava os resultados em JSON para comparar commits.
+
+Uso:
+    python backend/benchmarks/bench_recommender.py --sizes 1000 10000 100000
+    python backend/benchmarks/bench_recommender.py --compare bench_results/anterior.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import psutil
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.app.core.wine_recommender import WineRecommender
+from backend.benchmarks.common import base_report, write_report
+from backend.benchmarks.synthetic_catalogue import (
+    DEFAULT_SOURCE,
+    generate_catalogue,
+    generate_queries,
+    load_source,
+)
+
+
+# Métricas comparadas entre execuções (maior = pior)
+COMPARED_METRICS = [
+    ("fit_seconds",),
+    ("rss_delta_mb",),
+    ("single", "p50_ms"),
+    ("single", "p99_ms"),
+    ("single_no_diversity", "p50_ms"),
+    ("batch", "per_query_ms"),
+]
+
+
+def rss_mb():
+    """Memória residente do processo em MB."""
+    return psutil.Process().memory_info().rss / 1024**2
+
+
+def latency_stats(latencies):
+    """
+    Resume uma lista de latências em segundos.
+
+    Args:
+        latencies (list): Latências em segundos
+
+    Returns:
+        dict: p50, p99 e média em ms, e consultas por segundo
+    """
+    latencies = np.asarray(latencies)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "mean_ms": float(latencies.mean() * 1000),
+        "qps": float(len(latencies) / latencies.sum()),
+    }
+
+
+def bench_single(model, queries, diversity_factor):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.recommend_wines(query, top_n=5, diversity_factor=diversity_factor)
+        latencies.append(time.perf_counter() - start)
+    return latency_stats(latencies)
+
+
+def bench_batch(model, queries, batch_size):
+    latencies = []
+    for start_idx in range(0, len(queries), batch_size):
+        batch = queries[start_idx : start_idx + batch_size]
+        start = time.perf_counter()
+        model.recommend_wines_batch(batch, top_n=5)
+        latencies.append(time.perf_counter() - start)
+    total = float(np.sum(latencies))
+    return {
+        "batch_size": batch_size,
+        "p50_batch_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_batch_ms": float(np.percentile(latencies, 99) * 1000),
+        "per_query_ms": total / len(queries) * 1000,
+        "qps": len(queries) / total,
+    }
+
+
+def bench_size(n_wines, source, n_queries, batch_size, measure_artifact, lean=False):
+    """
+    Executa o benchmark para um tamanho de catálogo.
+
+    Args:
+        n_wines (int): Quantidade de vinhos sintéticos
+        source (pd.DataFrame): Catálogo real usado como base
+        n_queries (int): Quantidade de consultas
+        batch_size (int): Tamanho do lote nas consultas em lote
+        measure_artifact (bool): Se deve medir o tamanho do modelo salvo
+        lean (bool): Treina o modelo compacto (WineRecommender.compact)
+
+    Returns:
+        dict: Resultados do tamanho
+    """
+    print(f"\n== {n_wines} vinhos ==")
+    catalogue = generate_catalogue(n_wines, source=source)
+    queries = generate_queries(n_queries, source=source)
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    model = WineRecommender(catalogue, lean=lean)
+    fit_seconds = time.perf_counter() - start
+    rss_after = rss_mb()
+    del catalogue
+
+    result = {
+        "n_wines": n_wines,
+        "n_queries": n_queries,
+        "lean": lean,
+        "fit_seconds": fit_seconds,
+        "text_features": int(model.text_matrix.shape[1]),
+        "text_nnz": int(model.text_matrix.nnz),
+        "rss_delta_mb": rss_after - rss_before,
+        "rss_mb": rss_after,
+    }
+    print(f"Treino: {fit_seconds:.2f}s, {result['text_features']} termos")
+
+    if measure_artifact:
+        fd, path = tempfile.mkstemp(suffix=".pkl")
+        os.close(fd)
+        try:
+            joblib.dump(model, path)
+            result["artifact_mb"] = os.path.getsize(path) / 1024**2
+        finally:
+            os.remove(path)
+
+    # Aquecimento (caches do vetorizador, alocações iniciais)
+    for query in queries[:3]:
+        model.recommend_wines(query)
+
+    result["single"] = bench_single(model, queries, diversity_factor=0.5)
+    result["single_no_diversity"] = bench_single(model, queries, diversity_factor=0)
+    result["batch"] = bench_batch(model, queries, batch_size)
+
+    # None com o cache desativado ou sem suporte no vetorizador
+    result["text_cache"] = model.text_cache_stats()
+    text_cache = result["text_cache"]
+
+    print(
+        f"Consulta: p50 {result['single']['p50_ms']:.2f}ms, "
+        f"p99 {result['single']['p99_ms']:.2f}ms, "
+        f"{result['single']['qps']:.1f} QPS | "
+        f"lote: {result['batch']['per_query_ms']:.2f}ms/consulta, "
+        f"{result['batch']['qps']:.1f} QPS | cache de texto: "
+        + (f"{text_cache['hit_rate']:.1%} de acertos" if text_cache else "desativado")
+    )
+    return result
+
+
+def compare(current, previous, threshold):
+    """
+    Compara duas execuções e lista as regressões acima do limite.
+
+    Args:
+        current (dict): Resultados atuais
+        previous (dict): Resultados de referência
+        threshold (float): Aumento relativo tolerado (0.2 = 20%)
+
+    Returns:
+        list: Descrições das regressões encontradas
+    """
+    previous_by_size = {r["n_wines"]: r for r in previous["results"]}
+    regressions = []
+    print(f"\nComparação com {previous.get('git_commit')}:")
+    for result in current["results"]:
+        old = previous_by_size.get(result["n_wines"])
+        if old is None:
+            continue
+        for path in COMPARED_METRICS:
+            new_value, old_value = result, old
+            for key in path:
+                new_value = (new_value or {}).get(key)
+                old_value = (old_value or {}).get(key)
+            if not new_value or not old_value:
+                continue
+            change = new_value / old_value - 1
+            name = ".".join(path)
+            print(f"  {result['n_wines']:>8} {name:<28} {change:+.1%}")
+            if change > threshold:
+                regressions.append(f"{result['n_wines']} {name}: {change:+.1%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000], help="Tamanhos"
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Consultas por tamanho")
+    parser.add_argument("--batch-size", type=int, default=32, help="Tamanho do lote")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Catálogo base")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    parser.add_argument("--compare", default=None, help="JSON de referência")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Regressão tolerada na comparação"
+    )
+    parser.add_argument(
+        "--no-artifact", action="store_true", help="Não mede o tamanho do modelo salvo"
+    )
+    parser.add_argument("--lean", action="store_true", help="Usa o modelo compacto")
+    args = parser.parse_args(argv)
+
+    source = load_source(args.source)
+    report = {
+        **base_report("recommender"),
+        "results": [
+            bench_size(
+                n_wines,
+                source,
+                args.queries,
+                args.batch_size,
+                measure_artifact=not args.no_artifact,
+                lean=args.lean,
+            )
+            for n_wines in args.sizes
+        ],
+    }
+    write_report(report, args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("Regressões acima do limite:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Benchmark do scraper contra o site falso da Evino servido localmente.
+
+Mede a rolagem da listagem (scroll_page), a extração incremental de links e
+scrape_wine_info_with_selenium em páginas de produto, reportando páginas por
+minuto e o tempo gasto em cada etapa. Não acessa a Evino nem o Supabase: o
+banco é substituído por um armazenamento em memória.
+
+Requer Chrome/chromedriver, como o scraper.
+
+Uso:
+    python backend/benchmarks/bench_scraper.py --pages 20
+    python backend/benchmarks/bench_scraper.py --pages 50 --delay-scale 0.1 --latency-ms 50
+"""
+
+import argparse
+import functools
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.benchmarks.common import base_report, write_report
+from backend.benchmarks.fake_evino import FakeEvinoSite, InMemorySupabase
+
+
+# Campos comparados com o db.csv para conferir se a extração continua correta
+CHECKED_FIELDS = [
+    ("product_name", "product_name"),
+    ("product_type", "product_type"),
+    ("technical_sheet_country", "technical_sheet_country"),
+    ("fruit_tasting", "fruit_tasting"),
+    ("sugar_tasting", "sugar_tasting"),
+    ("acidity_tasting", "acidity_tasting"),
+    ("tannin_tasting", "tannin_tasting"),
+]
+
+
+class StageTimer:
+    """
+    Acumula o tempo por etapa descontando as etapas aninhadas.
+
+    Cada etapa registra apenas o próprio tempo (ex.: o driver.get chamado
+    dentro do download da imagem conta como page_load, não como image), de
+    forma que a soma das etapas não ultrapassa o tempo total. Só mede chamadas
+    da thread que criou o timer (as threads do servidor falso são ignoradas).
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._stack = []
+        self._thread_id = threading.get_ident()
+
+    def wrap(self, stage, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if threading.get_ident() != self._thread_id:
+                return func(*args, **kwargs)
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = self._stack.pop()
+                self.seconds[stage] += elapsed - children
+                self.calls[stage] += 1
+                if self._stack:
+                    self._stack[-1] += elapsed
+
+        return wrapper
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+    def report(self, total):
+        stages = {
+            stage: {
+                "seconds": self.seconds[stage],
+                "calls": self.calls[stage],
+                "share": self.seconds[stage] / total if total else 0.0,
+            }
+            for stage in sorted(self.seconds, key=self.seconds.get, reverse=True)
+        }
+        stages["other"] = {
+            "seconds": max(0.0, total - sum(self.seconds.values())),
+            "calls": None,
+            "share": max(0.0, 1 - sum(self.seconds.values()) / total) if total else 0.0,
+        }
+        return stages
+
+
+def print_stages(stages):
+    for stage, values in stages.items():
+        calls = f"{values['calls']:>5}x" if values["calls"] is not None else "      "
+        print(f"  {stage:<20} {values['seconds']:>8.2f}s {calls} {values['share']:>6.1%}")
+
+
+def instrument(timer, modules, driver, delay_scale):
+    """
+    Envolve as etapas do scraper com o StageTimer e ajusta os atrasos fixos.
+
+    Args:
+        timer (StageTimer): Acumulador de tempos
+        modules (dict): Módulos do scraper já importados
+        driver (webdriver.Chrome): Navegador usado no benchmark
+        delay_scale (float): Fator aplicado a SCROLL_DELAY e BUTTON_CLICK_DELAY
+    """
+    scraper, scraper_aux, supabase_client = (
+        modules["scraper"],
+        modules["scraper_aux"],
+        modules["supabase_client"],
+    )
+
+    # Os atrasos são importados por valor em cada módulo
+    for module in (scraper, scraper_aux, supabase_client):
+        for name in ("SCROLL_DELAY", "BUTTON_CLICK_DELAY"):
+            if hasattr(module, name):
+                setattr(module, name, getattr(module, name) * delay_scale)
+
+    driver.get = timer.wrap("page_load", driver.get)
+    time.sleep = timer.wrap("sleep", time.sleep)
+
+    stages = {
+        "scroll": ["scroll_page", "scroll_once"],
+        "click_tech_details": ["click_button_show_tech_details"],
+        "parse": ["BeautifulSoup"],
+        "strength_levels": ["get_strength_level"],
+        "image": ["baixar_imagem"],
+        "collect_links": ["collect_product_links"],
+        "save_links": ["save_links_to_supabase"],
+        "checkpoint": ["save_crawl_checkpoint"],
+    }
+    for stage, names in stages.items():
+        for name in names:
+            for module in (scraper, supabase_client):
+                if hasattr(module, name):
+                    setattr(module, name, timer.wrap(stage, getattr(module, name)))
+    # scroll_page chama scroll_once pelo namespace do scraper_aux
+    scraper_aux.scroll_once = timer.wrap("scroll", scraper_aux.scroll_once)
+
+
+def check_extraction(wine_data, product):
+    """Retorna os campos extraídos que divergem do catálogo servido."""
+    mismatches = []
+    for field, column in CHECKED_FIELDS:
+        expected = product.get(column)
+        got = wine_data.get(field) if wine_data else None
+        if expected is None or (isinstance(expected, float) and expected != expected):
+            expected = None
+        if isinstance(expected, float) and expected.is_integer():
+            expected = int(expected)
+        if (None if expected is None else str(expected)) != (
+            None if got is None else str(got)
+        ):
+            mismatches.append(field)
+    return mismatches
+
+
+def bench_scroll(site, driver, modules, timer):
+    print("\n== Rolagem da listagem (scroll_page) ==")
+    timer.reset()
+    start = time.perf_counter()
+    driver.get(site.base_url + "/vinhos")
+    modules["scraper_aux"].scroll_page(driver)
+    links = modules["scraper_aux"].collect_product_links(driver)
+    total = time.perf_counter() - start
+    stages = timer.report(total)
+    print(f"{len(set(links))} links em {total:.2f}s")
+    print_stages(stages)
+    return {"seconds": total, "links": len(set(links)), "stages": stages}
+
+
+def bench_crawl(site, driver, modules, timer, max_scrolls):
+    print("\n== Extração incremental de links ==")
+    store = InMemorySupabase()
+    checkpoint = os.path.join(tempfile.mkdtemp(), "crawl_checkpoint.json")
+    timer.reset()
+    start = time.perf_counter()
+    new_links = modules["supabase_client"].scrape_product_links_incremental(
+        driver, store, checkpoint_path=checkpoint, max_scrolls=max_scrolls, resume=False
+    )
+    total = time.perf_counter() - start
+    shutil.rmtree(os.path.dirname(checkpoint), ignore_errors=True)
+    stages = timer.report(total)
+    print(f"{new_links} links novos em {total:.2f}s")
+    print_stages(stages)
+    return {"seconds": total, "links": new_links, "stages": stages}
+
+
+def bench_products(site, driver, modules, timer, n_pages):
+    print(f"\n== scrape_wine_info_with_selenium em {n_pages} páginas ==")
+    products = site.products[:n_pages]
+    urls = site.product_urls[:n_pages]
+    failures, mismatched = 0, defaultdict(int)
+    latencies = []
+
+    timer.reset()
+    start = time.perf_counter()
+    for url, product in zip(urls, products):
+        page_start = time.perf_counter()
+        wine_data = modules["scraper"].scrape_wine_info_with_selenium(driver, url)
+        latencies.append(time.perf_counter() - page_start)
+        if wine_data is None:
+            failures += 1
+        for field in check_extraction(wine_data, product):
+            mismatched[field] += 1
+    total = time.perf_counter() - start
+
+    stages = timer.report(total)
+    pages_per_minute = len(urls) / total * 60 if total else 0.0
+    print(
+        f"{pages_per_minute:.1f} páginas/min, {total / len(urls):.2f}s por página, "
+        f"{failures} falhas"
+    )
+    print_stages(stages)
+    if mismatched:
+        print(f"Campos divergentes do catálogo: {dict(mismatched)}")
+    return {
+        "pages": len(urls),
+        "seconds": total,
+        "pages_per_minute": pages_per_minute,
+        "seconds_per_page_max": max(latencies),
+        "failures": failures,
+        "mismatched_fields": dict(mismatched),
+        "stages": stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=120, help="Produtos no site falso")
+    parser.add_argument("--page-size", type=int, default=24, help="Produtos por página")
+    parser.add_argument("--pages", type=int, default=20, help="Páginas de produto extraídas")
+    parser.add_argument("--max-scrolls", type=int, default=15, help="Rolagens no crawl")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Atraso por requisição")
+    parser.add_argument("--image-kb", type=int, default=30, help="Tamanho das imagens")
+    parser.add_argument(
+        "--delay-scale",
+        type=float,
+        default=1.0,
+        help="Fator aplicado a SCROLL_DELAY e BUTTON_CLICK_DELAY (1 = valores reais)",
+    )
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    site = FakeEvinoSite(
+        n_products=args.products,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        image_kb=args.image_kb,
+    ).start()
+    image_dir = tempfile.mkdtemp(prefix="bench_scraper_images_")
+
+    # As configurações são lidas na importação dos módulos do scraper
+    os.environ["EVINO_BASE_URL"] = site.base_url
+    os.environ["IMAGE_PATH"] = image_dir
+    os.environ["SUPABASE_URL"] = "http://127.0.0.1:9"
+    os.environ["SUPABASE_KEY"] = "bench.bench.bench"
+
+    from backend.app.core import browser, scraper, scraper_aux
+    from backend.app.database import supabase_client
+
+    modules = {
+        "scraper": scraper,
+        "scraper_aux": scraper_aux,
+        "supabase_client": supabase_client,
+    }
+    real_sleep = time.sleep
+    driver = browser.initialize_browser()
+    if driver is None:
+        site.stop()
+        print("Navegador indisponível; o benchmark do scraper requer Chrome")
+        return 4
+
+    timer = StageTimer()
+    instrument(timer, modules, driver, args.delay_scale)
+    try:
+        report = {
+            **base_report("scraper"),
+            "config": vars(args),
+            "scroll": bench_scroll(site, driver, modules, timer),
+            "crawl": bench_crawl(site, driver, modules, timer, args.max_scrolls),
+            "products": bench_products(site, driver, modules, timer, args.pages),
+            "requests_by_route": dict(site.requests_by_route),
+        }
+    finally:
+        time.sleep = real_sleep
+        browser.close_browser(driver)
+        site.stop()
+        shutil.rmtree(image_dir, ignore_errors=True)
+
+    print(f"\nRequisições atendidas: {report['requests_by_route']}")
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Benchmark da montagem do texto combinado (combined_text_features).
+
+Compara, em catálogos sintéticos, a montagem linha a linha com
+DataFrame.apply (implementação anterior do prepare_features) com o
+TextAssembler por colunas, com e sem pesos, e mede a montagem do texto
+das consultas.
+
+Uso:
+    python backend/benchmarks/bench_text_assembly.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.app.core.wine_recommender import WineRecommender
+from backend.app.core.wine_recommender_text import TextAssembler
+from backend.benchmarks.common import base_report, write_report
+from backend.benchmarks.synthetic_catalogue import (
+    DEFAULT_SOURCE,
+    generate_catalogue,
+    generate_queries,
+    load_source,
+)
+
+
+def assemble_rowwise(dataframe, columns):
+    """Montagem anterior: uma chamada de função Python por linha."""
+    return dataframe[columns].fillna("").apply(lambda x: " ".join(x.astype(str)), axis=1)
+
+
+def best_of(func, repeat):
+    """Menor tempo (s) de repeat execuções e o resultado da última."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_size(n_wines, source, queries, weights, repeat):
+    print(f"\n== {n_wines} vinhos ==")
+    catalogue = generate_catalogue(n_wines, source=source)
+    columns = [col for col in WineRecommender.TEXT_COLUMNS if col in catalogue.columns]
+    assembler = TextAssembler(columns)
+    weighted = TextAssembler(columns, weights)
+
+    rowwise_seconds, expected = best_of(
+        lambda: assemble_rowwise(catalogue, columns), repeat
+    )
+    columnar_seconds, texts = best_of(lambda: assembler.assemble(catalogue), repeat)
+    weighted_seconds, _ = best_of(lambda: weighted.assemble(catalogue), repeat)
+
+    text_queries = [
+        {k: v for k, v in query.items() if k in columns} for query in queries
+    ]
+    query_seconds, _ = best_of(
+        lambda: [assembler.assemble_query(query) for query in text_queries], repeat
+    )
+
+    result = {
+        "n_wines": n_wines,
+        "rowwise_seconds": rowwise_seconds,
+        "columnar_seconds": columnar_seconds,
+        "weighted_seconds": weighted_seconds,
+        "speedup": rowwise_seconds / columnar_seconds,
+        "identical": bool((expected == texts).all()),
+        "rows_per_second": n_wines / columnar_seconds,
+        "query_us": query_seconds / len(text_queries) * 1e6,
+    }
+    print(
+        f"linha a linha {rowwise_seconds:.3f}s | por colunas {columnar_seconds:.3f}s "
+        f"({result['speedup']:.1f}x, idêntico: {result['identical']}) | "
+        f"com pesos {weighted_seconds:.3f}s | consulta {result['query_us']:.1f}µs"
+    )
+    return result
+
+
+def parse_weights(values):
+    """Converte ["coluna=peso", ...] em dicionário."""
+    weights = {}
+    for value in values:
+        column, _, weight = value.partition("=")
+        weights[column] = int(weight)
+    return weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000], help="Tamanhos"
+    )
+    parser.add_argument("--queries", type=int, default=1000, help="Consultas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições (melhor tempo)")
+    parser.add_argument(
+        "--weight",
+        action="append",
+        default=None,
+        help="Peso de coluna no cenário com pesos (coluna=N; padrão harmonizes_with=2)",
+    )
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Catálogo base")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    source = load_source(args.source)
+    queries = generate_queries(args.queries, source=source)
+    weights = parse_weights(args.weight or ["harmonizes_with=2"])
+    report = {
+        **base_report("text_assembly"),
+        "weights": weights,
+        "results": [
+            bench_size(n_wines, source, queries, weights, args.repeat)
+            for n_wines in args.sizes
+        ],
+    }
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Compara os modos de vetorização de texto do WineRecommender.
+
+Para cada tamanho de catálogo sintético, treina o modelo com o vocabulário
+(TfidfVectorizer) e com hashing (HashingTfidfVectorizer) e mede o tempo de
+treino, o tamanho do vetorizador salvo, a latência das consultas, a
+concordância das recomendações do modo hashing com as do vocabulário
+(sobreposição do top-k) e as métricas Jaccard/cobertura do avaliador.
+
+Uso:
+    python backend/benchmarks/bench_text_modes.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.app.core.wine_recommender import TEXT_MODES, WineRecommender
+from backend.benchmarks.bench_recommender import bench_single, rss_mb
+from backend.benchmarks.common import base_report, write_report
+from backend.benchmarks.synthetic_catalogue import (
+    DEFAULT_SOURCE,
+    generate_catalogue,
+    generate_queries,
+    load_source,
+)
+
+
+def top_k_overlap(reference, candidate, queries, top_k):
+    """
+    Fração média do top-k de referência presente no top-k do candidato.
+
+    Args:
+        reference (WineRecommender): Modelo de referência
+        candidate (WineRecommender): Modelo comparado
+        queries (list): Consultas
+        top_k (int): Tamanho do top-k (sem diversificação)
+
+    Returns:
+        float: Sobreposição média (0-1)
+    """
+    overlaps = []
+    for query in queries:
+        expected = set(reference.recommend_wines(query, top_n=top_k, diversity_factor=0))
+        found = set(candidate.recommend_wines(query, top_n=top_k, diversity_factor=0))
+        if expected:
+            overlaps.append(len(expected & found) / len(expected))
+    return float(np.mean(overlaps)) if overlaps else 0.0
+
+
+def bench_mode(catalogue, text_mode, queries, num_tests):
+    """
+    Treina e mede um modo de vetorização.
+
+    Returns:
+        tuple: (WineRecommender, dict de resultados)
+    """
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    model = WineRecommender(catalogue.copy(), text_mode=text_mode)
+    fit_seconds = time.perf_counter() - start
+
+    result = {
+        "fit_seconds": fit_seconds,
+        "rss_delta_mb": rss_mb() - rss_before,
+        "vectorizer_mb": len(pickle.dumps(model.vectorizer)) / 1024**2,
+        "text_columns": int(model.text_matrix.shape[1]),
+        "text_nnz": int(model.text_matrix.nnz),
+    }
+    for query in queries[:3]:
+        model.recommend_wines(query)
+    result["single"] = bench_single(model, queries, diversity_factor=0.5)
+
+    metrics_result = model.evaluate_diversity_metrics(
+        dataframe=catalogue, num_tests=num_tests
+    )
+    result["jaccard"] = float(metrics_result["jaccard_médio"])
+    result["coverage"] = float(metrics_result["cobertura"])
+
+    print(
+        f"  {text_mode:<10} treino {fit_seconds:.2f}s | vetorizador "
+        f"{result['vectorizer_mb']:.1f} MB | p50 {result['single']['p50_ms']:.2f}ms | "
+        f"Jaccard {result['jaccard']:.4f} | cobertura {result['coverage']:.3f}"
+    )
+    return model, result
+
+
+def bench_size(n_wines, source, n_queries, num_tests, top_k):
+    print(f"\n== {n_wines} vinhos ==")
+    catalogue = generate_catalogue(n_wines, source=source)
+    queries = generate_queries(n_queries, source=source)
+
+    models, result = {}, {"n_wines": n_wines, "n_queries": n_queries}
+    for text_mode in TEXT_MODES:
+        models[text_mode], result[text_mode] = bench_mode(
+            catalogue, text_mode, queries, num_tests
+        )
+
+    result["top_k"] = top_k
+    result["hashing_overlap"] = top_k_overlap(
+        models["vocabulary"], models["hashing"], queries, top_k
+    )
+    print(f"  Sobreposição do top-{top_k} (hashing x vocabulário): "
+          f"{result['hashing_overlap']:.3f}")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000], help="Tamanhos"
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Consultas por tamanho")
+    parser.add_argument(
+        "--num-tests", type=int, default=50, help="Consultas da avaliação Jaccard"
+    )
+    parser.add_argument("--top-k", type=int, default=10, help="Top-k da concordância")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Catálogo base")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    source = load_source(args.source)
+    report = {
+        **base_report("text_modes"),
+        "results": [
+            bench_size(n_wines, source, args.queries, args.num_tests, args.top_k)
+            for n_wines in args.sizes
+        ],
+    }
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
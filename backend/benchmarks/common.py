@@ -0,0 +1,68 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+import numpy as np
+import sklearn
+
+
+def git_commit():
+    """Retorna o hash curto do commit atual, se disponível."""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def base_report(name):
+    """
+    Cabeçalho comum dos relatórios de benchmark.
+
+    Args:
+        name (str): Nome do benchmark, usado também no arquivo de saída
+
+    Returns:
+        dict: Commit, data e ambiente da execução; os resultados são
+            acrescentados por cada benchmark
+    """
+    return {
+        "benchmark": name,
+        "git_commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report, output=None):
+    """
+    Salva o relatório em JSON.
+
+    Args:
+        report (dict): Relatório criado com base_report
+        output (str): Caminho do arquivo; por padrão
+            bench_results/<benchmark>_<commit>.json
+
+    Returns:
+        str: Caminho do arquivo salvo
+    """
+    output = output or os.path.join(
+        "bench_results",
+        f"{report['benchmark']}_{report['git_commit'] or 'local'}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {output}")
+    return output
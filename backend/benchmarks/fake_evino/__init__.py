@@ -0,0 +1,2 @@
+from backend.benchmarks.fake_evino.server import FakeEvinoSite
+from backend.benchmarks.fake_evino.store import InMemorySupabase
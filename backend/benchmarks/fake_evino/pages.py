@@ -0,0 +1,238 @@
+"""
+Renderização das páginas do site falso da Evino a partir do db.csv.
+
+O HTML reproduz apenas a marcação que o scraper usa (classes BoxProductInfo__*,
+HowToTaste__*, ProductSpecifications__*, SpecialistOpinion__* e
+NewProductImage), para que os seletores sejam exercitados como no site real.
+"""
+
+import html
+import re
+import unicodedata
+
+import pandas as pd
+
+
+# Rótulos dos níveis de sabor, na ordem exibida pelo site
+STRENGTH_LABELS = [
+    ("Fruta", "fruit_tasting"),
+    ("Açúcar", "sugar_tasting"),
+    ("Acidez", "acidity_tasting"),
+    ("Tanino", "tannin_tasting"),
+]
+
+# Itens da ficha técnica: (título exibido, coluna do db.csv, sufixo)
+SPECIFICATIONS = [
+    ("Tipo de vinho", "technical_sheet_wine_type", ""),
+    ("Teor alcoólico", "technical_sheet_alcohol_content", "%"),
+    ("Volume", "technical_sheet_volume", ""),
+    ("Uvas", "technical_sheet_grapes", ""),
+    ("Tipo de fechamento", "technical_sheet_closure_type", ""),
+    ("Temperatura de serviço", "technical_sheet_service_temperature_in_celsius", "°C"),
+    ("País", "technical_sheet_country", ""),
+    ("Região", "technical_sheet_region", ""),
+    ("Produtor", "technical_sheet_producer", ""),
+    ("Safra", "technical_sheet_crop_year", ""),
+    ("Tempo de guarda", "technical_sheet_cellaring_time", ""),
+    ("Maturação", "technical_sheet_maturation_time", ""),
+]
+
+PAGE_STYLE = """
+body { font-family: sans-serif; margin: 0; }
+.ProductCard { display: block; height: 320px; margin: 8px; border: 1px solid #ddd; }
+.HowToTaste__DetailsContainer__ProgressBarContainer__Wrapper span {
+    display: inline-block; width: 20px; height: 8px; background: #eee;
+}
+.HowToTaste__DetailsContainer__ProgressBarContainer__Wrapper span.is-level::after {
+    content: ""; display: block; height: 8px; background: #a0002a;
+}
+.ProductSpecifications--collapsed .ProductSpecifications__DetailsContainer:nth-child(n+4) {
+    display: none;
+}
+"""
+
+
+def _text(value):
+    """Converte um valor do db.csv em texto escapado ('' para nulos)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return html.escape(str(value))
+
+
+def slugify(text):
+    """
+    Gera o trecho de URL de um produto no formato usado pela Evino.
+
+    Args:
+        text (str): Nome do produto
+
+    Returns:
+        str: Texto sem acentos, em minúsculas e separado por hífens
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+
+def product_path(product):
+    """Caminho da página de um produto (ex.: /product/nome-do-vinho-644)."""
+    return f"/product/{slugify(product['product_name'])}-{product['id']}"
+
+
+def image_path(product):
+    """Caminho da imagem de um produto."""
+    return f"/images/{product['id']}.gif"
+
+
+def render_product_cards(products):
+    """
+    Renderiza os cartões de produto da listagem.
+
+    Args:
+        products (list): Registros de produtos (dicionários do db.csv)
+
+    Returns:
+        str: HTML dos cartões
+    """
+    return "".join(
+        f'<a class="ProductCard" href="{product_path(p)}">'
+        f'<img loading="lazy" src="{image_path(p)}" alt="">'
+        f"<span>{_text(p['product_name'])}</span></a>"
+        for p in products
+    )
+
+
+def render_listing(products, has_more):
+    """
+    Renderiza a página /vinhos com o botão "Mostrar mais".
+
+    O botão busca a próxima página em /vinhos/page/<n> e acrescenta os cartões
+    ao final da lista, como no site real, e some quando não há mais produtos.
+
+    Args:
+        products (list): Produtos da primeira página
+        has_more (bool): Se existem mais páginas
+
+    Returns:
+        str: HTML da página
+    """
+    button_style = "" if has_more else ' style="display: none"'
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>Vinhos | Evino</title><style>{PAGE_STYLE}</style></head>
+<body>
+<div id="product-list">{render_product_cards(products)}</div>
+<button id="show-more" type="button" data-next-page="2"{button_style}>Mostrar mais</button>
+<script>
+document.getElementById("show-more").addEventListener("click", function () {{
+    var button = this;
+    fetch("/vinhos/page/" + button.dataset.nextPage)
+        .then(function (response) {{ return response.json(); }})
+        .then(function (data) {{
+            document.getElementById("product-list")
+                .insertAdjacentHTML("beforeend", data.html);
+            button.dataset.nextPage = data.next_page;
+            if (!data.has_more) {{ button.style.display = "none"; }}
+        }});
+}});
+</script>
+</body>
+</html>"""
+
+
+def _render_strength(label, level):
+    spans = "".join(
+        '<span class="is-level"></span>' if i == level else "<span></span>"
+        for i in range(1, 6)
+    )
+    return (
+        '<div class="HowToTaste__DetailsContainer__ProgressBarContainer__Wrapper">'
+        f"<p>{label}</p><div>{spans}</div></div>"
+    )
+
+
+def _render_specifications(product):
+    items = []
+    for title, column, suffix in SPECIFICATIONS:
+        value = _text(product.get(column))
+        if not value:
+            continue
+        items.append(
+            '<div class="ProductSpecifications__DetailsContainer">'
+            f'<h4 class="sc-jlZhew">{title}</h4>'
+            f'<p class="sc-jXbUNg">{value}{suffix}</p></div>'
+        )
+    return "".join(items)
+
+
+def _render_specialist(product):
+    review = _text(product.get("specialist_review_content"))
+    return f"""
+<div class="SpecialistOpinion__Container">
+  <div class="SpecialistOpinion__SommelierContainer">
+    <div class="SpecialistOpinion__SommelierContainer__SommelierInfos">
+      <h4 class="sc-jlZhew bMxkvj">{_text(product.get("specialist_review_owner"))}</h4>
+      <p class="sc-jXbUNg ejYBXU">{_text(product.get("specialist_review_occupation"))}</p>
+    </div>
+  </div>
+  <div class="SpecialistOpinion__ReviewContainer ReviewBorderBottom">
+    <p class="sc-jXbUNg ejYBXU">{review}</p>
+  </div>
+</div>"""
+
+
+def render_product(product):
+    """
+    Renderiza a página de um produto.
+
+    A ficha técnica começa recolhida e é expandida pelo botão "Ver ficha
+    técnica completa"; os níveis de sabor são marcados via ::after em CSS,
+    que é o que get_strength_level inspeciona.
+
+    Args:
+        product (dict): Registro do produto (linha do db.csv)
+
+    Returns:
+        str: HTML da página
+    """
+    country = _text(product.get("technical_sheet_country"))
+    region = _text(product.get("technical_sheet_region"))
+    strengths = "".join(
+        _render_strength(label, product.get(column))
+        for label, column in STRENGTH_LABELS
+    )
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>{_text(product["product_name"])} | Evino</title>
+<style>{PAGE_STYLE}</style></head>
+<body>
+<picture class="NewProductImage NewProductImage--loaded">
+  <img src="{image_path(product)}" alt="{_text(product["product_name"])}">
+</picture>
+<h1 class="BoxProductInfo__Title">
+  <span class="BoxProductInfo__Title__Tagline">{_text(product.get("product_type"))}</span>
+  <span class="BoxProductInfo__Title__ProductName">{_text(product["product_name"])}</span>
+</h1>
+<ul class="BoxProductInfo__WineDetais">
+  <li class="BoxProductInfo__WineDetais__Item__WineType"><span>{_text(product.get("technical_sheet_wine_type"))}</span></li>
+  <li class="BoxProductInfo__WineDetais__Item__CountryAndRegion--Country"><div>{country}, {region}</div></li>
+  <li class="BoxProductInfo__WineDetais__Item__Grapes"><span>{_text(product.get("technical_sheet_grapes"))}</span></li>
+</ul>
+<section class="HowToTaste">
+  <p id="visualColor">{_text(product.get("color_description"))}</p>
+  <p id="aroma">{_text(product.get("scent_description"))}</p>
+  <p id="mouth">{_text(product.get("taste_description"))}</p>
+  <div class="HowToTaste__DetailsContainer HowToTaste__DetailsContainer__Tablet">
+    <p id="pairingsTablet">{_text(product.get("harmonizes_with"))}</p>
+  </div>
+  {strengths}
+</section>
+<section id="specifications" class="ProductSpecifications ProductSpecifications--collapsed">
+  {_render_specifications(product)}
+</section>
+<button type="button" onclick="document.getElementById('specifications').classList.remove('ProductSpecifications--collapsed'); this.style.display = 'none';">Ver ficha técnica completa</button>
+{_render_specialist(product)}
+</body>
+</html>"""
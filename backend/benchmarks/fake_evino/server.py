@@ -0,0 +1,234 @@
+"""
+Servidor HTTP local que imita o site da Evino para benchmarks do scraper.
+
+Rotas:
+    /vinhos                 listagem com botão "Mostrar mais"
+    /vinhos/page/<n>        próxima página da listagem (JSON com o HTML)
+    /product/<slug>-<id>    página do produto
+    /images/<id>.gif        imagem do produto
+
+Uso:
+    python backend/benchmarks/fake_evino/server.py --port 8000 --products 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from backend.benchmarks.fake_evino.pages import (
+    product_path,
+    render_listing,
+    render_product,
+    render_product_cards,
+)
+from backend.benchmarks.synthetic_catalogue import DEFAULT_SOURCE, load_source
+
+
+# GIF 1x1; os bytes extras após o terminador são ignorados pelos navegadores
+_GIF_PIXEL = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!\xf9\x04\x01"
+    b"\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+
+
+class FakeEvinoSite:
+    """
+    Site falso da Evino servido em uma thread, com catálogo vindo do db.csv.
+
+    Pode ser usado como context manager; a URL base fica em base_url depois de
+    start(). requests_by_route conta as requisições atendidas por rota, o que
+    ajuda a identificar carregamentos repetidos de página.
+    """
+
+    def __init__(
+        self,
+        products=None,
+        n_products=None,
+        page_size=24,
+        latency_ms=0,
+        image_kb=30,
+        host="127.0.0.1",
+        port=0,
+    ):
+        """
+        Args:
+            products (pd.DataFrame): Catálogo; por padrão o db.csv
+            n_products (int): Quantidade de produtos (repete o catálogo se preciso)
+            page_size (int): Produtos por página da listagem
+            latency_ms (int): Atraso artificial por requisição, em ms
+            image_kb (int): Tamanho das imagens servidas, em KB
+            host (str): Endereço de escuta
+            port (int): Porta (0 = escolhe uma livre)
+        """
+        if products is None:
+            products = load_source(DEFAULT_SOURCE)
+        records = products.to_dict("records")
+        n_products = n_products or len(records)
+
+        self.products = []
+        for i in range(n_products):
+            product = dict(records[i % len(records)])
+            if i >= len(records):
+                # Cópias com ids e nomes próprios para gerar URLs distintas
+                product["id"] = int(product["id"]) + i * 100000
+                product["product_name"] = f"{product['product_name']} {i}"
+            self.products.append(product)
+
+        self.by_path = {product_path(p): p for p in self.products}
+        self.by_image_id = {str(p["id"]): p for p in self.products}
+        self.page_size = page_size
+        self.latency = latency_ms / 1000
+        self.image = _GIF_PIXEL + b"\0" * max(0, image_kb * 1024 - len(_GIF_PIXEL))
+        self.requests_by_route = Counter()
+        self._lock = threading.Lock()
+        self._address = (host, port)
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def product_urls(self):
+        return [self.base_url + product_path(p) for p in self.products]
+
+    def page(self, number):
+        """Retorna os produtos da página (1-indexada) e se há mais páginas."""
+        start = (number - 1) * self.page_size
+        end = start + self.page_size
+        return self.products[start:end], end < len(self.products)
+
+    def count(self, route):
+        with self._lock:
+            self.requests_by_route[route] += 1
+
+    def start(self):
+        site = self
+
+        class Handler(_FakeEvinoHandler):
+            pass
+
+        Handler.site = site
+        self._server = ThreadingHTTPServer(self._address, Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _FakeEvinoHandler(BaseHTTPRequestHandler):
+    site = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        site = self.site
+        if site.latency:
+            time.sleep(site.latency)
+
+        path = self.path.split("?", 1)[0].rstrip("/") or "/"
+
+        if path in ("/", "/vinhos"):
+            site.count("listing")
+            products, has_more = site.page(1)
+            return self._send(200, render_listing(products, has_more))
+
+        if path.startswith("/vinhos/page/"):
+            site.count("listing_page")
+            try:
+                number = int(path.rsplit("/", 1)[1])
+            except ValueError:
+                return self._send(400, "Página inválida")
+            products, has_more = site.page(number)
+            body = json.dumps(
+                {
+                    "html": render_product_cards(products),
+                    "has_more": has_more,
+                    "next_page": number + 1,
+                }
+            )
+            return self._send(200, body, "application/json")
+
+        if path.startswith("/product/"):
+            product = site.by_path.get(path)
+            if product is None:
+                site.count("not_found")
+                return self._send(404, "Produto não encontrado")
+            site.count("product")
+            return self._send(200, render_product(product))
+
+        if path.startswith("/images/"):
+            image_id = path.rsplit("/", 1)[1].split(".", 1)[0]
+            if image_id not in site.by_image_id:
+                site.count("not_found")
+                return self._send(404, "Imagem não encontrada")
+            site.count("image")
+            return self._send(200, site.image, "image/gif")
+
+        site.count("not_found")
+        return self._send(404, "Página não encontrada")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Site falso da Evino")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--products", type=int, default=None, help="Quantidade de produtos")
+    parser.add_argument("--page-size", type=int, default=24, help="Produtos por página")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Atraso por requisição")
+    parser.add_argument("--image-kb", type=int, default=30, help="Tamanho das imagens")
+    args = parser.parse_args(argv)
+
+    site = FakeEvinoSite(
+        n_products=args.products,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        image_kb=args.image_kb,
+        host=args.host,
+        port=args.port,
+    ).start()
+    print(f"Site falso da Evino em {site.base_url}/vinhos ({len(site.products)} produtos)")
+    print(f"Use EVINO_BASE_URL={site.base_url} para apontar o scraper para ele")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
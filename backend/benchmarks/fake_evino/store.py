@@ -0,0 +1,110 @@
+"""
+Banco em memória com o subconjunto da API do cliente Supabase usado pelo scraper.
+
+Permite rodar a extração de links e o upsert dos vinhos sem rede:
+table(...).select/insert/upsert/update, filtros eq/neq/order/limit e execute().
+"""
+
+import threading
+from types import SimpleNamespace
+
+
+class InMemorySupabase:
+    """Substituto do supabase.Client para benchmarks, seguro entre threads."""
+
+    def __init__(self):
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        with self.lock:
+            rows = self.tables.setdefault(name, [])
+        return _Query(self, rows)
+
+
+class _Query:
+    def __init__(self, db, rows):
+        self._db = db
+        self._rows = rows
+        self._action = "select"
+        self._payload = None
+        self._columns = None
+        self._filters = []
+        self._limit = None
+        self._order = None
+
+    def select(self, columns="*", count=None):
+        self._action = "select"
+        self._columns = None if columns == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, data):
+        self._action, self._payload = "insert", data
+        return self
+
+    def upsert(self, data):
+        self._action, self._payload = "upsert", data
+        return self
+
+    def update(self, data):
+        self._action, self._payload = "update", data
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, size):
+        self._limit = size
+        return self
+
+    def _matches(self, row):
+        return all(f(row) for f in self._filters)
+
+    def execute(self):
+        with self._db.lock:
+            if self._action in ("insert", "upsert"):
+                payload = self._payload
+                records = payload if isinstance(payload, list) else [payload]
+                data = []
+                for record in records:
+                    record = dict(record)
+                    existing = None
+                    if self._action == "upsert" and "id" in record:
+                        existing = next(
+                            (r for r in self._rows if r.get("id") == record["id"]), None
+                        )
+                    if existing is not None:
+                        existing.update(record)
+                        data.append(dict(existing))
+                    else:
+                        record.setdefault("id", len(self._rows) + 1)
+                        record.setdefault("scraped", 0)
+                        self._rows.append(record)
+                        data.append(dict(record))
+                return SimpleNamespace(data=data, count=len(data))
+
+            matched = [r for r in self._rows if self._matches(r)]
+            if self._action == "update":
+                for row in matched:
+                    row.update(self._payload)
+                return SimpleNamespace(data=[dict(r) for r in matched], count=len(matched))
+
+            if self._order:
+                column, desc = self._order
+                matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+            if self._limit is not None:
+                matched = matched[: self._limit]
+            if self._columns:
+                matched = [{c: r.get(c) for c in self._columns} for r in matched]
+            else:
+                matched = [dict(r) for r in matched]
+            return SimpleNamespace(data=matched, count=len(matched))
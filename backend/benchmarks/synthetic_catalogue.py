@@ -0,0 +1,167 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+DEFAULT_SOURCE = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../..", "db.csv")
+)
+
+# Colunas de texto livre que recebem palavras extras para variar o vocabulário
+FREE_TEXT_COLUMNS = [
+    "color_description",
+    "scent_description",
+    "taste_description",
+    "specialist_review_content",
+]
+
+# Colunas cujos valores são sorteados da distribuição real do catálogo
+SAMPLED_COLUMNS = [
+    "product_type",
+    "harmonizes_with",
+    "technical_sheet_wine_type",
+    "technical_sheet_volume",
+    "technical_sheet_closure_type",
+    "technical_sheet_service_temperature_in_celsius",
+    "technical_sheet_country",
+    "technical_sheet_region",
+    "technical_sheet_alcohol_content",
+    "technical_sheet_grapes",
+    "technical_sheet_crop_year",
+    "technical_sheet_cellaring_time",
+    "technical_sheet_maturation_time",
+    "specialist_review_owner",
+    "specialist_review_occupation",
+]
+
+ORDINAL_COLUMNS = ["fruit_tasting", "sugar_tasting", "acidity_tasting", "tannin_tasting"]
+
+
+def load_source(source_path=DEFAULT_SOURCE):
+    """
+    Carrega o catálogo real usado como base do esquema e dos vocabulários.
+
+    Args:
+        source_path (str): Caminho do db.csv
+
+    Returns:
+        pd.DataFrame: Catálogo real
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Catálogo base não encontrado: {source_path}")
+    return pd.read_csv(source_path, index_col=0)
+
+
+def _word_pool(values):
+    words = pd.Series(values).dropna().astype(str).str.lower().str.split().explode()
+    words = words[words.str.len() > 3]
+    return words.unique()
+
+
+def _random_words(rng, pool, n_rows, n_words):
+    """Concatena n_words palavras sorteadas do pool para cada linha."""
+    picks = pool[rng.integers(0, len(pool), size=(n_rows, n_words))]
+    text = pd.Series(picks[:, 0])
+    for i in range(1, n_words):
+        text = text + " " + picks[:, i]
+    return text
+
+
+def generate_catalogue(n_wines, source=None, random_state=42, null_rate=0.03):
+    """
+    Gera um catálogo sintético com o mesmo esquema do db.csv.
+
+    Os textos partem de valores reais sorteados, acrescidos de palavras do
+    próprio catálogo e de nomes de produtores sintéticos, de modo que o
+    tamanho dos textos fica realista e o vocabulário cresce com o catálogo.
+
+    Args:
+        n_wines (int): Quantidade de vinhos
+        source (pd.DataFrame): Catálogo real (None = carrega o db.csv)
+        random_state (int): Seed do gerador
+        null_rate (float): Proporção de valores nulos nas colunas ordinais
+
+    Returns:
+        pd.DataFrame: Catálogo sintético
+    """
+    source = load_source() if source is None else source
+    rng = np.random.default_rng(random_state)
+    base_rows = rng.integers(0, len(source), size=n_wines)
+    base = source.iloc[base_rows].reset_index(drop=True)
+
+    catalogue = pd.DataFrame({"id": np.arange(1, n_wines + 1)})
+
+    for col in SAMPLED_COLUMNS:
+        if col in source.columns:
+            catalogue[col] = base[col].to_numpy()
+
+    # Produtores sintéticos: o vocabulário de nomes cresce com o catálogo
+    n_producers = max(10, n_wines // 20)
+    syllables = np.array(
+        ["va", "lle", "ro", "sa", "quin", "ta", "do", "mon", "te", "bel", "cas", "tel"]
+    )
+    producer_parts = syllables[rng.integers(0, len(syllables), size=(n_producers, 3))]
+    producers = np.char.add(
+        np.char.add(producer_parts[:, 0], producer_parts[:, 1]), producer_parts[:, 2]
+    )
+    producer_ids = rng.integers(0, n_producers, size=n_wines)
+    catalogue["technical_sheet_producer"] = np.char.capitalize(producers[producer_ids])
+    catalogue["product_name"] = (
+        catalogue["technical_sheet_producer"]
+        + " "
+        + base["product_name"].fillna("").astype(str)
+        + " "
+        + rng.integers(2010, 2025, size=n_wines).astype(str)
+    )
+
+    for col in FREE_TEXT_COLUMNS:
+        if col not in source.columns:
+            continue
+        pool = _word_pool(source[col])
+        extra = _random_words(rng, pool, n_wines, 3)
+        text = base[col].astype("string") + " " + extra
+        catalogue[col] = text.where(base[col].notna(), None)
+
+    for col in ORDINAL_COLUMNS:
+        values = rng.integers(1, 6, size=n_wines).astype(float)
+        values[rng.random(n_wines) < null_rate] = np.nan
+        catalogue[col] = values
+
+    catalogue["url"] = "https://www.evino.com.br/product/" + catalogue["id"].astype(str)
+    catalogue["product_name_escaped"] = np.nan
+
+    columns = [c for c in source.columns if c in catalogue.columns]
+    return catalogue[columns]
+
+
+def generate_queries(n_queries, source=None, random_state=0, slider_only_rate=0.3):
+    """
+    Gera consultas no formato do formulário da Home.
+
+    Args:
+        n_queries (int): Quantidade de consultas
+        source (pd.DataFrame): Catálogo real (None = carrega o db.csv)
+        random_state (int): Seed do gerador
+        slider_only_rate (float): Proporção de consultas só com os sliders
+
+    Returns:
+        list: Lista de dicionários de entrada do recomendador
+    """
+    source = load_source() if source is None else source
+    rng = np.random.default_rng(random_state)
+    harmonizes = _word_pool(source["harmonizes_with"])
+    countries = source["technical_sheet_country"].dropna().unique()
+    grapes = _word_pool(source["technical_sheet_grapes"])
+
+    queries = []
+    for _ in range(n_queries):
+        query = {col: int(rng.integers(1, 6)) for col in ORDINAL_COLUMNS}
+        if rng.random() >= slider_only_rate:
+            query["harmonizes_with"] = str(rng.choice(harmonizes))
+            query["technical_sheet_country"] = str(rng.choice(countries))
+            query["technical_sheet_grapes"] = str(rng.choice(grapes))
+        queries.append(query)
+    return queries
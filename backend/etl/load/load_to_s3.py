@@ -103,19 +103,30 @@ def upload_directory_to_s3(
         bucket_name (str): Nome do bucket do S3
         prefix (str, opcional): Prefixo da pasta no S3
         allowed_extensions (list, opcional): Lista de extensões permitidas
+
+    Returns:
+        tuple: (arquivos enviados, arquivos com falha) ou None se o diretório não existir
     """
     if not os.path.exists(directory_path):
         logger.error(f"Erro: Diretório {directory_path} não encontrado!")
-        return
+        return None
 
     files_uploaded = 0
+    files_failed = 0
     for root, _, files in os.walk(directory_path):
         for file in files:
             file_path = os.path.join(root, file)
             if upload_to_s3(file_path, bucket_name, prefix, allowed_extensions):
                 files_uploaded += 1
+            elif (
+                not allowed_extensions
+                or os.path.splitext(file.lower())[1] in allowed_extensions
+            ):
+                # Arquivos com extensão não permitida são apenas ignorados
+                files_failed += 1
 
     logger.info(f"Total de arquivos enviados: {files_uploaded}")
+    return files_uploaded, files_failed
 
 
 if __name__ == "__main__":
@@ -1,91 +1,492 @@
-from bs4 import BeautifulSoup
+import argparse
 import datetime
 import logging
+import os
 import sys
-import time
-
-from app.config.settings import EVINO_PRODUCTS_URL, EVINO_BASE_URL
-from app.core.browser import initialize_browser, close_browser
-from app.core.scraper_aux import extract_product_links, scroll_page
-from app.core.scraper import scrape_wine_info_with_selenium
-from app.database.supabase_client import (
-    get_supabase_client,
-    save_links_to_supabase,
-    process_and_upsert_wine_data,
-    process_product_links,
-    get_pending_products,
+from contextlib import nullcontext
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app.config.settings import (
+    API_HOST,
+    API_PORT,
+    API_SCORING_THREADS,
+    API_THREADS,
+    API_WORKERS,
+    CRAWL_CHECKPOINT_PATH,
+    EVINO_PRODUCTS_URL,
+    MAX_SCROLLS,
+    PRODUCTS_BATCH_SIZE,
+    SCRAPER_CONCURRENCY,
+    SHARDS_PATH,
+    WINE_DATA_PATH,
+    MODEL_PATH,
 )
-from app.utils.helpers import setup_logging, get_user_input, get_integer_input
-from app.scheduler.tasks import *
+from backend.app.utils import metrics
+from backend.app.utils.helpers import setup_logging, get_user_input, get_integer_input
 
 
 logger = logging.getLogger("evino_scraper")
 
+# Códigos de saída para uso em cron/containers
+EXIT_OK = 0
+EXIT_FAILURE = 1  # Erro geral ou nenhum item processado com sucesso
+EXIT_USAGE = 2  # Argumentos inválidos (padrão do argparse)
+EXIT_PARTIAL = 3  # Parte dos itens falhou
+EXIT_UNAVAILABLE = 4  # Supabase, navegador ou configuração indisponíveis
+
 
-def main():
+def connect_supabase():
     """
-    Main function to orchestrate the Evino wine scraping process.
+    Conecta ao Supabase, registrando o motivo da falha quando não for possível.
+
+    Returns:
+        Client ou None: O cliente do Supabase ou None em caso de erro.
     """
-    logger = setup_logging()
-    logger.info("===== Iniciando extrator de vinhos da Evino com Supabase =====")
-    logger.info(f"Data/Hora: {datetime.datetime.now()}")
+    from backend.app.database.supabase_client import get_supabase_client
 
     try:
         supabase = get_supabase_client()
         logger.info("Conexão com Supabase estabelecida com sucesso")
+        return supabase
     except ValueError as e:
         logger.error(f"Erro: {e}")
         logger.error(
             "Adicione as variáveis de ambiente SUPABASE_URL e SUPABASE_KEY antes de continuar."
         )
-        sys.exit(1)
     except Exception as e:
         logger.error(f"Erro ao conectar com Supabase: {e}")
-        sys.exit(1)
+    return None
 
-    # Ask if initial extraction should be performed
-    should_extract = get_user_input(
-        "Deseja executar a extração inicial de links de vinhos? (s/n): ",
-        valid_options=["s", "n"],
+
+def exit_code_for(processed, failed):
+    """
+    Converte contagens de sucesso/falha em código de saída.
+
+    Args:
+        processed (int): Itens processados com sucesso.
+        failed (int): Itens com falha.
+
+    Returns:
+        int: Código de saída.
+    """
+    if failed == 0:
+        return EXIT_OK
+    if processed == 0:
+        return EXIT_FAILURE
+    return EXIT_PARTIAL
+
+
+def cmd_crawl(args):
+    """Extrai links de produtos do catálogo e salva no Supabase."""
+    from backend.app.core.browser import initialize_browser, close_browser
+    from backend.app.database.supabase_client import (
+        scrape_product_links,
+        scrape_product_links_incremental,
     )
-    new_links_count = None
 
-    # Initialize browser
+    supabase = connect_supabase()
+    if supabase is None:
+        return EXIT_UNAVAILABLE
+
     driver = initialize_browser()
+    if not driver:
+        logger.error(
+            "Não foi possível inicializar o navegador. Verifique se o Chrome está instalado."
+        )
+        return EXIT_UNAVAILABLE
 
-    if should_extract == "s":
+    try:
+        logger.info(f"Iniciando extração de links em {EVINO_PRODUCTS_URL}")
+        if args.full:
+            new_links_count = scrape_product_links(driver, supabase)
+        else:
+            new_links_count = scrape_product_links_incremental(
+                driver,
+                supabase,
+                checkpoint_path=args.checkpoint,
+                max_scrolls=args.max_scrolls,
+                resume=not args.no_resume,
+            )
+        if new_links_count is None:
+            return EXIT_FAILURE
+        logger.info(f"Novos links salvos: {new_links_count}")
+        return EXIT_OK
+    except Exception as e:
+        logger.error(f"Erro durante a extração de links: {e}")
+        return EXIT_FAILURE
+    finally:
+        close_browser(driver)
 
-        if driver:
-            try:
-                # Navigate to products page and get page source
-                driver.get(EVINO_PRODUCTS_URL)
-                scroll_page(driver)  # Scroll to load more products
-                page_source = driver.page_source
-                soup = BeautifulSoup(page_source, "html.parser")
-
-                logger.info("Iniciando extração de links de produtos")
-                product_links = extract_product_links(soup)
-
-                if not product_links:
-                    logger.warning("Nenhum link de produto encontrado")
-                    return None  # Ou return, dependendo do contexto
-
-                logger.info(
-                    f"Total de {len(product_links)} links de produtos encontrados"
+
+def cmd_scrape(args):
+    """Faz o scraping dos produtos pendentes em lotes."""
+    from backend.app.database.supabase_client import get_pending_products
+    from backend.app.scheduler.tasks import process_products_concurrently
+
+    supabase = connect_supabase()
+    if supabase is None:
+        return EXIT_UNAVAILABLE
+
+    limit = args.limit
+    if limit is None:
+        limit = args.batch_size * (args.max_batches or 1)
+
+    pending_product_data = get_pending_products(supabase, limit=limit)
+    if not pending_product_data:
+        logger.info("Nenhum produto pendente para processar")
+        return EXIT_OK
+
+    logger.info(
+        f"{len(pending_product_data)} produtos pendentes, lotes de {args.batch_size} "
+        f"com {args.concurrency} navegadores"
+    )
+    processed, failed = process_products_concurrently(
+        pending_product_data,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        max_batches=args.max_batches,
+        interval_minutes=args.interval,
+        save_locally=args.target == "local",
+    )
+    logger.info(f"Scraping concluído: {processed} com sucesso, {failed} com falha")
+    return exit_code_for(processed, failed)
+
+
+def cmd_upload(args):
+    """Envia imagens e/ou arquivos JSON locais para o S3."""
+    from backend.app.config.settings import (
+        RAW_BUCKET,
+        IMAGES_RAW_BUCKET,
+        OBJS_RAW_BUCKET,
+        IMAGE_PATH,
+        JSON_OBJS_PATH,
+    )
+
+    if not RAW_BUCKET:
+        logger.error("Variável de ambiente RAW_BUCKET não definida")
+        return EXIT_UNAVAILABLE
+
+    from backend.etl.load.load_to_s3 import upload_directory_to_s3
+
+    targets = []
+    if args.what in ("images", "all"):
+        targets.append((IMAGE_PATH, IMAGES_RAW_BUCKET, [".jpg", ".png"]))
+    if args.what in ("json", "all"):
+        targets.append((JSON_OBJS_PATH, OBJS_RAW_BUCKET, [".json"]))
+
+    uploaded, failed = 0, 0
+    for directory, prefix, extensions in targets:
+        if not directory:
+            logger.error("Diretório local não configurado (IMAGE_PATH/JSON_OBJS_PATH)")
+            return EXIT_UNAVAILABLE
+        result = upload_directory_to_s3(
+            directory, RAW_BUCKET, prefix, allowed_extensions=extensions
+        )
+        if result is None:
+            return EXIT_FAILURE
+        uploaded += result[0]
+        failed += result[1]
+
+    return exit_code_for(uploaded, failed)
+
+
+def run_evaluation_workload(model, dataframe, args, session=None):
+    """
+    Executa consultas de recomendação e a avaliação Jaccard do modelo.
+
+    As consultas avulsas só rodam com session; nesse caso cada parte vira uma
+    etapa do perfil ("recommend" e "evaluate").
+
+    Args:
+        model (WineRecommender): Modelo treinado
+        dataframe (pd.DataFrame): Vinhos sem codificação (como no CSV)
+        args (argparse.Namespace): Opções num_tests, top_n, diversity e queries
+        session (ProfileSession, optional): Sessão de perfilamento
+
+    Returns:
+        dict: Métricas de JaccardWineEvaluator.evaluate_recommendations
+    """
+    import contextlib
+    import numpy as np
+    from backend.app.core.wine_recommender_metrics import JaccardWineEvaluator
+
+    def section(name):
+        return session.section(name) if session else contextlib.nullcontext()
+
+    evaluator = JaccardWineEvaluator(model, dataframe)
+
+    if session and args.queries:
+        rng = np.random.default_rng(42)
+        rows = rng.choice(len(dataframe), min(args.queries, len(dataframe)), replace=False)
+        queries = evaluator._input_features(rows)
+        with section("recommend"):
+            for input_features in queries:
+                model.recommend_wines(
+                    input_features, top_n=args.top_n, diversity_factor=args.diversity
                 )
 
-                # Salvar links no Supabase
-                new_links_count = save_links_to_supabase(supabase, product_links)
-                logger.info(f"Novos links salvos: {new_links_count}")
+    with section("evaluate"):
+        return evaluator.evaluate_recommendations(
+            num_tests=args.num_tests,
+            top_n=args.top_n,
+            random_state=42,
+            diversity_factor=args.diversity,
+        )
+
+
+def write_profile(session, path):
+    """Grava o relatório de perfilamento e registra o resumo no log."""
+    for line in session.summary():
+        logger.info(f"Perfil - {line}")
+    written = session.write(path)
+    logger.info(f"Relatório de perfilamento salvo em {written[0]}")
+
+
+def build_model_artifacts(model, args):
+    """
+    Gera as estruturas opcionais do treino pedidas em args e salva o modelo.
+
+    A ordem importa: a tabela de recomendações é gerada com o scoring, o
+    embedding e o índice de clusters finais.
+    """
+    if args.ordinal_table:
+        model.build_ordinal_table()
+    model.set_scoring(args.scoring)
+    if args.embedding:
+        model.build_text_embedding(args.embedding)
+    if args.clusters is not None:
+        model.build_cluster_index(args.clusters or None, args.n_probe)
+    if args.precompute:
+        model.build_recommendation_table(args.top_n, args.diversity)
+    model.salvar_modelo(args.output)
+
+
+def train_from_chunks(args):
+    """Treina lendo o CSV/Parquet em lotes (train --chunk-size)."""
+    from backend.app.core.wine_recommender import WineRecommender
+    from backend.app.core.wine_recommender_chunks import (
+        csv_chunks,
+        limit_chunks,
+        parquet_chunks,
+        training_columns,
+    )
+    from backend.app.utils.profiling import ProfileSession
+
+    # O treino em lotes gera sempre o modelo compacto (--lean) no modo hashing
+    if args.text_mode == "vocabulary":
+        logger.error("--chunk-size treina no modo hashing: --text-mode vocabulary não se aplica")
+        return EXIT_USAGE
+
+    read_chunks = parquet_chunks if args.data.endswith(".parquet") else csv_chunks
+    source = read_chunks(args.data, args.chunk_size, training_columns(WineRecommender))
+    if args.limit:
+        source = limit_chunks(source, args.limit)
+    logger.info(f"Treinando modelo em lotes de {args.chunk_size} linhas de {args.data}")
+
+    text_weights = dict(args.text_weight)
+    session = ProfileSession(top_n=args.profile_top) if args.profile else None
+    with session.section("prepare_features") if session else nullcontext():
+        model = WineRecommender.from_chunks(source, text_weights=text_weights)
+    build_model_artifacts(model, args)
+
+    if session:
+        import pandas as pd
+
+        # A avaliação lê o mesmo arquivo (e as mesmas linhas) do treino
+        dataframe = pd.concat(list(source()), ignore_index=True)
+        run_evaluation_workload(model, dataframe, args, session)
+        write_profile(session, args.profile_output)
+    return EXIT_OK
+
+
+def cmd_train(args):
+    """Treina o modelo de recomendação e salva em disco."""
+    import pandas as pd
+    from backend.app.core.wine_recommender import WineRecommender
+    from backend.app.utils.profiling import ProfileSession
+
+    if not os.path.exists(args.data):
+        logger.error(f"Arquivo de dados não encontrado: {args.data}")
+        return EXIT_UNAVAILABLE
+
+    try:
+        if args.chunk_size:
+            return train_from_chunks(args)
+
+        dataframe = pd.read_csv(args.data)
+        if args.limit:
+            dataframe = dataframe.head(args.limit)
+        logger.info(f"Treinando modelo com {len(dataframe)} vinhos de {args.data}")
+
+        # O recomendador codifica o DataFrame recebido; a avaliação usa o original
+        session = ProfileSession(top_n=args.profile_top) if args.profile else None
+        with session.section("prepare_features") if session else nullcontext():
+            model = WineRecommender(
+                dataframe.copy() if session else dataframe,
+                lean=args.lean,
+                text_mode=args.text_mode or "vocabulary",
+                text_weights=dict(args.text_weight),
+            )
+        build_model_artifacts(model, args)
+
+        if session:
+            # O perfil cobre o modelo final, com as estruturas opcionais já geradas
+            run_evaluation_workload(model, dataframe, args, session)
+            write_profile(session, args.profile_output)
+        return EXIT_OK
+    except Exception as e:
+        logger.error(f"Erro ao treinar o modelo: {e}")
+        return EXIT_FAILURE
+
+
+def cmd_evaluate(args):
+    """Avalia um modelo salvo com a similaridade Jaccard das recomendações."""
+    import pandas as pd
+    from backend.app.core.wine_recommender import WineRecommender
+    from backend.app.utils.profiling import ProfileSession
+
+    for path in (args.model, args.data):
+        if not os.path.exists(path):
+            logger.error(f"Arquivo não encontrado: {path}")
+            return EXIT_UNAVAILABLE
+
+    try:
+        model = WineRecommender.carregar_modelo(args.model)
+        dataframe = pd.read_csv(args.data)
+        session = ProfileSession(top_n=args.profile_top) if args.profile else None
+        metrics_result = run_evaluation_workload(model, dataframe, args, session)
+        for name, value in metrics_result.items():
+            logger.info(f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}")
+
+        if session:
+            write_profile(session, args.profile_output)
+        return EXIT_OK
+    except Exception as e:
+        logger.error(f"Erro ao avaliar o modelo: {e}")
+        return EXIT_FAILURE
+
+
+def cmd_precompute(args):
+    """Gera a tabela de recomendações das consultas só com os sliders."""
+    from backend.app.core.wine_recommender import WineRecommender
+
+    if not os.path.exists(args.model):
+        logger.error(f"Arquivo de modelo não encontrado: {args.model}")
+        return EXIT_UNAVAILABLE
+
+    try:
+        model = WineRecommender.carregar_modelo(args.model)
+        model.build_recommendation_table(
+            args.top_n,
+            args.diversity,
+            [] if args.sliders_only else None,
+        )
+        model.salvar_modelo(args.output or args.model)
+        return EXIT_OK
+    except Exception as e:
+        logger.error(f"Erro ao gerar a tabela de recomendações: {e}")
+        return EXIT_FAILURE
+
+
+def cmd_shard(args):
+    """Divide um modelo salvo em shards servidos por processos separados."""
+    from backend.app.core.wine_recommender import WineRecommender
+    from backend.app.core.wine_recommender_sharding import build_shards
+
+    if not os.path.exists(args.model):
+        logger.error(f"Arquivo de modelo não encontrado: {args.model}")
+        return EXIT_UNAVAILABLE
+
+    try:
+        model = WineRecommender.carregar_modelo(args.model)
+        build_shards(model, args.output, args.shards)
+        return EXIT_OK
+    except Exception as e:
+        logger.error(f"Erro ao dividir o modelo em shards: {e}")
+        return EXIT_FAILURE
+
+
+def add_evaluation_arguments(parser, profile_output):
+    """Opções comuns da avaliação e do perfilamento (train e evaluate)."""
+    parser.add_argument(
+        "--num-tests", type=int, default=100, help="Amostras da avaliação Jaccard"
+    )
+    parser.add_argument("--top-n", type=int, default=5, help="Recomendações por consulta")
+    parser.add_argument(
+        "--diversity", type=float, default=0.5, help="Fator de diversificação"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Executa sob cProfile e tracemalloc e grava um relatório de pontos quentes",
+    )
+    parser.add_argument(
+        "--profile-output", default=profile_output, help="Arquivo do relatório"
+    )
+    parser.add_argument(
+        "--profile-top", type=int, default=25, help="Linhas por tabela do relatório"
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=200,
+        help="Consultas de recomendação executadas no perfilamento",
+    )
+
+
+def cmd_serve(args):
+    """Sobe o serviço HTTP de recomendação."""
+    from backend.app.api.server import serve
+
+    path = args.shards or args.model
+    if not os.path.exists(path):
+        logger.error(f"Modelo não encontrado: {path}")
+        return EXIT_UNAVAILABLE
+    return serve(
+        args.model,
+        args.host,
+        args.port,
+        args.workers,
+        args.threads,
+        args.shared_memory,
+        args.scoring_threads,
+        args.shards,
+    )
 
-            except Exception as e:
-                logger.error(f"Erro durante a extração inicial: {e}")
 
+def run_interactive():
+    """
+    Fluxo interativo original, usado quando nenhum subcomando é informado.
+    """
+    from backend.app.core.browser import initialize_browser
+    from backend.app.database.supabase_client import (
+        get_pending_products,
+        scrape_product_links,
+    )
+    from backend.app.scheduler.tasks import schedule_download_tasks
+
+    supabase = connect_supabase()
+    if supabase is None:
+        return EXIT_UNAVAILABLE
+
+    # Ask if initial extraction should be performed
+    should_extract = get_user_input(
+        "Deseja executar a extração inicial de links de vinhos? (s/n): ",
+        valid_options=["s", "n"],
+    )
+    new_links_count = None
+    driver = None
+
+    if should_extract == "s":
+        # O navegador só é iniciado quando alguma etapa precisa dele
+        driver = initialize_browser()
+        if driver:
+            new_links_count = scrape_product_links(driver, supabase)
+            logger.info(f"Novos links salvos: {new_links_count}")
         else:
             logger.error(
                 "Não foi possível inicializar o navegador. Verifique se o Chrome está instalado."
             )
-            new_links_count = None
 
     # Option to schedule future extractions
     schedule_extraction = get_user_input(
@@ -123,7 +524,12 @@ def main():
                 supabase, limit=batch_size * max_batches
             )
 
-        schedule_download_tasks(
+        if driver is None:
+            driver = initialize_browser()
+        if not driver:
+            return EXIT_UNAVAILABLE
+
+        processed, failed = schedule_download_tasks(
             driver,
             supabase,
             pending_product_data,
@@ -131,9 +537,307 @@ def main():
             batch_size=batch_size,
             max_batches=max_batches,
         )
+        return exit_code_for(processed, failed)
+
+    return EXIT_OK
+
+
+def text_weight(value):
+    """Converte "coluna=N" (opção --text-weight) em (coluna, N)."""
+    column, separator, weight = value.partition("=")
+    if not separator or not weight.isdigit():
+        raise argparse.ArgumentTypeError(f"Use COLUNA=N, recebido: {value}")
+    return column, int(weight)
+
+
+def build_parser():
+    """
+    Monta o parser de argumentos da linha de comando.
+
+    Returns:
+        argparse.ArgumentParser: Parser com os subcomandos disponíveis.
+    """
+    parser = argparse.ArgumentParser(
+        description="Pipelines do extrator de vinhos da Evino e do modelo de recomendação.",
+        epilog="Sem subcomando, executa o fluxo interativo.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Grava as métricas de tempo no formato do Prometheus neste arquivo",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve as métricas de tempo em http://0.0.0.0:<porta>/metrics",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    crawl = subparsers.add_parser(
+        "crawl", help="Extrai links de produtos do catálogo e salva no Supabase"
+    )
+    crawl.add_argument(
+        "--full",
+        action="store_true",
+        help="Carrega o catálogo inteiro antes de extrair (modo antigo, sem checkpoint)",
+    )
+    crawl.add_argument(
+        "--checkpoint",
+        default=CRAWL_CHECKPOINT_PATH,
+        help="Arquivo de checkpoint da extração incremental",
+    )
+    crawl.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignora o checkpoint de uma extração interrompida",
+    )
+    crawl.add_argument(
+        "--max-scrolls",
+        type=int,
+        default=MAX_SCROLLS,
+        help="Número máximo de rolagens no catálogo",
+    )
+    crawl.set_defaults(func=cmd_crawl)
 
-        sys.exit(1)
+    scrape = subparsers.add_parser(
+        "scrape", help="Faz o scraping dos produtos pendentes no Supabase"
+    )
+    scrape.add_argument(
+        "--concurrency",
+        type=int,
+        default=SCRAPER_CONCURRENCY,
+        help="Quantidade de navegadores em paralelo",
+    )
+    scrape.add_argument(
+        "--batch-size",
+        type=int,
+        default=PRODUCTS_BATCH_SIZE,
+        help="Quantidade de produtos por lote",
+    )
+    scrape.add_argument(
+        "--max-batches", type=int, default=None, help="Número máximo de lotes"
+    )
+    scrape.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Máximo de produtos pendentes a buscar (padrão: batch-size * max-batches)",
+    )
+    scrape.add_argument(
+        "--interval",
+        type=float,
+        default=0,
+        help="Pausa em minutos entre lotes (0 = sem pausa)",
+    )
+    scrape.add_argument(
+        "--target",
+        choices=["local", "supabase"],
+        default="local",
+        help="Destino dos dados extraídos: JSON local ou tabela wine_data",
+    )
+    scrape.set_defaults(func=cmd_scrape)
+
+    upload = subparsers.add_parser("upload", help="Envia arquivos locais para o S3")
+    upload.add_argument(
+        "what",
+        nargs="?",
+        choices=["images", "json", "all"],
+        default="all",
+        help="Quais arquivos enviar",
+    )
+    upload.set_defaults(func=cmd_upload)
+
+    train = subparsers.add_parser("train", help="Treina e salva o modelo de recomendação")
+    train.add_argument("--data", default=WINE_DATA_PATH, help="CSV com os vinhos")
+    train.add_argument("--output", default=MODEL_PATH, help="Caminho do modelo salvo")
+    train.add_argument(
+        "--limit", type=int, default=None, help="Usa apenas as primeiras N linhas"
+    )
+    train.add_argument(
+        "--lean",
+        action="store_true",
+        help="Salva o modelo compacto (float32, sem os textos do catálogo)",
+    )
+    train.add_argument(
+        "--text-mode",
+        choices=["vocabulary", "hashing"],
+        default=None,
+        help=(
+            "Vetorização do texto: vocabulário TF-IDF (padrão) ou hashing "
+            "(memória fixa; sempre hashing com --chunk-size)"
+        ),
+    )
+    train.add_argument(
+        "--text-weight",
+        action="append",
+        type=text_weight,
+        default=[],
+        metavar="COLUNA=N",
+        help="Repete a coluna N vezes no texto combinado (ex.: harmonizes_with=2)",
+    )
+    train.add_argument(
+        "--scoring",
+        choices=["legacy", "fused"],
+        default="legacy",
+        help="Scoring padrão: similaridades normalizadas por consulta ou matriz fundida",
+    )
+    train.add_argument(
+        "--ordinal-table",
+        action="store_true",
+        help="Pré-calcula a similaridade ordinal das 625 combinações dos sliders",
+    )
+    train.add_argument(
+        "--embedding",
+        type=int,
+        nargs="?",
+        const=256,
+        default=None,
+        metavar="DIM",
+        help="Similaridade textual no embedding SVD denso com DIM dimensões (padrão 256)",
+    )
+    train.add_argument(
+        "--clusters",
+        type=int,
+        nargs="?",
+        const=0,
+        default=None,
+        metavar="N",
+        help="Gera o índice de clusters KMeans com N clusters (sem N: raiz do catálogo)",
+    )
+    train.add_argument(
+        "--n-probe",
+        type=int,
+        default=None,
+        help="Clusters pontuados por consulta no scoring fused com o índice (padrão 8)",
+    )
+    train.add_argument(
+        "--precompute",
+        action="store_true",
+        help="Gera a tabela de recomendações dos sliders (com --top-n e --diversity)",
+    )
+    train.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help=(
+            "Lê o CSV/Parquet em lotes de N linhas (modelo compacto em modo "
+            "hashing; respeita --limit)"
+        ),
+    )
+    add_evaluation_arguments(train, "logs/profile_train.txt")
+    train.set_defaults(func=cmd_train)
+
+    evaluate = subparsers.add_parser(
+        "evaluate", help="Avalia um modelo salvo (similaridade Jaccard e cobertura)"
+    )
+    evaluate.add_argument("--model", default=MODEL_PATH, help="Caminho do modelo salvo")
+    evaluate.add_argument("--data", default=WINE_DATA_PATH, help="CSV com os vinhos")
+    add_evaluation_arguments(evaluate, "logs/profile_evaluate.txt")
+    evaluate.set_defaults(func=cmd_evaluate)
+
+    precompute = subparsers.add_parser(
+        "precompute",
+        help="Materializa as recomendações das consultas só com os sliders",
+    )
+    precompute.add_argument("--model", default=MODEL_PATH, help="Caminho do modelo salvo")
+    precompute.add_argument(
+        "--output", default=None, help="Onde salvar o modelo (padrão: --model)"
+    )
+    precompute.add_argument(
+        "--top-n", type=int, default=5, help="Recomendações por consulta"
+    )
+    precompute.add_argument(
+        "--diversity", type=float, default=0.5, help="Fator de diversificação"
+    )
+    precompute.add_argument(
+        "--sliders-only",
+        action="store_true",
+        help="Não gera as combinações com tipo de vinho ou país",
+    )
+    precompute.set_defaults(func=cmd_precompute)
+
+    shard = subparsers.add_parser(
+        "shard", help="Divide o modelo em shards servidos por processos separados"
+    )
+    shard.add_argument("--model", default=MODEL_PATH, help="Caminho do modelo salvo")
+    shard.add_argument("--shards", type=int, default=4, help="Quantidade de shards")
+    shard.add_argument(
+        "--output", default=SHARDS_PATH, help="Diretório dos shards e do coordenador"
+    )
+    shard.set_defaults(func=cmd_shard)
+
+    serve = subparsers.add_parser("serve", help="Sobe o serviço HTTP de recomendação")
+    serve.add_argument("--model", default=MODEL_PATH, help="Caminho do modelo salvo")
+    serve.add_argument("--host", default=API_HOST, help="Endereço de escuta")
+    serve.add_argument("--port", type=int, default=API_PORT, help="Porta HTTP")
+    serve.add_argument(
+        "--workers", type=int, default=API_WORKERS, help="Processos do serviço"
+    )
+    serve.add_argument(
+        "--threads", type=int, default=API_THREADS, help="Threads de cálculo por processo"
+    )
+    serve.add_argument(
+        "--shared-memory",
+        action="store_true",
+        help="Matrizes do modelo em memória compartilhada entre os workers",
+    )
+    serve.add_argument(
+        "--scoring-threads",
+        type=int,
+        default=API_SCORING_THREADS,
+        help="Threads que pontuam cada consulta por blocos do catálogo",
+    )
+    serve.add_argument(
+        "--shards",
+        default=None,
+        help="Diretório gerado pelo comando shard (um processo por shard)",
+    )
+    serve.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+
+    Args:
+        argv (list, optional): Argumentos; usa sys.argv quando None.
+
+    Returns:
+        int: Código de saída.
+    """
+    args = build_parser().parse_args(argv)
+
+    setup_logging()
+    logger.info("===== Iniciando extrator de vinhos da Evino com Supabase =====")
+    logger.info(f"Data/Hora: {datetime.datetime.now()}")
+
+    metrics_server, metrics_writer = None, None
+    try:
+        if args.metrics_port:
+            metrics_server = metrics.start_metrics_server(args.metrics_port)
+            logger.info(f"Métricas em http://0.0.0.0:{args.metrics_port}/metrics")
+        if args.metrics_file:
+            metrics_writer = metrics.MetricsFileWriter(args.metrics_file).start()
+
+        if args.command is None:
+            return run_interactive()
+        return args.func(args)
+    except KeyboardInterrupt:
+        logger.info("Programa interrompido pelo usuário.")
+        return EXIT_FAILURE
+    except Exception as e:
+        logger.error(f"Erro inesperado: {e}")
+        return EXIT_FAILURE
+    finally:
+        if metrics_writer:
+            metrics_writer.stop()
+            logger.info(f"Métricas gravadas em {args.metrics_file}")
+        if metrics_server:
+            metrics_server.shutdown()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
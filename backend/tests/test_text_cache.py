@@ -0,0 +1,56 @@
+"""
+Testes do cache da vetorização das consultas (QueryVectorCache).
+
+As stop words do spaCy são trocadas por uma lista fixa para que os testes não
+dependam do modelo pt_core_news_sm.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.app.core import wine_recommender
+from backend.app.core.wine_recommender import WineRecommender
+
+
+DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../db.csv"))
+STOP_WORDS = ["de", "da", "do", "com", "e"]
+
+
+@pytest.fixture(scope="module", params=["vocabulary", "hashing"])
+def model(request):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(wine_recommender, "load_stop_words", lambda: list(STOP_WORDS))
+        return WineRecommender(
+            pd.read_csv(DATA_PATH).head(150), text_mode=request.param
+        )
+
+
+@pytest.mark.parametrize("text", ["", "de", "x"])
+def test_query_without_tokens(model, text):
+    """Campos vazios ou só com stop words dão o mesmo resultado com e sem cache."""
+    query = {"harmonizes_with": text, "fruit_tasting": 3}
+    model.enable_text_cache()
+    cached = model.recommend_wines(query, diversity_factor=0)
+    model.disable_text_cache()
+    uncached = model.recommend_wines(query, diversity_factor=0)
+    model.enable_text_cache()
+
+    assert cached == uncached
+    assert len(cached) == 5
+
+
+def test_repeated_queries_hit_cache(model):
+    """Consultas repetidas reaproveitam os campos já vetorizados."""
+    model.enable_text_cache()
+    query = {"harmonizes_with": "Carnes vermelhas", "technical_sheet_country": "Chile"}
+    for _ in range(3):
+        model.recommend_wines(query)
+
+    stats = model.text_cache_stats()
+    assert stats is not None
+    assert stats["hits"] > 0
+    assert stats["hit_rate"] > 0
@@ -6,6 +6,7 @@ st.set_page_config(initial_sidebar_state="expanded")
 import os
 import sys
 import pandas as pd
+import requests
 from supabase import create_client
 from dotenv import load_dotenv
 
@@ -22,25 +23,35 @@ load_dotenv()
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+RECOMMENDER_API_URL = os.environ.get("RECOMMENDER_API_URL")
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 st.title("🍷 Vinhos Recomendados ")
 
-db = pd.read_csv("./data/db.csv")
-recommender = WineRecommender(db)
-
-recomendacoes = recommender.recommend_wines(
-    input_features={
-        "fruit_tasting": st.session_state["params"]["fruit_tasting"],
-        "sugar_tasting": st.session_state["params"]["sugar_tasting"],
-        "acidity_tasting": st.session_state["params"]["acidity_tasting"],
-        "tannin_tasting": st.session_state["params"]["tannin_tasting"],
-        "harmonizes_with": st.session_state["params"]["harmonizes_with"],
-        "technical_sheet_country": st.session_state["params"]["country"],
-        "technical_sheet_grapes": "Uvas variadas",
-    }
-)
+input_features = {
+    "fruit_tasting": st.session_state["params"]["fruit_tasting"],
+    "sugar_tasting": st.session_state["params"]["sugar_tasting"],
+    "acidity_tasting": st.session_state["params"]["acidity_tasting"],
+    "tannin_tasting": st.session_state["params"]["tannin_tasting"],
+    "harmonizes_with": st.session_state["params"]["harmonizes_with"],
+    "technical_sheet_country": st.session_state["params"]["country"],
+    "technical_sheet_grapes": "Uvas variadas",
+}
+
+if RECOMMENDER_API_URL:
+    # Serviço de recomendação com o modelo já carregado (backend/main.py serve)
+    response = requests.post(
+        f"{RECOMMENDER_API_URL.rstrip('/')}/recommend",
+        json={"features": input_features},
+        timeout=10,
+    )
+    response.raise_for_status()
+    recomendacoes = response.json()["ids"]
+else:
+    db = pd.read_csv("./data/db.csv")
+    recommender = WineRecommender(db)
+    recomendacoes = recommender.recommend_wines(input_features=input_features)
 
 results = supabase.table("wine_data").select("*").in_("id", recomendacoes).execute()
 st.session_state["wine_results"] = pd.DataFrame(results.data)